@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
     'dj_rest_auth.registration',
     'drf_yasg',
     'django_celery_results',
+    'channels',
 ]
 
 CELERY_RESULT_BACKEND = 'django-db'
@@ -90,6 +92,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'analytics.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'InnoFlow.urls'
@@ -111,6 +114,39 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'InnoFlow.wsgi.application'
+ASGI_APPLICATION = 'InnoFlow.asgi.application'
+
+# Channel layer for execution progress. Celery workers publish to it, so in
+# production it must be shared: set CHANNEL_LAYER_REDIS_URL to use Redis.
+if os.getenv('CHANNEL_LAYER_REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.getenv('CHANNEL_LAYER_REDIS_URL')]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }
+
+# Observers notified by WorkflowExecutor as an execution progresses
+WORKFLOW_EXECUTION_OBSERVERS = [
+    'workflows.events.ProgressPublisher',
+    'analytics.node_timing.NodeTimingRecorder',
+    'analytics.instrumentation.ExecutionMetrics',
+    'analytics.query_budget.QueryBudgetObserver',
+    'analytics.execution_log.ExecutionLogRecorder',
+]
+# 'order' runs nodes by their order field; 'critical_path' runs them after their
+# inputs, starting the nodes with the longest expected remaining path first
+WORKFLOW_SCHEDULING = 'order'
+# Seconds a rendered workflow graph stays cached; any change to the graph gives it a new cache key
+WORKFLOW_GRAPH_CACHE_TIMEOUT = 3600
+# Minimum seconds between progress messages for one execution; events in between are batched
+WORKFLOW_PROGRESS_MIN_INTERVAL = 0.25
+# Progress frames larger than this many bytes are zlib-compressed for clients that negotiate compress=1
+WORKFLOW_PROGRESS_COMPRESS_THRESHOLD = 1024
 
 
 # Database
@@ -198,6 +234,152 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+# Run with `celery -A InnoFlow beat`
+CELERY_BEAT_SCHEDULE = {
+    'prune-latency-rollups': {
+        'task': 'analytics.tasks.prune_latency_rollups',
+        'schedule': timedelta(minutes=15),
+    },
+}
+
+# Shared state for the provider call layers (locks, counters). Use
+# 'ai_integration.backends.RedisBackend' to share it across Celery workers.
+AI_COORDINATION_BACKEND = {
+    'BACKEND': os.getenv('AI_COORDINATION_BACKEND', 'ai_integration.backends.MemoryBackend'),
+    'OPTIONS': {},
+}
+
+# Coalescing of identical in-flight provider calls
+AI_SINGLEFLIGHT = {
+    'CROSS_PROCESS': os.getenv('AI_SINGLEFLIGHT_CROSS_PROCESS', 'false').lower() == 'true',
+    'LOCK_TIMEOUT': 120,  # seconds a leader may hold the cross-process lock
+    'RESULT_TTL': 10,  # seconds a finished result stays visible to other processes
+}
+
+# Hedged provider requests (enabled per AIModelConfig through hedge_percentile)
+AI_HEDGING = {
+    'WINDOW': 500,  # latency samples kept per configuration
+    'MIN_SAMPLES': 20,  # samples needed before the percentile is trusted
+    'INITIAL_DELAY': 2.0,  # hedge delay in seconds until then
+    'MAX_WORKERS': 32,
+}
+
+# Provider rate limits (declared per AIModelConfig); over-limit calls queue instead of failing
+AI_RATE_LIMITS = {
+    'MAX_WAIT': 300,  # seconds a call may queue before RateLimitTimeout
+    'POLL_INTERVAL': 0.05,
+    'SLOT_TTL': 600,  # concurrency slots of crashed workers are reclaimed after this
+}
+
+# Adaptive (AIMD) concurrency per provider endpoint, learned by each worker
+AI_ADAPTIVE_CONCURRENCY = {
+    'ENABLED': True,
+    'INITIAL_LIMIT': 4,
+    'MIN_LIMIT': 1,
+    'MAX_LIMIT': 64,
+    'TARGET_LATENCY': 10.0,  # seconds
+    'TARGET_LATENCY_BY_PROVIDER': {'OLLAMA': 30.0, 'HUGGINGFACE': 30.0},
+    'BACKOFF': 0.5,  # multiplicative decrease
+    'TOLERANCE': 1.5,  # short/long latency ratio treated as congestion
+    'MAX_WAIT': 300,
+}
+
+# Per-AIModelConfig circuit breakers, shared through AI_COORDINATION_BACKEND
+AI_CIRCUIT_BREAKER = {
+    'FAILURE_RATE': 0.5,  # failed or slow share of calls that opens the circuit
+    'MIN_CALLS': 10,  # calls needed in the window before the rate counts
+    'WINDOW': 60,  # seconds
+    'BUCKETS': 6,
+    'SLOW_CALL_SECONDS': 30,  # successful calls slower than this count as failures
+    'COOLDOWN': 30,  # seconds open before a half-open probe is allowed
+    'PROBE_TIMEOUT': 60,
+}
+
+# Ollama servers
+AI_OLLAMA = {
+    'KEEP_ALIVE': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),  # how long Ollama keeps a model loaded after a request
+    'PARALLEL': int(os.getenv('OLLAMA_NUM_PARALLEL', '4')),  # requests each server runs at once; 0 disables the cap
+    'PARALLEL_BY_SERVER': {},  # base_url -> capacity for servers configured differently
+    'MAX_WAIT': 300,  # seconds a call may wait for a free slot
+    'WARMUP_ON_WORKER_START': os.getenv('OLLAMA_WARMUP', 'false').lower() == 'true',
+    'PRELOAD_TIMEOUT': 300,
+}
+
+# Latency rollups in the analytics app
+ANALYTICS_ROLLUPS = {
+    'MINUTE_RETENTION': timedelta(days=7),  # minute rows are pruned after this; hour rows are kept
+}
+
+# Prometheus metrics served at /metrics
+METRICS = {
+    # Set for Celery prefork or multi-worker servers so /metrics covers every process; empty it on deploy
+    'MULTIPROCESS_DIR': os.getenv('METRICS_MULTIPROC_DIR') or None,
+    'FLUSH_INTERVAL': 1.0,  # seconds between writes of a process's values in multiprocess mode
+    'CELERY_QUEUES': ['celery'],
+    'AUTH_TOKEN': os.getenv('METRICS_AUTH_TOKEN'),  # bearer token required to scrape, if set
+}
+
+# Execution tracing (see analytics.tracing)
+TRACING = {
+    'ENABLED': os.getenv('TRACING_ENABLED', 'false').lower() == 'true',
+    'SAMPLE_RATE': float(os.getenv('TRACING_SAMPLE_RATE', '0.01')),  # share of executions traced
+    'EXPORTER': os.getenv('TRACING_EXPORTER', 'jsonl'),  # jsonl, chrome or otlp
+    'PATH': os.getenv('TRACING_PATH', str(BASE_DIR / 'traces.jsonl')),
+    'OTLP_ENDPOINT': os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'),
+}
+
+# Sampling profiler for executions started with profile=cpu|wall
+PROFILING = {
+    'INTERVAL': 0.005,  # seconds between stack samples
+    'MAX_DEPTH': 128,
+}
+
+# tracemalloc reports for executions started with memory_profile=true
+MEMORY_PROFILING = {
+    'TOP': 10,  # allocation sites kept per node
+    'FRAMES': 1,  # traceback depth stored by tracemalloc; more is slower
+}
+
+# Record provider calls to an archive, or replay them offline (see ai_integration.recording)
+PROVIDER_TRAFFIC = {
+    'MODE': os.getenv('PROVIDER_TRAFFIC_MODE', ''),  # '', record or replay
+    'PATH': os.getenv('PROVIDER_TRAFFIC_PATH', str(BASE_DIR / 'provider-traffic')),
+    'LATENCY_SCALE': float(os.getenv('PROVIDER_TRAFFIC_LATENCY_SCALE', '1.0')),  # 0 replays without waiting
+}
+
+# Requests and executions over these limits, or running one statement shape
+# REPEAT_THRESHOLD times (an N+1 loop), are logged by analytics.query_budget
+QUERY_BUDGET = {
+    'REQUEST_MAX_QUERIES': 30,
+    'REQUEST_MAX_TIME': 0.25,  # seconds spent in queries
+    'EXECUTION_BASE_QUERIES': 20,
+    'EXECUTION_MAX_QUERIES_PER_NODE': 10,
+    'REPEAT_THRESHOLD': 10,
+    'HEADERS': DEBUG,  # add X-Query-Count and X-Query-Time-Ms to responses
+}
+
+# Run time estimates from historical node timings (analytics.estimation)
+ESTIMATION = {
+    'WINDOW_DAYS': 7,
+    'MIN_SAMPLES': 5,  # runs needed before a rollup source is trusted over a broader one
+    'SAMPLES': 1000,  # Monte Carlo draws per estimate
+    'DEFAULT_RUN_TIME': 1.0,  # seconds, for node types that have never run
+}
+
+# analytics.execution_log writes per-node results and progress events in batches
+# of up to BATCH_SIZE rows, at least every FLUSH_INTERVAL seconds while a run is going
+EXECUTION_LOG = {
+    'BATCH_SIZE': 50,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Content-addressed store for node outputs too large (or too binary) for the results JSON (workflows.artifacts)
+ARTIFACTS = {
+    'BACKEND': 'workflows.artifacts.LocalArtifactStorage',
+    'OPTIONS': {'root': str(BASE_DIR / 'artifacts')},
+    'THRESHOLD': 64 * 1024,  # bytes; text and JSON outputs at least this big are stored out of line
+    'GC_GRACE': 24 * 3600,  # seconds an unreferenced blob is kept, covering executions still running
+}
 
 
 # Internationalization
@@ -25,6 +25,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 from .swagger import swagger_urlpatterns
+from analytics.views import metrics_view
 
 class GoogleLogin(SocialLoginView):
     adapter_class = GoogleOAuth2Adapter
@@ -62,6 +63,7 @@ urlpatterns = [
     # App APIs
     path('api/users/', include('users.urls')),
     path('api/workflows/', include('workflows.urls')),
+    path('api/analytics/', include('analytics.urls')),
 
     # REST auth
     path('api/auth/', include('dj_rest_auth.urls')),
@@ -76,6 +78,9 @@ urlpatterns = [
 
     path('ai/', include('ai_integration.urls')),
 
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
 ]
 
 urlpatterns += swagger_urlpatterns
\ No newline at end of file
@@ -1,7 +1,22 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class AIProvider(ABC):
+    default_timeout = 60.0
+
     @abstractmethod
     def generate_completion(self, prompt: str, **kwargs) -> str:
         """Generate a completion based on the prompt."""
-        pass
\ No newline at end of file
+        pass
+
+    def stream_completion(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Yield the completion in chunks as the provider produces them.
+
+        Providers without a streaming API yield the whole completion at once.
+        """
+        yield self.generate_completion(prompt, **kwargs)
+
+    def cancel(self):
+        """Abort an in-flight call, for providers that can. Used to drop hedged losers."""
+        pass
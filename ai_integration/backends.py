@@ -0,0 +1,321 @@
+"""
+Coordination backends for provider call layers.
+
+The call layers in this app (single-flight, rate limiting, circuit breaking)
+keep small pieces of shared state: locks, counters, short-lived values, token
+buckets, concurrency slots and FIFO wait queues.
+``MemoryBackend`` keeps that state inside the current process and is what the
+tests use. ``RedisBackend`` shares it between every Celery worker.
+
+The backend is selected with the ``AI_COORDINATION_BACKEND`` setting::
+
+    AI_COORDINATION_BACKEND = {
+        'BACKEND': 'ai_integration.backends.RedisBackend',
+        'OPTIONS': {'url': 'redis://localhost:6379/1'},
+    }
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class MemoryBackend:
+    """Process-local backend. Values expire after ``ttl`` seconds."""
+
+    def __init__(self, **options):
+        self._data = {}
+        self._buckets = {}
+        self._slots = {}
+        self._queues = {}
+        self._lock = threading.RLock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    @staticmethod
+    def _expiry(ttl):
+        return time.monotonic() + ttl if ttl else None
+
+    def add(self, key, value, ttl=None) -> bool:
+        """Set ``key`` only if it does not exist. Returns True when set."""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (value, self._expiry(ttl))
+            return True
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._live(key)
+            return default if item is None else item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, self._expiry(ttl))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None) -> int:
+        """Atomically add ``amount`` to a counter, creating it if missing."""
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                value, expires_at = 0, self._expiry(ttl)
+            else:
+                value, expires_at = item
+            value += amount
+            self._data[key] = (value, expires_at)
+            return value
+
+    def take_tokens(self, buckets) -> float:
+        """
+        Take ``amount`` tokens from every bucket, or from none of them.
+
+        ``buckets`` is a list of ``(key, capacity, refill_per_second, amount)``.
+        Returns 0 when the tokens were taken, otherwise the seconds to wait
+        before all buckets can cover the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            levels, wait = [], 0.0
+            for key, capacity, rate, amount in buckets:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                levels.append(tokens)
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+            for (key, capacity, rate, amount), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - amount if not wait else tokens, now)
+            return wait
+
+    def acquire_slot(self, key, holder, limit, ttl) -> bool:
+        """Take one of ``limit`` concurrency slots. Slots of crashed holders expire after ``ttl``."""
+        with self._lock:
+            now = time.monotonic()
+            slots = {h: exp for h, exp in self._slots.get(key, {}).items() if exp > now}
+            self._slots[key] = slots
+            if len(slots) >= limit:
+                return False
+            slots[holder] = now + ttl
+            return True
+
+    def touch_slot(self, key, holder, ttl) -> bool:
+        """Push back the expiry of a held slot, for holders that outlive ``ttl``. False if it had already expired."""
+        with self._lock:
+            slots = self._slots.get(key, {})
+            now = time.monotonic()
+            if slots.get(holder, 0) <= now:
+                return False
+            slots[holder] = now + ttl
+            return True
+
+    def release_slot(self, key, holder):
+        with self._lock:
+            self._slots.get(key, {}).pop(holder, None)
+
+    def queue_join(self, key, member):
+        with self._lock:
+            self._queues.setdefault(key, {})[member] = time.monotonic()
+
+    def queue_touch(self, key, member):
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None and member in queue:
+                queue[member] = time.monotonic()
+
+    def queue_head(self, key, stale_after):
+        """First live member of the queue. Members that stopped touching the queue are dropped."""
+        with self._lock:
+            queue = self._queues.get(key, {})
+            now = time.monotonic()
+            for member in list(queue):
+                if queue[member] >= now - stale_after:
+                    return member
+                del queue[member]
+            return None
+
+    def queue_leave(self, key, member):
+        with self._lock:
+            self._queues.get(key, {}).pop(member, None)
+
+    def queue_length(self, key) -> int:
+        with self._lock:
+            return len(self._queues.get(key, {}))
+
+
+class RedisBackend:
+    """Backend shared across processes through Redis. Values are stored as JSON."""
+
+    def __init__(self, url=None, prefix='innoflow:', **options):
+        import redis  # optional dependency, only needed when this backend is configured
+
+        self.client = redis.Redis.from_url(url or settings.CELERY_BROKER_URL, **options)
+        self.prefix = prefix
+        self._scripts = {
+            'take_tokens': self.client.register_script(_TAKE_TOKENS),
+            'acquire_slot': self.client.register_script(_ACQUIRE_SLOT),
+            'touch_slot': self.client.register_script(_TOUCH_SLOT),
+            'queue_head': self.client.register_script(_QUEUE_HEAD),
+        }
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    @staticmethod
+    def _ttl_ms(ttl):
+        return int(ttl * 1000) if ttl else None
+
+    def add(self, key, value, ttl=None) -> bool:
+        return bool(self.client.set(self._key(key), json.dumps(value), nx=True, px=self._ttl_ms(ttl)))
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._key(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), json.dumps(value), px=self._ttl_ms(ttl))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def incr(self, key, amount=1, ttl=None) -> int:
+        pipe = self.client.pipeline()
+        pipe.incrby(self._key(key), amount)
+        if ttl:
+            # Only set an expiry on a fresh counter so it isn't extended forever
+            pipe.expire(self._key(key), int(ttl) or 1, nx=True)
+        return int(pipe.execute()[0])
+
+    def take_tokens(self, buckets) -> float:
+        keys, args = [], []
+        for key, capacity, rate, amount in buckets:
+            keys.append(self._key(key))
+            args += [capacity, rate, amount]
+        return float(self._scripts['take_tokens'](keys=keys, args=args))
+
+    def acquire_slot(self, key, holder, limit, ttl) -> bool:
+        return bool(self._scripts['acquire_slot'](keys=[self._key(key)], args=[holder, limit, ttl]))
+
+    def touch_slot(self, key, holder, ttl) -> bool:
+        return bool(self._scripts['touch_slot'](keys=[self._key(key)], args=[holder, ttl]))
+
+    def release_slot(self, key, holder):
+        self.client.zrem(self._key(key), holder)
+
+    def queue_join(self, key, member):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zadd(self._key(key), {member: now}, nx=True)
+        pipe.hset(self._key(f'{key}:heartbeat'), member, now)
+        pipe.execute()
+
+    def queue_touch(self, key, member):
+        self.client.hset(self._key(f'{key}:heartbeat'), member, time.time())
+
+    def queue_head(self, key, stale_after):
+        head = self._scripts['queue_head'](
+            keys=[self._key(key), self._key(f'{key}:heartbeat')], args=[stale_after, time.time()]
+        )
+        return head.decode() if head else None
+
+    def queue_leave(self, key, member):
+        pipe = self.client.pipeline()
+        pipe.zrem(self._key(key), member)
+        pipe.hdel(self._key(f'{key}:heartbeat'), member)
+        pipe.execute()
+
+    def queue_length(self, key) -> int:
+        return self.client.zcard(self._key(key))
+
+
+_TAKE_TOKENS = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local capacity, rate, amount = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+    levels[i] = tokens
+    if tokens < amount then wait = math.max(wait, (amount - tokens) / rate) end
+end
+for i, key in ipairs(KEYS) do
+    local capacity, rate, amount = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+    local tokens = levels[i]
+    if wait == 0 then tokens = tokens - amount end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+_ACQUIRE_SLOT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3]) * 1000))
+    return 1
+end
+return 0
+"""
+
+_TOUCH_SLOT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expires = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1]))
+if not expires or expires <= now then return 0 end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2]) * 1000))
+return 1
+"""
+
+_QUEUE_HEAD = """
+local oldest_alive = tonumber(ARGV[2]) - tonumber(ARGV[1])
+while true do
+    local first = redis.call('ZRANGE', KEYS[1], 0, 0)
+    if #first == 0 then return false end
+    local heartbeat = tonumber(redis.call('HGET', KEYS[2], first[1]))
+    if heartbeat and heartbeat >= oldest_alive then return first[1] end
+    redis.call('ZREM', KEYS[1], first[1])
+    redis.call('HDEL', KEYS[2], first[1])
+end
+"""
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend configured by ``AI_COORDINATION_BACKEND``."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'AI_COORDINATION_BACKEND', {})
+                backend_class = import_string(config.get('BACKEND', 'ai_integration.backends.MemoryBackend'))
+                _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def reset_backend():
+    """Drop the cached backend so the next ``get_backend`` call rebuilds it (used by tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
@@ -0,0 +1,168 @@
+"""
+Circuit breakers for failing providers.
+
+Each ``AIModelConfig`` has a breaker with three states:
+
+* closed: calls go through. Failures and slow calls are counted in a sliding
+  window; once at least ``MIN_CALLS`` calls were made and the failure rate
+  reaches ``FAILURE_RATE`` the breaker opens.
+* open: calls fail immediately with ``CircuitOpenError`` (a ``ProviderError``,
+  so the gateway moves on to the fallback chain) until ``COOLDOWN`` seconds
+  have passed.
+* half-open: a single probe call is let through. Success closes the breaker,
+  failure opens it again for another cooldown.
+
+State and counters live in the coordination backend, so all workers see the
+same breaker: when one worker trips it, the others stop calling the provider
+too.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .backends import get_backend
+from .exceptions import CircuitOpenError
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def _setting(name, default):
+    return getattr(settings, 'AI_CIRCUIT_BREAKER', {}).get(name, default)
+
+
+class CircuitBreaker:
+    def __init__(self, name, backend=None, failure_rate=None, min_calls=None, window=None,
+                 buckets=None, slow_call_seconds=None, cooldown=None, probe_timeout=None):
+        self.name = name
+        self._backend = backend
+        self.failure_rate = failure_rate or _setting('FAILURE_RATE', 0.5)
+        self.min_calls = min_calls or _setting('MIN_CALLS', 10)
+        self.window = window or _setting('WINDOW', 60)
+        self.buckets = buckets or _setting('BUCKETS', 6)
+        self.slow_call_seconds = slow_call_seconds or _setting('SLOW_CALL_SECONDS', 30)
+        self.cooldown = cooldown or _setting('COOLDOWN', 30)
+        self.probe_timeout = probe_timeout or _setting('PROBE_TIMEOUT', 60)
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _key(self, suffix):
+        return f'breaker:{self.name}:{suffix}'
+
+    def _bucket_keys(self, generation, now):
+        width = self.window / self.buckets
+        current = int(now // width)
+        return [self._key(f'g{generation}:{bucket}') for bucket in range(current - self.buckets + 1, current + 1)]
+
+    def state(self):
+        opened = self.backend.get(self._key('open'))
+        if opened is None:
+            return CLOSED
+        return HALF_OPEN if time.time() - opened['at'] >= self.cooldown else OPEN
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go ahead. Returns True if this call is the
+        half-open probe; raises ``CircuitOpenError`` while the circuit is open.
+        """
+        backend = self.backend
+        opened = backend.get(self._key('open'))
+        if opened is None:
+            return False
+        retry_after = opened['at'] + self.cooldown - time.time()
+        if retry_after <= 0 and backend.add(self._key('probe'), 1, ttl=self.probe_timeout):
+            breaker_stats.record(self.name, 'probes')
+            return True
+        breaker_stats.record(self.name, 'rejected')
+        raise CircuitOpenError(self.name, max(retry_after, 0.0))
+
+    def record(self, success, latency=None, probe=False):
+        backend = self.backend
+        failed = not success or (latency is not None and latency > self.slow_call_seconds)
+        if probe:
+            backend.delete(self._key('probe'))
+            if failed:
+                self._open()
+            else:
+                # Start counting from scratch so stale failures can't re-open it straight away
+                backend.incr(self._key('generation'))
+                backend.delete(self._key('open'))
+                breaker_stats.record(self.name, 'closed')
+            return
+
+        generation = backend.get(self._key('generation'), 0)
+        now = time.time()
+        bucket = self._bucket_keys(generation, now)[-1]
+        backend.incr(f'{bucket}:calls', ttl=self.window * 2)
+        if not failed:
+            return
+        backend.incr(f'{bucket}:failures', ttl=self.window * 2)
+
+        calls = failures = 0
+        for key in self._bucket_keys(generation, now):
+            calls += backend.get(f'{key}:calls', 0)
+            failures += backend.get(f'{key}:failures', 0)
+        if calls >= self.min_calls and failures / calls >= self.failure_rate:
+            self._open()
+
+    def release(self):
+        """Give up the half-open probe without an outcome, so the next call can probe instead."""
+        self.backend.delete(self._key('probe'))
+
+    def _open(self):
+        self.backend.set(self._key('open'), {'at': time.time()})
+        breaker_stats.record(self.name, 'opened')
+
+    def reset(self):
+        backend = self.backend
+        backend.incr(self._key('generation'))
+        backend.delete(self._key('open'))
+        backend.delete(self._key('probe'))
+
+
+class BreakerStats:
+    """Per-process transition and rejection counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {'opened': 0, 'closed': 0, 'probes': 0, 'rejected': 0})
+
+    def record(self, name, counter):
+        with self._lock:
+            self._stats[name][counter] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+breaker_stats = BreakerStats()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model_config) -> CircuitBreaker:
+    name = str(model_config.pk)
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    counters = breaker_stats.snapshot()
+    return {
+        breaker.name: {'state': breaker.state(), **counters.get(breaker.name, {})}
+        for breaker in breakers
+    }
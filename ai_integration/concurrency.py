@@ -0,0 +1,164 @@
+"""
+Adaptive concurrency limits (AIMD) per provider endpoint.
+
+Each endpoint (provider + base URL) gets a limit on concurrent calls that
+adapts to how the endpoint behaves, in the style of TCP congestion control:
+
+* while latency stays under the target and the latency gradient is flat, the
+  limit grows additively (about +1 per limit's worth of successful calls);
+* on an error, a latency above target or a rising gradient (short-term average
+  latency well above the long-term one), the limit is cut multiplicatively.
+  Cuts happen at most once per window of in-flight calls, so one burst of
+  failures doesn't collapse the limit to the minimum.
+
+Limits are per process: each worker learns its own share of the endpoint, the
+same way each TCP connection runs its own congestion window.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .exceptions import ProviderError, RateLimitTimeout
+
+
+def _setting(name, default):
+    return getattr(settings, 'AI_ADAPTIVE_CONCURRENCY', {}).get(name, default)
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, target_latency, initial_limit=4, min_limit=1, max_limit=64,
+                 backoff=0.5, tolerance=1.5, max_wait=300.0):
+        self.name = name
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.max_wait = max_wait
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.short_latency = None
+        self.long_latency = None
+        self.increases = 0
+        self.decreases = 0
+        # Let the first congestion signal act immediately
+        self._calls_since_decrease = initial_limit
+        self._cond = threading.Condition()
+
+    @property
+    def gradient(self):
+        """Short-term over long-term latency; above 1 means latency is rising."""
+        if not self.short_latency or not self.long_latency:
+            return 1.0
+        return self.short_latency / self.long_latency
+
+    def acquire(self):
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"Waited {self.max_wait}s for a concurrency slot on {self.name}")
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, latency, error=False):
+        with self._cond:
+            self.in_flight -= 1
+            self._calls_since_decrease += 1
+            if latency is not None:
+                self.short_latency = latency if self.short_latency is None else 0.5 * self.short_latency + 0.5 * latency
+                self.long_latency = latency if self.long_latency is None else 0.95 * self.long_latency + 0.05 * latency
+
+            congested = error or (latency is not None and (
+                latency > self.target_latency or self.gradient > self.tolerance
+            ))
+            if congested:
+                if self._calls_since_decrease >= int(self.limit):
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.decreases += 1
+                    self._calls_since_decrease = 0
+            elif self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.increases += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except ProviderError:
+            self.release(time.monotonic() - start, error=True)
+            raise
+        except BaseException:
+            # Not the endpoint's fault (e.g. a bug in our code): free the slot without a sample
+            self.release(None)
+            raise
+        else:
+            self.release(time.monotonic() - start)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'target_latency': self.target_latency,
+                'short_latency': self.short_latency,
+                'long_latency': self.long_latency,
+                'gradient': round(self.gradient, 3),
+                'increases': self.increases,
+                'decreases': self.decreases,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def endpoint_key(model_config) -> str:
+    return f'{model_config.provider}:{model_config.base_url or "default"}'
+
+
+def get_limiter(model_config) -> AdaptiveLimiter:
+    key = endpoint_key(model_config)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            targets = _setting('TARGET_LATENCY_BY_PROVIDER', {})
+            limiter = _limiters[key] = AdaptiveLimiter(
+                key,
+                target_latency=targets.get(model_config.provider, _setting('TARGET_LATENCY', 10.0)),
+                initial_limit=_setting('INITIAL_LIMIT', 4),
+                min_limit=_setting('MIN_LIMIT', 1),
+                max_limit=_setting('MAX_LIMIT', 64),
+                backoff=_setting('BACKOFF', 0.5),
+                tolerance=_setting('TOLERANCE', 1.5),
+                max_wait=_setting('MAX_WAIT', 300.0),
+            )
+        return limiter
+
+
+@contextmanager
+def adaptive_slot(model_config):
+    """Hold a slot on the endpoint's adaptive limiter for the duration of one provider call."""
+    if not _setting('ENABLED', True):
+        yield
+        return
+    with get_limiter(model_config).slot():
+        yield
+
+
+def stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
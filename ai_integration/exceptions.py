@@ -0,0 +1,23 @@
+class ProviderError(Exception):
+    """Base class for errors raised by provider calls."""
+
+
+class ProviderTimeout(ProviderError):
+    """The provider didn't answer within the configured timeout."""
+
+
+class RateLimitTimeout(ProviderError):
+    """Waited too long for rate limit or concurrency capacity."""
+
+
+class CircuitOpenError(ProviderError):
+    """The configuration's circuit breaker is open, so the call was not attempted."""
+
+    def __init__(self, breaker, retry_after):
+        super().__init__(f"Circuit for model config {breaker} is open; retry in {retry_after:.0f}s")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+
+class CoalescedCallError(ProviderError):
+    """The call that another worker made on our behalf failed."""
@@ -0,0 +1,334 @@
+"""
+Local stand-ins for the HTTP services InnoFlow talks to, for tests and load experiments.
+
+``FakeOllamaServer`` speaks enough of Ollama's ``/api/generate`` to exercise
+the provider: NDJSON streaming with a configurable delay per token, model
+cold loads, ``keep_alive`` and concurrency bookkeeping.
+
+``FakeProviderServer`` mimics the hosted APIs: OpenAI-style chat completions
+(``openai`` and ``deepseek``) and Anthropic's completions and messages, plain
+or streamed as server-sent events. Response latency comes from a fixed value
+or a distribution such as ``lognormal_latency``, and ``error_rate`` of the
+requests fail with ``error_status``.
+
+``FakeOtlpCollector`` accepts OTLP/HTTP JSON traces and keeps the spans, or
+appends them to a JSONL file, in place of an OpenTelemetry collector.
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def lognormal_latency(median, sigma=0.5, seed=None):
+    """Latency sampler with the long right tail of real provider latencies; ``median`` in seconds."""
+    rng = random.Random(seed)
+    mu = math.log(median)
+    return lambda: rng.lognormvariate(mu, sigma)
+
+
+def uniform_latency(low, high, seed=None):
+    rng = random.Random(seed)
+    return lambda: rng.uniform(low, high)
+
+
+class _LocalServer(ABC):
+    """A threading HTTP server on 127.0.0.1, started in a daemon thread."""
+
+    def __init__(self, port=0):
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def address(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @abstractmethod
+    def _handler(self):
+        """The ``BaseHTTPRequestHandler`` subclass that answers requests for this server."""
+        pass
+
+
+class FakeOllamaServer(_LocalServer):
+    def __init__(self, tokens=('Hello', ' world'), token_delay=0.0, load_delay=0.0, errors=None, error_rate=0.0, seed=None):
+        self.tokens = list(tokens)
+        self.token_delay = token_delay
+        self.load_delay = load_delay
+        self.errors = errors or {}  # model name -> error message streamed back
+        self.error_rate = error_rate  # share of requests answered with a 500
+        self.requests = []
+        self.loaded = {}  # model name -> last keep_alive hint
+        self.cold_loads = 0
+        self.active = 0
+        self.max_active = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        super().__init__()
+
+    @property
+    def url(self):
+        return self.address
+
+    def _load(self, payload):
+        model = payload.get('model')
+        with self._lock:
+            cold = model not in self.loaded
+            self.loaded[model] = payload.get('keep_alive')
+            if cold:
+                self.cold_loads += 1
+        if cold and self.load_delay:
+            time.sleep(self.load_delay)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_line(self, data):
+                self.wfile.write(json.dumps(data).encode() + b'\n')
+                self.wfile.flush()
+
+            def do_POST(self):
+                if self.path != '/api/generate':
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with fake._lock:
+                    fake.requests.append(payload)
+                    fake.active += 1
+                    fake.max_active = max(fake.max_active, fake.active)
+                try:
+                    self._generate(payload)
+                finally:
+                    with fake._lock:
+                        fake.active -= 1
+
+            def _generate(self, payload):
+                model = payload.get('model')
+                if fake.error_rate and fake._rng.random() < fake.error_rate:
+                    self.send_error(500, 'Simulated failure')
+                    return
+                fake._load(payload)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.end_headers()
+                if model in fake.errors:
+                    self._send_line({'error': fake.errors[model]})
+                    return
+                if 'prompt' not in payload:
+                    # Ollama loads the model and returns immediately for an empty request
+                    self._send_line({'model': model, 'response': '', 'done': True, 'done_reason': 'load'})
+                    return
+                if not payload.get('stream', True):
+                    self._send_line({'model': model, 'response': ''.join(fake.tokens), 'done': True})
+                    return
+                for token in fake.tokens:
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                    self._send_line({'model': model, 'response': token, 'done': False})
+                self._send_line({'model': model, 'response': '', 'done': True, 'eval_count': len(fake.tokens)})
+
+        return Handler
+
+
+class FakeProviderServer(_LocalServer):
+    APIS = ('openai', 'deepseek', 'anthropic')
+
+    def __init__(self, api='openai', tokens=('Hello', ' world'), latency=0.0, token_delay=0.0,
+                 error_rate=0.0, error_status=500, seed=None):
+        if api not in self.APIS:
+            raise ValueError(f"Unknown API {api!r}; expected one of {self.APIS}")
+        self.api = api
+        self.tokens = list(tokens)
+        # Seconds before the first byte: a number, or a callable returning one per request
+        self.latency = latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = []
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        super().__init__()
+
+    @property
+    def url(self):
+        """What goes in ``AIModelConfig.base_url``; OpenAI clients expect the ``/v1`` prefix in it."""
+        return f'{self.address}/v1' if self.api == 'openai' else self.address
+
+    def _delay(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+        return failed
+
+    def _completion(self, model, stream):
+        text = ''.join(self.tokens)
+        if self.api == 'anthropic':
+            if stream:
+                return [('completion', {'type': 'completion', 'completion': token, 'stop_reason': None, 'model': model})
+                        for token in self.tokens] + \
+                       [('completion', {'type': 'completion', 'completion': '', 'stop_reason': 'stop_sequence', 'model': model})]
+            return {'type': 'completion', 'id': f'compl_{uuid.uuid4().hex[:12]}', 'completion': text,
+                    'stop_reason': 'stop_sequence', 'model': model}
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        if stream:
+            chunks = [{'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                       'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+                      for token in self.tokens]
+            chunks.append({'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                           'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+            return [(None, chunk) for chunk in chunks] + [(None, '[DONE]')]
+        return {
+            'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': len(self.tokens), 'total_tokens': len(self.tokens) + 1},
+        }
+
+    def _message(self, model, stream):
+        text = ''.join(self.tokens)
+        message = {'id': f'msg_{uuid.uuid4().hex[:12]}', 'type': 'message', 'role': 'assistant', 'model': model,
+                   'stop_reason': 'end_turn', 'stop_sequence': None,
+                   'usage': {'input_tokens': 1, 'output_tokens': len(self.tokens)}}
+        if not stream:
+            return {**message, 'content': [{'type': 'text', 'text': text}]}
+        return [
+            ('message_start', {'type': 'message_start', 'message': {**message, 'content': [], 'stop_reason': None}}),
+            ('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}),
+            *[('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': token}})
+              for token in self.tokens],
+            ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+            ('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': {'output_tokens': len(self.tokens)}}),
+            ('message_stop', {'type': 'message_stop'}),
+        ]
+
+    def _routes(self):
+        if self.api == 'anthropic':
+            return {'/v1/complete': self._completion, '/v1/messages': self._message}
+        return {'/v1/chat/completions': self._completion, '/chat/completions': self._completion}
+
+    def _handler(self):
+        fake = self
+        routes = self._routes()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                respond = routes.get(self.path)
+                if respond is None:
+                    self._send_json(404, {'error': {'type': 'not_found', 'message': f'No route {self.path}'}})
+                    return
+                with fake._lock:
+                    fake.requests.append(payload)
+                delay = fake._delay()
+                if delay:
+                    time.sleep(delay)
+                if fake._fail():
+                    self._send_json(fake.error_status, {'error': {'type': 'api_error', 'message': 'Simulated failure'}})
+                    return
+                stream = bool(payload.get('stream'))
+                data = respond(payload.get('model'), stream)
+                if not stream:
+                    self._send_json(200, data)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for event, chunk in data:
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                    lines = f'event: {event}\n' if event else ''
+                    lines += f"data: {chunk if isinstance(chunk, str) else json.dumps(chunk)}\n\n"
+                    self.wfile.write(lines.encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+class FakeOtlpCollector(_LocalServer):
+    def __init__(self, path=None, port=0):
+        self.path = path
+        self.spans = []
+        self._lock = threading.Lock()
+        super().__init__(port)
+
+    @property
+    def url(self):
+        return f'{self.address}/v1/traces'
+
+    def _collect(self, payload):
+        spans = [
+            span
+            for resource in payload.get('resourceSpans', [])
+            for scope in resource.get('scopeSpans', [])
+            for span in scope.get('spans', [])
+        ]
+        with self._lock:
+            self.spans.extend(spans)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.writelines(json.dumps(span) + '\n' for span in spans)
+
+    def _handler(self):
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if self.path != '/v1/traces':
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                collector._collect(json.loads(self.rfile.read(length) or b'{}'))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+        return Handler
@@ -0,0 +1,199 @@
+"""
+Entry point for provider calls made on behalf of an ``AIModelConfig``.
+
+Tasks and workflow nodes call ``ProviderGateway(config).generate_completion()``
+instead of talking to the provider directly, so every call goes through the
+same layers:
+
+1. identical concurrent prompts are coalesced into one upstream call;
+2. on a ``ProviderError`` the configuration's ``fallback_chain`` is tried in order;
+3. each configuration may hedge slow calls (``hedge_percentile``);
+4. an open circuit breaker fails the attempt at once, so the next fallback is tried;
+5. every attempt waits for the configuration's rate limits and concurrency cap,
+   then for a slot on the endpoint's adaptive (AIMD) concurrency limit.
+
+``stream_completion()`` goes through the same per-attempt layers but yields
+chunks as they arrive. Streams are not coalesced or hedged, and fall back to
+the next configuration only while nothing has been yielded yet.
+
+Providers can be recorded or replayed from an archive (see ``recording``).
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from analytics import metrics, tracing
+from . import hedging, recording
+from .circuit_breaker import get_breaker
+from .concurrency import adaptive_slot
+from .exceptions import CircuitOpenError, ProviderError, ProviderTimeout
+from .providers_registry import ProviderRegistry
+from .rate_limit import estimate_tokens, rate_limiter
+from .singleflight import get_flight, make_key
+
+logger = logging.getLogger(__name__)
+
+provider_calls = metrics.counter(
+    'innoflow_provider_calls_total', 'Provider call attempts, by outcome', ['provider', 'outcome']
+)
+provider_latency = metrics.histogram(
+    'innoflow_provider_call_duration_seconds', 'Provider call time, until the last chunk for streams', ['provider']
+)
+
+
+def _outcome(error):
+    return 'timeout' if isinstance(error, ProviderTimeout) else 'error'
+
+
+def build_provider(model_config):
+    traffic_mode = recording.mode()
+    if traffic_mode == 'replay':
+        return recording.ReplayProvider(model_config.provider, model_config.model_name, model_config.base_url)
+    provider = ProviderRegistry.get_provider(
+        model_config.provider.lower(),
+        api_key=model_config.api_key,
+        model_name=model_config.model_name,
+        base_url=model_config.base_url,
+        timeout=model_config.request_timeout
+    )
+    if traffic_mode == 'record':
+        return recording.RecordingProvider(provider, model_config.provider, model_config.model_name)
+    return provider
+
+
+class _ProviderCall:
+    """One attempt against one configuration. Cancelling it cancels the provider."""
+
+    def __init__(self, model_config, prompt, kwargs):
+        self.model_config = model_config
+        self.provider = build_provider(model_config)
+        self.prompt = prompt
+        self.kwargs = kwargs
+
+    def _allow(self, breaker):
+        try:
+            return breaker.allow()
+        except CircuitOpenError:
+            provider_calls.inc(provider=self.model_config.provider, outcome='rejected')
+            raise
+
+    @contextmanager
+    def _capacity(self, breaker, probe):
+        """Rate limits and concurrency slot for the attempt; a probe that never gets them is given back."""
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(rate_limiter.limit(self.model_config, estimate_tokens(self.prompt, self.kwargs)))
+                stack.enter_context(adaptive_slot(self.model_config))
+            except BaseException:
+                if probe:
+                    breaker.release()
+                raise
+            yield
+
+    def __call__(self):
+        provider = self.model_config.provider
+        with tracing.span('provider.call', provider=provider, model=self.model_config.model_name,
+                          model_config_id=self.model_config.pk):
+            return self._call(provider)
+
+    def _call(self, provider):
+        breaker = get_breaker(self.model_config)
+        probe = self._allow(breaker)
+        with self._capacity(breaker, probe):
+            start = time.monotonic()
+            try:
+                # Time in provider.call outside this span went to the breaker and rate limits
+                with tracing.span('provider.request'):
+                    result = self.provider.generate_completion(self.prompt, **self.kwargs)
+            except Exception as e:
+                breaker.record(False, probe=probe)
+                provider_calls.inc(provider=provider, outcome=_outcome(e))
+                raise
+            latency = time.monotonic() - start
+            breaker.record(True, latency, probe=probe)
+            hedging.latencies.record(self.model_config.pk, latency)
+            provider_calls.inc(provider=provider, outcome='success')
+            provider_latency.observe(latency, provider=provider)
+        return result
+
+    def stream(self):
+        provider = self.model_config.provider
+        breaker = get_breaker(self.model_config)
+        probe = self._allow(breaker)
+        with self._capacity(breaker, probe):
+            start = time.monotonic()
+            try:
+                yield from self.provider.stream_completion(self.prompt, **self.kwargs)
+            except Exception as e:
+                breaker.record(False, probe=probe)
+                provider_calls.inc(provider=provider, outcome=_outcome(e))
+                raise
+            except BaseException:
+                # GeneratorExit when the consumer stops reading; that says nothing about the provider
+                if probe:
+                    breaker.release()
+                raise
+            latency = time.monotonic() - start
+            breaker.record(True, latency, probe=probe)
+            provider_calls.inc(provider=provider, outcome='success')
+            provider_latency.observe(latency, provider=provider)
+
+    def cancel(self):
+        self.provider.cancel()
+
+
+class ProviderGateway:
+    def __init__(self, model_config):
+        self.model_config = model_config
+
+    def generate_completion(self, prompt: str, **kwargs):
+        config = self.model_config
+        key = make_key('completion', config.pk, config.provider, config.model_name, prompt, kwargs)
+        return get_flight('provider').do(key, lambda: self._complete_with_fallbacks(prompt, kwargs))
+
+    def stream_completion(self, prompt: str, **kwargs):
+        last_error = None
+        for position, config in enumerate(self._chain()):
+            started = False
+            try:
+                for chunk in _ProviderCall(config, prompt, kwargs).stream():
+                    started = True
+                    yield chunk
+            except ProviderError as e:
+                if started:
+                    raise
+                logger.warning(f"Provider stream for {config} failed: {e}")
+                last_error = e
+                continue
+            if position:
+                hedging.hedge_stats.record_fallback(self.model_config.pk)
+            return
+        raise last_error
+
+    def _chain(self):
+        chain = [self.model_config]
+        if self.model_config.fallback_chain:
+            chain += self.model_config.get_fallback_configs()
+        return chain
+
+    def _complete_with_fallbacks(self, prompt, kwargs):
+        last_error = None
+        for position, config in enumerate(self._chain()):
+            try:
+                result = self._complete_hedged(config, prompt, kwargs)
+            except ProviderError as e:
+                logger.warning(f"Provider call for {config} failed: {e}")
+                last_error = e
+                continue
+            if position:
+                hedging.hedge_stats.record_fallback(self.model_config.pk)
+            return result
+        raise last_error
+
+    def _complete_hedged(self, config, prompt, kwargs):
+        primary = _ProviderCall(config, prompt, kwargs)
+        delay = hedging.hedge_delay(config.pk, config.hedge_percentile)
+        if delay is None:
+            return primary()
+        hedge = _ProviderCall(config.hedge_config or config, prompt, kwargs)
+        return hedging.call_with_hedge(config.pk, primary, hedge, delay)
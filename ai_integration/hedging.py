@@ -0,0 +1,170 @@
+"""
+Hedged requests for provider tail latency.
+
+If the primary call hasn't answered after a delay taken from the recent latency
+distribution of its configuration (for example its p95), a second "hedge" call
+is started and whichever answers first wins. The slower call is cancelled.
+Latencies, hedge delays and win rates are kept per configuration so the delay
+tracks the provider and can be inspected from ``/ai/runtime-stats/``.
+"""
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from analytics import tracing
+
+
+def _setting(name, default):
+    return getattr(settings, 'AI_HEDGING', {}).get(name, default)
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies (seconds) per key."""
+
+    def __init__(self, window=None):
+        self.window = window or _setting('WINDOW', 500)
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, key, latency):
+        with self._lock:
+            self._samples[key].append(latency)
+
+    def count(self, key):
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key, percentile):
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'calls': 0,
+            'hedged': 0,
+            'primary_wins': 0,
+            'hedge_wins': 0,
+            'hedge_delay_total': 0.0,
+            'last_hedge_delay': None,
+            'fallbacks': 0,
+        })
+
+    def record_call(self, key, hedge_delay=None, winner=None):
+        with self._lock:
+            stats = self._stats[key]
+            stats['calls'] += 1
+            if hedge_delay is not None:
+                stats['hedged'] += 1
+                stats['hedge_delay_total'] += hedge_delay
+                stats['last_hedge_delay'] = hedge_delay
+                if winner:
+                    stats[f'{winner}_wins'] += 1
+
+    def record_fallback(self, key):
+        with self._lock:
+            self._stats[key]['fallbacks'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for key, stats in self._stats.items():
+                stats = dict(stats)
+                hedged = stats['hedged']
+                stats['hedge_win_rate'] = stats['hedge_wins'] / hedged if hedged else None
+                stats['mean_hedge_delay'] = stats['hedge_delay_total'] / hedged if hedged else None
+                snapshot[str(key)] = stats
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+latencies = LatencyTracker()
+hedge_stats = HedgeStats()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_setting('MAX_WORKERS', 32), thread_name_prefix='ai-hedge'
+            )
+        return _executor
+
+
+def hedge_delay(key, percentile):
+    """
+    Seconds to wait before hedging, or None when hedging is off.
+
+    Until enough samples exist the configured ``INITIAL_DELAY`` is used.
+    """
+    if percentile is None:
+        return None
+    if latencies.count(key) < _setting('MIN_SAMPLES', 20):
+        return _setting('INITIAL_DELAY', 2.0)
+    return latencies.percentile(key, percentile)
+
+
+def _cancel(call, future):
+    if not future.cancel():
+        cancel = getattr(call, 'cancel', None)
+        if cancel is not None:
+            cancel()
+
+
+def call_with_hedge(key, primary, hedge, delay):
+    """
+    Run ``primary()``; if it hasn't finished after ``delay`` seconds, also run ``hedge()``.
+
+    Returns the first successful result and cancels the other call. If both
+    fail, the primary's error is raised. ``primary`` and ``hedge`` may expose a
+    ``cancel()`` method that aborts them while running.
+    """
+    executor = get_executor()
+    # Carry the trace over to the pool threads
+    primary_future = executor.submit(tracing.wrap(primary))
+    done, _ = wait([primary_future], timeout=delay)
+    if done:
+        hedge_stats.record_call(key)
+        return primary_future.result()
+
+    hedge_future = executor.submit(tracing.wrap(hedge))
+    calls = {primary_future: ('primary', primary), hedge_future: ('hedge', hedge)}
+    pending = set(calls)
+    errors = {}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            name, _ = calls[future]
+            if future.exception() is not None:
+                errors[name] = future.exception()
+                continue
+            for other in pending:
+                _cancel(calls[other][1], other)
+            hedge_stats.record_call(key, hedge_delay=delay, winner=name)
+            return future.result()
+
+    hedge_stats.record_call(key, hedge_delay=delay, winner=None)
+    raise errors['primary']
+
+
+def stats():
+    return hedge_stats.snapshot()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ai_integration.tasks import warmup_ollama_models
+
+
+class Command(BaseCommand):
+    help = 'Load every configured Ollama model into memory ahead of the first request'
+
+    def handle(self, *args, **options):
+        loaded = warmup_ollama_models()
+        self.stdout.write(f'Preloaded {len(loaded)} Ollama model configuration(s)')
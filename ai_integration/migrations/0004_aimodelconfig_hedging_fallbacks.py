@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0003_alter_aimodelconfig_parameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='fallback_chain',
+            field=models.JSONField(blank=True, default=list, help_text='Ordered list of AIModelConfig ids to try when this configuration fails'),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='hedge_config',
+            field=models.ForeignKey(blank=True, help_text='Configuration that receives hedged requests. Defaults to this configuration.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ai_integration.aimodelconfig'),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='hedge_percentile',
+            field=models.FloatField(blank=True, help_text='Send a hedged request once the primary is slower than this latency percentile (e.g. 95). Empty disables hedging.', null=True),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='request_timeout',
+            field=models.FloatField(default=60.0, help_text='Seconds before a provider call is abandoned'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0004_aimodelconfig_hedging_fallbacks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='max_concurrency',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum provider calls in flight across all workers', null=True),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='rate_limit_scope',
+            field=models.CharField(choices=[('config', 'Per configuration'), ('api_key', 'Per API key')], default='config', help_text='Share limits between every configuration using the same API key, or keep them per configuration', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='requests_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aimodelconfig',
+            name='tokens_per_minute',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
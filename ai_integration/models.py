@@ -20,9 +20,42 @@ class AIModelConfig(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     parameters = models.JSONField(default=dict)
     model_type = models.CharField(max_length=255)
+    request_timeout = models.FloatField(default=60.0, help_text="Seconds before a provider call is abandoned")
+    hedge_percentile = models.FloatField(
+        null=True, blank=True,
+        help_text="Send a hedged request once the primary is slower than this latency percentile (e.g. 95). Empty disables hedging."
+    )
+    hedge_config = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+        help_text="Configuration that receives hedged requests. Defaults to this configuration."
+    )
+    fallback_chain = models.JSONField(
+        default=list, blank=True,
+        help_text="Ordered list of AIModelConfig ids to try when this configuration fails"
+    )
+
+    RATE_LIMIT_SCOPE_CHOICES = [
+        ('config', 'Per configuration'),
+        ('api_key', 'Per API key'),
+    ]
+    requests_per_second = models.FloatField(null=True, blank=True)
+    tokens_per_minute = models.PositiveIntegerField(null=True, blank=True)
+    max_concurrency = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Maximum provider calls in flight across all workers"
+    )
+    rate_limit_scope = models.CharField(
+        max_length=20, choices=RATE_LIMIT_SCOPE_CHOICES, default='config',
+        help_text="Share limits between every configuration using the same API key, or keep them per configuration"
+    )
 
     def __str__(self):
         return f"{self.provider}: {self.model_name}"
+
+    def get_fallback_configs(self):
+        """Active configurations from ``fallback_chain``, in declared order."""
+        ids = [pk for pk in self.fallback_chain if pk != self.pk]
+        configs = AIModelConfig.objects.in_bulk(ids)
+        return [configs[pk] for pk in ids if pk in configs and configs[pk].is_active]
     
     class Meta:
         verbose_name = "AI Model Configuration"
@@ -8,6 +8,7 @@ class ProviderRegistry:
     _providers = {
         "OPENAI": OpenAIProvider,
         "CLAUDE": ClaudeProvider,
+        "ANTHROPIC": ClaudeProvider,  # AIModelConfig stores Claude configs under this name
         "HUGGINGFACE": HuggingFaceProvider,
         "DEEPSEEK": DeepSeekProvider,
         "OLLAMA": OllamaProvider,
@@ -25,7 +26,7 @@ class ProviderRegistry:
             raise ValueError(f"Provider '{provider_name}' not found.")
 
         # Remove base_url for providers that don't need it
-        if key not in ["OLLAMA"]:
+        if key not in ["OLLAMA", "OPENAI", "CLAUDE", "ANTHROPIC", "DEEPSEEK"]:
             kwargs.pop("base_url", None)
 
         return provider_class(**kwargs)
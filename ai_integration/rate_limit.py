@@ -0,0 +1,173 @@
+"""
+Rate limiting and concurrency caps for provider calls.
+
+Limits are declared on ``AIModelConfig`` (``requests_per_second``,
+``tokens_per_minute``, ``max_concurrency``) and enforced through the
+coordination backend, so every worker shares the same token buckets and
+concurrency slots. With ``rate_limit_scope='api_key'`` all configurations that
+use the same key share one set of limits.
+
+Callers over the limit don't fail: they wait in a FIFO queue and only the
+head of the queue tries to take capacity, so an early caller can't be starved
+by later ones. A caller that waits longer than ``MAX_WAIT`` gets a
+``RateLimitTimeout``, which the gateway treats like any other provider error.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .backends import get_backend
+from .exceptions import RateLimitTimeout
+
+
+def _setting(name, default):
+    return getattr(settings, 'AI_RATE_LIMITS', {}).get(name, default)
+
+
+def estimate_tokens(prompt, kwargs) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion budget."""
+    completion = kwargs.get('max_tokens') or kwargs.get('max_tokens_to_sample') or kwargs.get('num_predict') or 0
+    return len(prompt) // 4 + 1 + int(completion)
+
+
+def limit_key(model_config) -> str:
+    if model_config.rate_limit_scope == 'api_key' and model_config.api_key:
+        digest = hashlib.sha256(model_config.api_key.encode('utf-8')).hexdigest()[:16]
+        return f'key:{digest}'
+    return f'config:{model_config.pk}'
+
+
+def has_limits(model_config) -> bool:
+    return bool(model_config.requests_per_second or model_config.tokens_per_minute or model_config.max_concurrency)
+
+
+class RateLimitStats:
+    """Per-process queue depth and wait time metrics, keyed by limit key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'waiting': 0,
+            'acquired': 0,
+            'timeouts': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        })
+
+    def enter_queue(self, key):
+        with self._lock:
+            self._stats[key]['waiting'] += 1
+
+    def leave_queue(self, key, waited, acquired):
+        with self._lock:
+            stats = self._stats[key]
+            stats['waiting'] -= 1
+            stats['acquired' if acquired else 'timeouts'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+
+    def snapshot(self):
+        backend = get_backend()
+        with self._lock:
+            snapshot = {}
+            for key, stats in self._stats.items():
+                stats = dict(stats)
+                finished = stats['acquired'] + stats['timeouts']
+                stats['mean_wait'] = stats['wait_total'] / finished if finished else None
+                stats['queue_depth'] = backend.queue_length(f'ratelimit:{key}:queue')
+                snapshot[key] = stats
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+rate_limit_stats = RateLimitStats()
+
+
+class RateLimiter:
+    def __init__(self, backend=None, poll_interval=None, max_wait=None, slot_ttl=None):
+        self._backend = backend
+        self.poll_interval = poll_interval or _setting('POLL_INTERVAL', 0.05)
+        self.max_wait = max_wait or _setting('MAX_WAIT', 300.0)
+        self.slot_ttl = slot_ttl or _setting('SLOT_TTL', 600.0)
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _buckets(self, model_config, key, tokens):
+        buckets = []
+        rps = model_config.requests_per_second
+        if rps:
+            buckets.append((f'ratelimit:{key}:requests', max(1.0, rps), rps, 1))
+        tpm = model_config.tokens_per_minute
+        if tpm:
+            # A single call larger than the whole bucket would otherwise wait forever
+            buckets.append((f'ratelimit:{key}:tokens', tpm, tpm / 60.0, min(tokens, tpm)))
+        return buckets
+
+    @contextmanager
+    def limit(self, model_config, tokens=1):
+        """Block until ``model_config`` has capacity for a call costing ``tokens``, then hold a slot."""
+        if not has_limits(model_config):
+            yield
+            return
+
+        key = limit_key(model_config)
+        backend = self.backend
+        queue = f'ratelimit:{key}:queue'
+        slots = f'ratelimit:{key}:slots'
+        ticket = uuid.uuid4().hex
+        buckets = self._buckets(model_config, key, tokens)
+        cap = model_config.max_concurrency
+        # Waiters that stop polling for this long are dropped from the queue
+        stale_after = max(5.0, self.poll_interval * 20)
+
+        start = time.monotonic()
+        holding_slot = False
+        rate_limit_stats.enter_queue(key)
+        backend.queue_join(queue, ticket)
+        try:
+            while True:
+                waited = time.monotonic() - start
+                if waited > self.max_wait:
+                    raise RateLimitTimeout(f"Waited {waited:.1f}s for capacity on {key}")
+
+                backend.queue_touch(queue, ticket)
+                pause = self.poll_interval
+                if backend.queue_head(queue, stale_after) == ticket:
+                    if cap and not holding_slot:
+                        holding_slot = backend.acquire_slot(slots, ticket, cap, self.slot_ttl)
+                    if holding_slot or not cap:
+                        pause = backend.take_tokens(buckets) if buckets else 0.0
+                        if not pause:
+                            break
+                time.sleep(min(pause, self.poll_interval * 10))
+        except BaseException:
+            if holding_slot:
+                backend.release_slot(slots, ticket)
+            backend.queue_leave(queue, ticket)
+            rate_limit_stats.leave_queue(key, time.monotonic() - start, acquired=False)
+            raise
+
+        backend.queue_leave(queue, ticket)
+        rate_limit_stats.leave_queue(key, time.monotonic() - start, acquired=True)
+        try:
+            yield
+        finally:
+            if holding_slot:
+                backend.release_slot(slots, ticket)
+
+
+rate_limiter = RateLimiter()
+
+
+def stats():
+    return rate_limit_stats.snapshot()
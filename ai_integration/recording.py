@@ -0,0 +1,272 @@
+"""
+Record and replay provider traffic.
+
+With ``PROVIDER_TRAFFIC['MODE']`` set to ``record``, every provider built by
+the gateway is wrapped in a ``RecordingProvider`` that appends each call to a
+gzipped JSONL archive in ``PROVIDER_TRAFFIC['PATH']``. The archive holds the
+prompt's key, the response or error, the total latency and, for streams, the
+time each chunk arrived. Each process writes its own
+``traffic_<pid>.jsonl.gz``, so Celery prefork workers don't interleave writes.
+
+With ``MODE`` set to ``replay``, the gateway builds a ``ReplayProvider``
+instead of the real one. It serves recorded calls back without touching the
+network, sleeping the recorded latency times ``LATENCY_SCALE`` (1 keeps the
+original timing, 0 answers at once), so whole workflows can be profiled and
+benchmarked offline. Calls are matched on provider, model, prompt and
+parameters; repeats of the same call are served in recorded order, cycling.
+A call that was never recorded fails with a ``ProviderError``.
+
+A call recorded as a stream can be replayed as a plain completion and the
+other way round.
+"""
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+from . import exceptions
+from .ai_providers import AIProvider
+from .exceptions import ProviderError
+
+logger = logging.getLogger(__name__)
+
+MODES = ('record', 'replay')
+
+
+def _setting(name, default):
+    return getattr(settings, 'PROVIDER_TRAFFIC', {}).get(name, default)
+
+
+def mode():
+    value = _setting('MODE', None) or None
+    if value is not None and value not in MODES:
+        raise ValueError(f"Unknown PROVIDER_TRAFFIC mode {value!r}; expected one of {MODES}")
+    return value
+
+
+def call_key(provider, model_name, prompt, kwargs) -> str:
+    data = json.dumps([provider.upper(), model_name, prompt, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class ArchiveWriter:
+    """Appends entries to this process's archive file; entries are flushed as they are written."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def write(self, entry):
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not share the parent's file handle
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = gzip.open(os.path.join(self.directory, f'traffic_{os.getpid()}.jsonl.gz'), 'at')
+                self._pid = os.getpid()
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._pid = None
+
+
+def read_archive(directory):
+    """Every recorded entry under ``directory``, file by file in recording order."""
+    entries = []
+    for path in sorted(glob.glob(os.path.join(directory, 'traffic_*.jsonl.gz'))):
+        try:
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            # A process that was killed leaves its last gzip member unterminated; the flushed lines before it are intact
+            logger.warning(f"Provider traffic archive {path} ends early; using the entries before that")
+        except ValueError as e:
+            logger.warning(f"Skipping the rest of {path}: {e}")
+    return entries
+
+
+class Archive:
+    """Recorded entries grouped by call key, served in order and cycling."""
+
+    def __init__(self, entries):
+        self.entries = {}
+        for entry in entries:
+            self.entries.setdefault(entry['key'], []).append(entry)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory):
+        return cls(read_archive(directory))
+
+    def next(self, key):
+        recorded = self.entries.get(key)
+        if not recorded:
+            return None
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        return recorded[position % len(recorded)]
+
+
+_writer = None
+_archive = None
+_state_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _state_lock:
+        if _writer is None:
+            _writer = ArchiveWriter(_setting('PATH', 'provider-traffic'))
+            atexit.register(_writer.close)
+        return _writer
+
+
+def get_archive():
+    global _archive
+    with _state_lock:
+        if _archive is None:
+            _archive = Archive.load(_setting('PATH', 'provider-traffic'))
+        return _archive
+
+
+def reset():
+    """Close the writer and forget the loaded archive, e.g. after changing ``PROVIDER_TRAFFIC``."""
+    global _writer, _archive
+    with _state_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer = None
+        _archive = None
+
+
+def _error_entry(error):
+    return {'type': type(error).__name__, 'message': str(error)}
+
+
+def _raise_recorded(error):
+    error_class = getattr(exceptions, error['type'], None)
+    if not (isinstance(error_class, type) and issubclass(error_class, ProviderError)) or error_class is exceptions.CircuitOpenError:
+        error_class = ProviderError
+    raise error_class(error['message'])
+
+
+class RecordingProvider(AIProvider):
+    """Passes calls through to ``provider`` and records each one."""
+
+    def __init__(self, provider, provider_name, model_name, writer=None):
+        self.provider = provider
+        self.provider_name = provider_name
+        self.model_name = model_name
+        self.writer = writer or get_writer()
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+    def _record(self, method, prompt, kwargs, latency, response=None, chunks=None, error=None):
+        self.writer.write({
+            'key': call_key(self.provider_name, self.model_name, prompt, kwargs),
+            'provider': self.provider_name,
+            'model': self.model_name,
+            'method': method,
+            'prompt': prompt[:200],
+            'response': response,
+            'chunks': chunks,
+            'latency': round(latency, 6),
+            'error': error,
+            'recorded_at': time.time(),
+        })
+
+    def generate_completion(self, prompt: str, **kwargs):
+        start = time.monotonic()
+        try:
+            response = self.provider.generate_completion(prompt, **kwargs)
+        except ProviderError as e:
+            self._record('complete', prompt, kwargs, time.monotonic() - start, error=_error_entry(e))
+            raise
+        self._record('complete', prompt, kwargs, time.monotonic() - start, response=response)
+        return response
+
+    def stream_completion(self, prompt: str, **kwargs):
+        start = time.monotonic()
+        chunks = []
+        try:
+            for chunk in self.provider.stream_completion(prompt, **kwargs):
+                chunks.append([round(time.monotonic() - start, 6), chunk])
+                yield chunk
+        except ProviderError as e:
+            self._record('stream', prompt, kwargs, time.monotonic() - start, chunks=chunks, error=_error_entry(e))
+            raise
+        self._record('stream', prompt, kwargs, time.monotonic() - start, chunks=chunks)
+
+    def cancel(self):
+        self.provider.cancel()
+
+
+class ReplayProvider(AIProvider):
+    """Serves recorded calls for one provider and model."""
+
+    def __init__(self, provider_name, model_name, base_url=None, archive=None, latency_scale=None):
+        self.provider_name = provider_name
+        self.model_name = model_name
+        self.base_url = base_url
+        self.archive = archive or get_archive()
+        self.latency_scale = _setting('LATENCY_SCALE', 1.0) if latency_scale is None else latency_scale
+        self._cancelled = threading.Event()
+
+    def _entry(self, prompt, kwargs):
+        entry = self.archive.next(call_key(self.provider_name, self.model_name, prompt, kwargs))
+        if entry is None:
+            raise ProviderError(f"No recorded {self.provider_name} {self.model_name} response for prompt {prompt[:50]!r}")
+        return entry
+
+    def _wait(self, seconds):
+        if seconds > 0 and self._cancelled.wait(seconds * self.latency_scale):
+            raise ProviderError('Replayed call was cancelled')
+
+    def generate_completion(self, prompt: str, **kwargs):
+        entry = self._entry(prompt, kwargs)
+        self._wait(entry['latency'])
+        if entry['error']:
+            _raise_recorded(entry['error'])
+        if entry['response'] is not None:
+            return entry['response']
+        return ''.join(chunk for _, chunk in entry['chunks'])
+
+    def stream_completion(self, prompt: str, **kwargs):
+        entry = self._entry(prompt, kwargs)
+        chunks = entry['chunks']
+        if chunks is None:
+            chunks = [] if entry['error'] else [[entry['latency'], entry['response']]]
+        elapsed = 0.0
+        for offset, chunk in chunks:
+            self._wait(offset - elapsed)
+            elapsed = offset
+            yield chunk
+        self._wait(entry['latency'] - elapsed)
+        if entry['error']:
+            _raise_recorded(entry['error'])
+
+    def preload(self):
+        pass
+
+    def cancel(self):
+        self._cancelled.set()
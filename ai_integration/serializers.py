@@ -5,7 +5,11 @@ from .models import TaskStatus
 class AIModelConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = AIModelConfig
-        fields = ['id', 'name', 'provider', 'model_name', 'is_active', 'parameters']
+        fields = [
+            'id', 'name', 'provider', 'model_name', 'is_active', 'parameters',
+            'request_timeout', 'hedge_percentile', 'hedge_config', 'fallback_chain',
+            'requests_per_second', 'tokens_per_minute', 'max_concurrency', 'rate_limit_scope'
+        ]
 
 class ModelResponseSerializer(serializers.ModelSerializer):
     model_config = AIModelConfigSerializer()
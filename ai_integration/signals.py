@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with model_config, latency and error when a model call for a comparison fails.
+# Successful calls are visible as saved ModelResponse rows.
+model_call_failed = Signal()
@@ -0,0 +1,182 @@
+"""
+Request coalescing ("single-flight") for identical in-flight calls.
+
+When several callers ask for the same thing at the same time, only the first
+one (the leader) does the work. The rest (followers) wait for it and get the
+same result, or the same exception.
+
+In-process coalescing is always on. With ``cross_process=True`` the leader also
+takes a lock in the coordination backend (see ``ai_integration.backends``) and
+publishes its outcome there, so that followers in other worker processes can
+reuse it instead of calling the provider again.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+
+from analytics import metrics
+from .backends import get_backend
+from .exceptions import CoalescedCallError
+
+flight_calls = metrics.counter(
+    'innoflow_singleflight_calls_total',
+    'Single-flight calls by how they were served: leader_calls ran the work, the others reused its result',
+    ['group', 'result']
+)
+
+
+def make_key(*parts) -> str:
+    """Build a stable key from JSON-serialisable call arguments."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+_local = threading.local()
+
+
+def shared_results_in_thread() -> int:
+    """How many calls made by the current thread got another caller's result, across all groups."""
+    return getattr(_local, 'shared', 0)
+
+
+def _count_shared():
+    _local.shared = shared_results_in_thread() + 1
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name, cross_process=False, backend=None, lock_timeout=120.0,
+                 result_ttl=10.0, poll_interval=0.05):
+        self.name = name
+        self.cross_process = cross_process
+        self._backend = backend
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'leader_calls': 0, 'coalesced': 0, 'remote_coalesced': 0}
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+        flight_calls.inc(group=self.name, result=counter)
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless an identical call (same ``key``) is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            flight_calls.inc(group=self.name, result='coalesced')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            _count_shared()
+            return call.result
+
+        try:
+            call.result = self._run_leader(key, fn)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_leader(self, key, fn):
+        if not self.cross_process:
+            self._count('leader_calls')
+            return fn()
+
+        lock_key = f'singleflight:{self.name}:lock:{key}'
+        result_key = f'singleflight:{self.name}:result:{key}'
+        backend = self.backend
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            if backend.add(lock_key, 1, ttl=self.lock_timeout):
+                self._count('leader_calls')
+                try:
+                    result = fn()
+                except Exception as exc:
+                    backend.set(result_key, {'error': f'{type(exc).__name__}: {exc}'}, ttl=self.result_ttl)
+                    raise
+                else:
+                    backend.set(result_key, {'result': result}, ttl=self.result_ttl)
+                    return result
+                finally:
+                    backend.delete(lock_key)
+
+            # Another process holds the lock: wait for its outcome
+            while backend.get(lock_key) is not None and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+            outcome = backend.get(result_key)
+            if outcome is not None:
+                self._count('remote_coalesced')
+                if 'error' in outcome:
+                    raise CoalescedCallError(outcome['error'])
+                _count_shared()
+                return outcome['result']
+            # The other leader vanished without publishing anything, so try to take over
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        stats['calls_saved'] = stats['coalesced'] + stats['remote_coalesced']
+        return stats
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name, cross_process=None) -> SingleFlight:
+    """
+    Return the shared ``SingleFlight`` group called ``name``.
+
+    Defaults come from the ``AI_SINGLEFLIGHT`` setting. Passing
+    ``cross_process=False`` forces a local-only group, for results that can't
+    be stored in the backend as JSON.
+    """
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            config = getattr(settings, 'AI_SINGLEFLIGHT', {})
+            if cross_process is None:
+                cross_process = config.get('CROSS_PROCESS', False)
+            flight = _flights[name] = SingleFlight(
+                name,
+                cross_process=cross_process,
+                lock_timeout=config.get('LOCK_TIMEOUT', 120.0),
+                result_ttl=config.get('RESULT_TTL', 10.0),
+            )
+        return flight
+
+
+def stats() -> dict:
+    """Counters for every single-flight group created in this process."""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
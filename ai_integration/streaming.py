@@ -0,0 +1,76 @@
+"""
+Helpers for forwarding streamed completions to clients.
+
+``sse_events`` turns chunks into server-sent events for the HTTP endpoint.
+``iterate_in_thread`` lets async code (ASGI responses, websocket consumers)
+consume a blocking provider stream without blocking the event loop.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from .exceptions import ProviderError
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(data, event=None) -> str:
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_events(chunks):
+    """Wrap ``chunks`` as ``token`` events followed by ``done``, or ``error`` if the stream fails."""
+    try:
+        for chunk in chunks:
+            yield sse_event({'token': chunk})
+    except ProviderError as e:
+        logger.warning(f"Completion stream failed: {e}")
+        yield sse_event({'error': str(e)}, event='error')
+        return
+    yield sse_event({}, event='done')
+
+
+async def iterate_in_thread(iterator):
+    """Consume a blocking iterator in a worker thread and yield its items asynchronously."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    end = object()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # The event loop already shut down; nobody is listening any more
+            stop.set()
+
+    def pump():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(end, e)
+        else:
+            put(end)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    loop.run_in_executor(None, pump)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        # If the client went away, the worker stops at the next chunk instead of reading the whole stream
+        stop.set()
@@ -1,23 +1,31 @@
 from celery import shared_task
+from celery.signals import worker_ready
+from django.conf import settings
 from ai_integration.models import AIModelConfig, ModelComparison, ModelResponse
-from ai_integration.providers_registry import ProviderRegistry
+from ai_integration.gateway import ProviderGateway, build_provider
+from ai_integration.exceptions import ProviderError
+from ai_integration.signals import model_call_failed
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 @shared_task
 def run_ai_model_task(model_config_id: int, prompt: str, comparison_id: int) -> str:
     model_config = AIModelConfig.objects.get(id=model_config_id)
     
     start_time = time.time()
     
-    # Use the provider registry to generate completion
-    provider = ProviderRegistry.get_provider(
-        model_config.provider.lower(),
-        api_key=model_config.api_key,
-        model_name=model_config.model_name,
-        base_url=model_config.base_url
-    )
+    # Go through the gateway so identical in-flight prompts share one provider call
+    gateway = ProviderGateway(model_config)
     
-    response = provider.generate_completion(prompt)
+    try:
+        response = gateway.generate_completion(prompt)
+    except ProviderError as e:
+        model_call_failed.send(
+            sender=run_ai_model_task, model_config=model_config, latency=time.time() - start_time, error=e
+        )
+        raise
     
     latency = time.time() - start_time
     
@@ -30,4 +38,27 @@ def run_ai_model_task(model_config_id: int, prompt: str, comparison_id: int) ->
         latency=latency
     )
     
-    return response
\ No newline at end of file
+    return response
+
+@shared_task
+def warmup_ollama_models() -> list:
+    """Load every configured Ollama model so the first real request doesn't pay for the cold start."""
+    loaded = []
+    seen = set()
+    for model_config in AIModelConfig.objects.filter(provider='OLLAMA'):
+        provider = build_provider(model_config)
+        if (provider.base_url, provider.model_name) in seen:
+            continue
+        seen.add((provider.base_url, provider.model_name))
+        try:
+            provider.preload()
+        except ProviderError as e:
+            logger.warning(f"Could not preload {model_config}: {e}")
+            continue
+        loaded.append(model_config.id)
+    return loaded
+
+@worker_ready.connect
+def warmup_on_worker_start(sender=None, **kwargs):
+    if getattr(settings, 'AI_OLLAMA', {}).get('WARMUP_ON_WORKER_START', False):
+        warmup_ollama_models.delay()
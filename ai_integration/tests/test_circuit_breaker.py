@@ -0,0 +1,81 @@
+from unittest import TestCase
+from unittest.mock import patch
+from ai_integration.backends import MemoryBackend
+from ai_integration.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from ai_integration.exceptions import CircuitOpenError, ProviderError
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.now = 1000.0
+        patcher = patch('ai_integration.circuit_breaker.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_breaker(self, backend=None):
+        return CircuitBreaker(
+            '1', backend=backend or self.backend, failure_rate=0.5, min_calls=4,
+            window=60, buckets=6, slow_call_seconds=5, cooldown=30, probe_timeout=60
+        )
+
+    def trip(self, breaker):
+        for _ in range(4):
+            breaker.allow()
+            breaker.record(False)
+
+    def test_opens_when_failure_rate_reached(self):
+        breaker = self.make_breaker()
+        breaker.record(True)
+        breaker.record(True)
+        breaker.record(False)
+        self.assertEqual(breaker.state(), CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state(), OPEN)
+        with self.assertRaises(CircuitOpenError) as cm:
+            breaker.allow()
+        self.assertIsInstance(cm.exception, ProviderError)
+        self.assertEqual(cm.exception.retry_after, 30)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self.make_breaker()
+        for _ in range(4):
+            breaker.record(True, latency=10)
+        self.assertEqual(breaker.state(), OPEN)
+
+    def test_old_failures_leave_the_window(self):
+        breaker = self.make_breaker()
+        for _ in range(3):
+            breaker.record(False)
+        self.now += 120
+        breaker.record(False)
+        self.assertEqual(breaker.state(), CLOSED)
+
+    def test_half_open_probe_success_closes(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        self.now += 31
+        self.assertEqual(breaker.state(), HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.record(True, latency=0.1, probe=True)
+        self.assertEqual(breaker.state(), CLOSED)
+        # Failures from before the probe don't count any more
+        breaker.record(False)
+        self.assertEqual(breaker.state(), CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        self.now += 31
+        self.assertTrue(breaker.allow())
+        breaker.record(False, probe=True)
+        self.assertEqual(breaker.state(), OPEN)
+
+    def test_state_is_shared_between_workers(self):
+        worker_a = self.make_breaker()
+        worker_b = self.make_breaker()
+        self.trip(worker_a)
+        with self.assertRaises(CircuitOpenError):
+            worker_b.allow()
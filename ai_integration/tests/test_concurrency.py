@@ -0,0 +1,78 @@
+import threading
+from unittest import TestCase
+from ai_integration.concurrency import AdaptiveLimiter
+from ai_integration.exceptions import ProviderError, RateLimitTimeout
+
+class TestAdaptiveLimiter(TestCase):
+    def make_limiter(self, **kwargs):
+        options = {'target_latency': 1.0, 'initial_limit': 4, 'max_wait': 0.05}
+        options.update(kwargs)
+        return AdaptiveLimiter('OLLAMA:http://localhost:11434', **options)
+
+    def complete(self, limiter, latency, error=False, calls=1):
+        for _ in range(calls):
+            limiter.acquire()
+            limiter.release(latency, error=error)
+
+    def test_limit_grows_additively_while_fast(self):
+        limiter = self.make_limiter()
+        self.complete(limiter, 0.1, calls=4)
+        # One limit's worth of successes adds roughly one slot
+        self.assertGreater(limiter.limit, 4.9)
+        self.assertLess(limiter.limit, 5.1)
+
+    def test_limit_halves_on_errors_once_per_window(self):
+        limiter = self.make_limiter(initial_limit=8)
+        self.complete(limiter, 0.1, error=True)
+        self.assertEqual(limiter.limit, 4)
+        # Further errors within the same window of calls don't cut again
+        self.complete(limiter, 0.1, error=True, calls=3)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_latency_over_target_backs_off(self):
+        limiter = self.make_limiter(initial_limit=8)
+        self.complete(limiter, 2.0)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_never_below_minimum(self):
+        limiter = self.make_limiter(initial_limit=2, min_limit=1)
+        self.complete(limiter, 5.0, calls=20)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_rising_gradient_counts_as_congestion(self):
+        limiter = self.make_limiter(target_latency=100.0, initial_limit=4)
+        self.complete(limiter, 0.1, calls=20)
+        self.complete(limiter, 1.0, calls=10)
+        self.assertGreater(limiter.gradient, 1.5)
+        self.assertGreaterEqual(limiter.decreases, 1)
+
+    def test_callers_wait_for_slots_and_time_out(self):
+        limiter = self.make_limiter(initial_limit=1)
+        limiter.acquire()
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire()
+        self.assertEqual(limiter.snapshot()['waiting'], 0)
+
+    def test_waiter_wakes_when_slot_released(self):
+        limiter = self.make_limiter(initial_limit=1, max_wait=5)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        limiter.release(0.1)
+        thread.join()
+        self.assertTrue(acquired.is_set())
+
+    def test_slot_records_provider_errors(self):
+        limiter = self.make_limiter(initial_limit=1)
+        with self.assertRaises(ProviderError):
+            with limiter.slot():
+                raise ProviderError('down')
+        self.assertEqual(limiter.decreases, 1)
+        self.assertEqual(limiter.in_flight, 0)
@@ -0,0 +1,84 @@
+import threading
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+from ai_integration import hedging
+from ai_integration.exceptions import ProviderError
+from ai_integration.gateway import ProviderGateway
+from ai_integration.models import AIModelConfig
+
+class _SlowCall:
+    def __init__(self, result, delay=0.0, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.cancelled = threading.Event()
+
+    def __call__(self):
+        self.cancelled.wait(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+    def cancel(self):
+        self.cancelled.set()
+
+class TestCallWithHedge(TestCase):
+    def setUp(self):
+        hedging.hedge_stats.clear()
+        hedging.latencies.clear()
+
+    def test_fast_primary_is_not_hedged(self):
+        hedge = _SlowCall('hedge')
+        result = hedging.call_with_hedge('cfg', _SlowCall('primary'), hedge, delay=1.0)
+        self.assertEqual(result, 'primary')
+        self.assertEqual(hedging.stats()['cfg']['hedged'], 0)
+
+    def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        primary = _SlowCall('primary', delay=5.0)
+        result = hedging.call_with_hedge('cfg', primary, _SlowCall('hedge'), delay=0.01)
+        self.assertEqual(result, 'hedge')
+        self.assertTrue(primary.cancelled.is_set())
+        stats = hedging.stats()['cfg']
+        self.assertEqual(stats['hedge_wins'], 1)
+        self.assertEqual(stats['hedge_win_rate'], 1.0)
+        self.assertAlmostEqual(stats['last_hedge_delay'], 0.01)
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        primary = _SlowCall('primary', delay=0.05)
+        hedge = _SlowCall(None, error=ProviderError('boom'))
+        self.assertEqual(hedging.call_with_hedge('cfg', primary, hedge, delay=0.01), 'primary')
+
+    def test_hedge_delay_uses_percentile_once_warm(self):
+        self.assertIsNone(hedging.hedge_delay('cfg', None))
+        for latency in range(1, 101):
+            hedging.latencies.record('cfg', latency / 100)
+        self.assertAlmostEqual(hedging.hedge_delay('cfg', 95), 0.95)
+
+class TestGatewayFallbacks(TestCase):
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_fallback_chain_used_on_error(self, mock_get_provider):
+        fallback = AIModelConfig.objects.create(
+            name="Fallback", provider="OLLAMA", model_name="llama3", base_url="http://localhost:11434"
+        )
+        primary = AIModelConfig.objects.create(
+            name="Primary", provider="DEEPSEEK", model_name="deepseek-chat", api_key="key",
+            fallback_chain=[fallback.id]
+        )
+        failing, working = MagicMock(), MagicMock()
+        failing.generate_completion.side_effect = ProviderError("DeepSeek Error: 503")
+        working.generate_completion.return_value = "fallback answer"
+        mock_get_provider.side_effect = [failing, working]
+
+        result = ProviderGateway(primary).generate_completion("Hello")
+
+        self.assertEqual(result, "fallback answer")
+        self.assertEqual(hedging.stats()[str(primary.pk)]['fallbacks'], 1)
+
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_error_raised_when_chain_exhausted(self, mock_get_provider):
+        config = AIModelConfig.objects.create(
+            name="Primary", provider="DEEPSEEK", model_name="deepseek-chat", api_key="key"
+        )
+        mock_get_provider.return_value.generate_completion.side_effect = ProviderError("down")
+        with self.assertRaises(ProviderError):
+            ProviderGateway(config).generate_completion("Hello")
@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from ai_integration.backends import get_backend, reset_backend
+from ai_integration.exceptions import ProviderError
+from ai_integration.fake_servers import FakeOllamaServer
+from ai_integration.models import AIModelConfig
+from ai_integration.tasks import warmup_ollama_models
+from ai_integration.utils.ollama_provider import OllamaProvider
+
+class TestOllamaProvider(TestCase):
+    def setUp(self):
+        self.server = FakeOllamaServer(tokens=['Hel', 'lo', '!']).start()
+        self.addCleanup(self.server.stop)
+
+    def test_streams_tokens_incrementally(self):
+        provider = OllamaProvider(self.server.url, 'llama3', keep_alive='1h')
+        self.assertEqual(list(provider.stream_completion('Hi')), ['Hel', 'lo', '!'])
+        request = self.server.requests[-1]
+        self.assertTrue(request['stream'])
+        self.assertEqual(request['keep_alive'], '1h')
+
+    def test_generate_joins_stream(self):
+        provider = OllamaProvider(self.server.url, 'llama3')
+        self.assertEqual(provider.generate_completion('Hi'), 'Hello!')
+        self.assertEqual(self.server.loaded['llama3'], '30m')
+
+    def test_error_lines_raise(self):
+        self.server.errors['missing'] = 'model "missing" not found'
+        provider = OllamaProvider(self.server.url, 'missing')
+        with self.assertRaises(ProviderError) as cm:
+            provider.generate_completion('Hi')
+        self.assertIn('not found', str(cm.exception))
+
+    def test_preload_loads_model_once(self):
+        provider = OllamaProvider(self.server.url, 'llama3')
+        provider.preload()
+        self.assertNotIn('prompt', self.server.requests[-1])
+        provider.generate_completion('Hi')
+        self.assertEqual(self.server.cold_loads, 1)
+
+    def test_warmup_preloads_configured_models(self):
+        config = AIModelConfig.objects.create(
+            name="Local", provider="OLLAMA", model_name="llama3", base_url=self.server.url
+        )
+        AIModelConfig.objects.create(name="Duplicate", provider="OLLAMA", model_name="llama3", base_url=self.server.url)
+        self.assertEqual(warmup_ollama_models(), [config.id])
+        self.assertEqual(len(self.server.requests), 1)
+
+    @override_settings(AI_OLLAMA={'PARALLEL': 2, 'POLL_INTERVAL': 0.01})
+    def test_parallel_capacity_is_respected(self):
+        reset_backend()
+        self.addCleanup(reset_backend)
+        self.server.token_delay = 0.02
+        provider_results = []
+
+        def call():
+            provider_results.append(OllamaProvider(self.server.url, 'llama3').generate_completion('Hi'))
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(provider_results, ['Hello!'] * 6)
+        self.assertLessEqual(self.server.max_active, 2)
+
+    @override_settings(AI_OLLAMA={'PARALLEL': 1})
+    def test_long_stream_keeps_its_slot(self):
+        reset_backend()
+        self.addCleanup(reset_backend)
+        now = [1000.0]
+        provider = OllamaProvider(self.server.url, 'llama3', timeout=10)
+        key = f'ollama:{self.server.url}:parallel'
+        with patch('time.monotonic', side_effect=lambda: now[0]):
+            with provider._parallel_slot() as heartbeat:
+                # Every read is inside the timeout, but the stream outlasts the slot's 20s TTL
+                for _ in range(5):
+                    now[0] += 8
+                    heartbeat()
+                self.assertFalse(get_backend().acquire_slot(key, 'other', 1, 1))
+            self.assertTrue(get_backend().acquire_slot(key, 'other', 1, 1))
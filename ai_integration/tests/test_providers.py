@@ -63,7 +63,11 @@ class TestOllamaProvider(TestCase):
         prompt = "Hello, how are you?"
         
         mock_response = MagicMock()
-        mock_response.json.return_value = {"response": "I am fine, thank you!"}
+        # Ollama always streams NDJSON now
+        mock_response.iter_lines.return_value = [
+            b'{"response": "I am fine, thank you!", "done": false}',
+            b'{"response": "", "done": true}',
+        ]
         mock_response.raise_for_status = MagicMock()  # Mock the raise_for_status method
         mock_post.return_value = mock_response
         
@@ -0,0 +1,92 @@
+import threading
+import time
+from unittest import TestCase
+from types import SimpleNamespace
+from ai_integration.backends import MemoryBackend
+from ai_integration.exceptions import RateLimitTimeout
+from ai_integration.rate_limit import RateLimiter, estimate_tokens, limit_key, rate_limit_stats
+
+def make_config(pk=1, **limits):
+    defaults = {
+        'pk': pk, 'api_key': 'secret', 'rate_limit_scope': 'config',
+        'requests_per_second': None, 'tokens_per_minute': None, 'max_concurrency': None,
+    }
+    defaults.update(limits)
+    return SimpleNamespace(**defaults)
+
+class TestMemoryBackendBuckets(TestCase):
+    def test_take_tokens_is_all_or_nothing(self):
+        backend = MemoryBackend()
+        buckets = [('a', 2, 1.0, 1), ('b', 1, 1.0, 1)]
+        self.assertEqual(backend.take_tokens(buckets), 0)
+        wait = backend.take_tokens(buckets)
+        self.assertGreater(wait, 0)
+        # Bucket 'a' still has its second token because nothing was taken on the failed attempt
+        self.assertEqual(backend.take_tokens([('a', 2, 1.0, 1)]), 0)
+
+    def test_concurrency_slots(self):
+        backend = MemoryBackend()
+        self.assertTrue(backend.acquire_slot('s', 'one', 1, ttl=60))
+        self.assertFalse(backend.acquire_slot('s', 'two', 1, ttl=60))
+        backend.release_slot('s', 'one')
+        self.assertTrue(backend.acquire_slot('s', 'two', 1, ttl=60))
+
+class TestRateLimiter(TestCase):
+    def setUp(self):
+        rate_limit_stats.clear()
+        self.limiter = RateLimiter(backend=MemoryBackend(), poll_interval=0.005, max_wait=5)
+
+    def test_unlimited_config_passes_straight_through(self):
+        with self.limiter.limit(make_config()):
+            pass
+        self.assertEqual(rate_limit_stats.snapshot(), {})
+
+    def test_requests_per_second_makes_calls_wait(self):
+        config = make_config(requests_per_second=20)
+        start = time.monotonic()
+        for _ in range(25):
+            with self.limiter.limit(config):
+                pass
+        # 20 tokens of burst, then five more at 20/s
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(rate_limit_stats.snapshot()['config:1']['acquired'], 25)
+
+    def test_max_concurrency_caps_in_flight_calls(self):
+        config = make_config(max_concurrency=2)
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with self.limiter.limit(config):
+                with lock:
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+                time.sleep(0.02)
+                with lock:
+                    in_flight[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_waiting_too_long_raises(self):
+        limiter = RateLimiter(backend=MemoryBackend(), poll_interval=0.005, max_wait=0.05)
+        config = make_config(requests_per_second=0.1)
+        with limiter.limit(config):
+            pass
+        with self.assertRaises(RateLimitTimeout):
+            with limiter.limit(config):
+                pass
+        self.assertEqual(rate_limit_stats.snapshot()['config:1']['timeouts'], 1)
+
+    def test_api_key_scope_shares_limits(self):
+        first = make_config(pk=1, rate_limit_scope='api_key')
+        second = make_config(pk=2, rate_limit_scope='api_key')
+        self.assertEqual(limit_key(first), limit_key(second))
+        self.assertNotEqual(limit_key(make_config(pk=1)), limit_key(make_config(pk=2)))
+
+    def test_estimate_tokens_includes_completion_budget(self):
+        self.assertEqual(estimate_tokens('x' * 40, {'max_tokens': 100}), 111)
@@ -0,0 +1,69 @@
+import tempfile
+import time
+from django.test import TestCase, override_settings
+from ai_integration import recording
+from ai_integration.exceptions import ProviderError, ProviderTimeout
+from ai_integration.fake_servers import FakeOllamaServer
+from ai_integration.gateway import ProviderGateway, build_provider
+from ai_integration.models import AIModelConfig
+
+class RecordReplayTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(recording.reset)
+        self.server = FakeOllamaServer(tokens=['Hel', 'lo', '!'], token_delay=0.02).start()
+        self.addCleanup(self.server.stop)
+        self.config = AIModelConfig.objects.create(
+            name="Local", provider="OLLAMA", model_name="llama3", base_url=self.server.url, model_type="text"
+        )
+
+    def traffic(self, mode, **extra):
+        recording.reset()
+        return override_settings(PROVIDER_TRAFFIC={'MODE': mode, 'PATH': self.tmp.name, **extra})
+
+    def test_replays_recorded_calls_without_the_provider(self):
+        with self.traffic('record'):
+            gateway = ProviderGateway(self.config)
+            self.assertEqual(gateway.generate_completion('Hi'), 'Hello!')
+            self.assertEqual(list(gateway.stream_completion('Stream')), ['Hel', 'lo', '!'])
+            recording.reset()
+        self.server.stop()
+        self.assertEqual(len(recording.read_archive(self.tmp.name)), 2)
+
+        with self.traffic('replay'):
+            gateway = ProviderGateway(self.config)
+            started = time.monotonic()
+            self.assertEqual(gateway.generate_completion('Hi'), 'Hello!')
+            self.assertGreaterEqual(time.monotonic() - started, 0.05)
+            self.assertEqual(list(gateway.stream_completion('Stream')), ['Hel', 'lo', '!'])
+            # Stream recordings also answer plain completions
+            self.assertEqual(build_provider(self.config).generate_completion('Stream'), 'Hello!')
+            with self.assertRaises(ProviderError):
+                build_provider(self.config).generate_completion('Never recorded')
+
+        with self.traffic('replay', LATENCY_SCALE=0):
+            started = time.monotonic()
+            build_provider(self.config).generate_completion('Hi')
+            self.assertLess(time.monotonic() - started, 0.03)
+
+    def test_replays_errors_and_repeats_in_order(self):
+        entry = {'provider': 'OLLAMA', 'model': 'llama3', 'method': 'complete', 'prompt': 'Hi', 'chunks': None, 'latency': 0.0}
+        key = recording.call_key('OLLAMA', 'llama3', 'Hi', {})
+        archive = recording.Archive([
+            {**entry, 'key': key, 'response': 'first', 'error': None},
+            {**entry, 'key': key, 'response': None, 'error': {'type': 'ProviderTimeout', 'message': 'slow'}},
+        ])
+        provider = recording.ReplayProvider('OLLAMA', 'llama3', archive=archive)
+        self.assertEqual(provider.generate_completion('Hi'), 'first')
+        with self.assertRaises(ProviderTimeout):
+            provider.generate_completion('Hi')
+        self.assertEqual(provider.generate_completion('Hi'), 'first')
+
+    def test_unterminated_archive_is_readable(self):
+        writer = recording.ArchiveWriter(self.tmp.name)
+        writer.write({'key': 'a'})
+        writer.write({'key': 'b'})
+        # No close(): as if the worker had been killed
+        self.assertEqual([entry['key'] for entry in recording.read_archive(self.tmp.name)], ['a', 'b'])
+        writer.close()
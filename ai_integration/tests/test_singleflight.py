@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import TestCase
+from ai_integration.backends import MemoryBackend
+from ai_integration.exceptions import CoalescedCallError
+from ai_integration.singleflight import SingleFlight, make_key
+
+class TestSingleFlight(TestCase):
+    def _run_concurrently(self, flight, key, fn, callers=5):
+        results, errors = [], []
+
+        def worker():
+            try:
+                results.append(flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def _wait_for_followers(self, flight, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while flight.stats()['coalesced'] < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertGreaterEqual(flight.stats()['coalesced'], count)
+
+    def test_identical_calls_share_one_upstream_call(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            release.wait(5)
+            return 'shared answer'
+
+        threads, results, errors = self._run_concurrently(flight, make_key('same prompt'), upstream)
+        self._wait_for_followers(flight, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['shared answer'] * 5)
+        self.assertEqual(errors, [])
+        self.assertEqual(flight.stats()['calls_saved'], 4)
+
+    def test_followers_receive_leader_error(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+
+        def upstream():
+            release.wait(5)
+            raise ConnectionError('provider down')
+
+        threads, results, errors = self._run_concurrently(flight, make_key('p'), upstream, callers=3)
+        self._wait_for_followers(flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(isinstance(e, ConnectionError) for e in errors))
+
+    def test_different_keys_are_not_coalesced(self):
+        flight = SingleFlight('test')
+        self.assertEqual(flight.do(make_key('a'), lambda: 'a'), 'a')
+        self.assertEqual(flight.do(make_key('b'), lambda: 'b'), 'b')
+        self.assertEqual(flight.stats()['leader_calls'], 2)
+        self.assertEqual(flight.stats()['calls_saved'], 0)
+
+    def test_cross_process_follower_reuses_published_result(self):
+        backend = MemoryBackend()
+        # Two groups sharing a backend behave like two worker processes
+        worker_a = SingleFlight('test', cross_process=True, backend=backend, poll_interval=0.001)
+        worker_b = SingleFlight('test', cross_process=True, backend=backend, poll_interval=0.001)
+        key = make_key('prompt')
+        started, release = threading.Event(), threading.Event()
+
+        def upstream():
+            started.set()
+            release.wait(5)
+            return 'from worker a'
+
+        leader = threading.Thread(target=lambda: worker_a.do(key, upstream))
+        leader.start()
+        started.wait(5)
+        threading.Timer(0.05, release.set).start()
+        result = worker_b.do(key, lambda: 'from worker b')
+        leader.join()
+
+        self.assertEqual(result, 'from worker a')
+        self.assertEqual(worker_b.stats()['remote_coalesced'], 1)
+
+    def test_cross_process_follower_receives_error(self):
+        backend = MemoryBackend()
+        backend.set('singleflight:test:result:k', {'error': 'ConnectionError: down'})
+        backend.set('singleflight:test:lock:k', 1)
+        flight = SingleFlight('test', cross_process=True, backend=backend, poll_interval=0.001)
+        threading.Timer(0.02, backend.delete, args=['singleflight:test:lock:k']).start()
+        with self.assertRaises(CoalescedCallError):
+            flight.do('k', lambda: 'unused')
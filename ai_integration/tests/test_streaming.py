@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from django.test import TestCase as DjangoTestCase
+from rest_framework.test import APITestCase
+from ai_integration.backends import MemoryBackend
+from ai_integration.circuit_breaker import CircuitBreaker, HALF_OPEN, OPEN
+from ai_integration.exceptions import ProviderError, RateLimitTimeout
+from ai_integration.gateway import _ProviderCall
+from ai_integration.models import AIModelConfig
+from ai_integration.streaming import iterate_in_thread, sse_events
+from ai_integration.utils.deepseek_provider import DeepSeekProvider
+from ai_integration.utils.ollama_provider import OllamaProvider
+
+class TestProviderStreaming(TestCase):
+    @patch('requests.post')
+    def test_deepseek_parses_server_sent_events(self, mock_post):
+        mock_post.return_value.iter_lines.return_value = [
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            '',
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+            'data: {"choices": [{"delta": {"content": "lo"}}]}',
+            'data: [DONE]',
+        ]
+        provider = DeepSeekProvider("key", "deepseek-chat")
+        self.assertEqual(list(provider.stream_completion("Hi")), ["Hel", "lo"])
+        self.assertTrue(mock_post.call_args.kwargs['stream'])
+        self.assertTrue(mock_post.call_args.kwargs['json']['stream'])
+
+    @patch('requests.post')
+    def test_ollama_parses_ndjson(self, mock_post):
+        mock_post.return_value.iter_lines.return_value = [
+            b'{"response": "Hel", "done": false}',
+            b'{"response": "lo", "done": false}',
+            b'{"response": "", "done": true}',
+        ]
+        provider = OllamaProvider("http://localhost:11434", "llama3")
+        self.assertEqual(list(provider.stream_completion("Hi")), ["Hel", "lo"])
+
+    def test_default_stream_yields_whole_completion(self):
+        provider = DeepSeekProvider("key", "deepseek-chat")
+        with patch.object(DeepSeekProvider, 'generate_completion', return_value="all at once"):
+            self.assertEqual(list(super(DeepSeekProvider, provider).stream_completion("Hi")), ["all at once"])
+
+class TestStreamingHelpers(TestCase):
+    def test_sse_events_end_with_done(self):
+        events = list(sse_events(iter(["a", "b"])))
+        self.assertEqual(events[0], 'data: {"token": "a"}\n\n')
+        self.assertEqual(events[-1], 'event: done\ndata: {}\n\n')
+
+    def test_sse_events_report_errors(self):
+        def failing():
+            yield "a"
+            raise ProviderError("boom")
+        events = list(sse_events(failing()))
+        self.assertTrue(events[-1].startswith('event: error'))
+
+    def test_iterate_in_thread(self):
+        async def collect():
+            return [item async for item in iterate_in_thread(iter(range(5)))]
+        self.assertEqual(asyncio.run(collect()), [0, 1, 2, 3, 4])
+
+class TestStreamEndpoint(APITestCase):
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_stream_endpoint_sends_tokens(self, mock_get_provider):
+        mock_get_provider.return_value.stream_completion.return_value = iter(["Hel", "lo"])
+        model_config = AIModelConfig.objects.create(
+            name="Test Model", provider="OPENAI", model_name="gpt-3.5-turbo", api_key="key"
+        )
+        response = self.client.post(f'/ai/aimodelconfig/{model_config.id}/stream/', {'prompt': 'Hi'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        tokens = [json.loads(line[len('data: '):])['token'] for line in body.split('\n') if '"token"' in line]
+        self.assertEqual(tokens, ["Hel", "lo"])
+        self.assertIn('event: done', body)
+
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_stream_falls_back_before_first_token(self, mock_get_provider):
+        fallback = AIModelConfig.objects.create(name="Fallback", provider="OLLAMA", model_name="llama3")
+        primary = AIModelConfig.objects.create(
+            name="Primary", provider="DEEPSEEK", model_name="deepseek-chat", api_key="key",
+            fallback_chain=[fallback.id]
+        )
+        failing, working = MagicMock(), MagicMock()
+        failing.stream_completion.side_effect = ProviderError("down")
+        working.stream_completion.return_value = iter(["ok"])
+        mock_get_provider.side_effect = [failing, working]
+        response = self.client.post(f'/ai/aimodelconfig/{primary.id}/stream/', {'prompt': 'Hi'}, format='json')
+        self.assertIn('"token": "ok"', b''.join(response.streaming_content).decode())
+
+class TestStreamProbe(DjangoTestCase):
+    def setUp(self):
+        self.model_config = AIModelConfig.objects.create(name="Probe", provider="OLLAMA", model_name="llama3")
+        self.breaker = CircuitBreaker('probe', backend=MemoryBackend(), cooldown=30)
+        # Opened long enough ago that the next call is the half-open probe
+        self.breaker.backend.set(self.breaker._key('open'), {'at': time.time() - 60})
+        patcher = patch('ai_integration.gateway.get_breaker', return_value=self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_closing_the_stream_early_releases_the_probe(self, mock_get_provider):
+        mock_get_provider.return_value.stream_completion.return_value = iter(["Hel", "lo"])
+        stream = _ProviderCall(self.model_config, 'Hi', {}).stream()
+        self.assertEqual(next(stream), "Hel")
+        stream.close()
+        self.assertEqual(self.breaker.state(), HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_unexpected_errors_fail_the_probe(self, mock_get_provider):
+        mock_get_provider.return_value.stream_completion.side_effect = KeyError('choices')
+        with self.assertRaises(KeyError):
+            list(_ProviderCall(self.model_config, 'Hi', {}).stream())
+        self.assertEqual(self.breaker.state(), OPEN)
+
+    @patch('ai_integration.gateway.rate_limiter.limit', side_effect=RateLimitTimeout("Waited 5.0s for capacity"))
+    @patch('ai_integration.providers_registry.ProviderRegistry.get_provider')
+    def test_rate_limit_timeout_releases_the_probe(self, mock_get_provider, mock_limit):
+        call = _ProviderCall(self.model_config, 'Hi', {})
+        with self.assertRaises(RateLimitTimeout):
+            call()
+        with self.assertRaises(RateLimitTimeout):
+            list(call.stream())
+        mock_get_provider.return_value.generate_completion.assert_not_called()
+        # Nothing reached the provider, so the next call gets to probe
+        self.assertEqual(self.breaker.state(), HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
@@ -1,4 +1,6 @@
+from unittest.mock import patch
 from rest_framework.test import APITestCase
+from ai_integration.exceptions import ProviderError
 from ai_integration.models import AIModelConfig, ModelResponse, ModelComparison, TaskStatus
 
 class TestAIModelConfigViewSet(APITestCase):
@@ -35,6 +37,21 @@ class TestModelComparisonViewSet(APITestCase):
         # task_result = AsyncResult(task_id)
         # self.assertEqual(task_result.status, 'PENDING')
 
+    def test_compare_models_records_provider_errors(self):
+        model_config = AIModelConfig.objects.create(
+            name="Test Model",
+            provider="OPENAI",
+            model_name="gpt-3.5-turbo",
+            api_key="your_openai_api_key"
+        )
+        with patch('ai_integration.views.ProviderGateway.generate_completion', side_effect=ProviderError('upstream down')), \
+                patch('ai_integration.views.run_ai_model_task.delay'):
+            response = self.client.post(
+                '/ai/modelcomparison/compare-models/', {'prompt': 'Hi', 'models': [model_config.id]}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['results'], {'Test Model': {'error': 'upstream down'}})
+
 class TestTaskStatusViewSet(APITestCase):
     def test_list_task_status(self):
         TaskStatus.objects.create(
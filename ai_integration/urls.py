@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     AIModelConfigViewSet,
     ModelComparisonViewSet,
-    TaskStatusViewSet
+    TaskStatusViewSet,
+    runtime_stats
 )
 
 router = DefaultRouter()
@@ -13,4 +14,5 @@ router.register(r'taskstatus', TaskStatusViewSet, basename='taskview')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('runtime-stats/', runtime_stats, name='runtime-stats'),
 ]
\ No newline at end of file
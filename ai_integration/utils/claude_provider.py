@@ -1,21 +1,47 @@
 import anthropic
 from django.conf import settings
 from ..ai_providers import AIProvider
+from ..exceptions import ProviderError
 
 class ClaudeProvider(AIProvider):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model_name: str = "claude-2", timeout: float = None, base_url: str = None):
         self.api_key = api_key
+        self.model_name = model_name or "claude-2"
+        self.timeout = timeout or self.default_timeout
+        self.base_url = base_url
+
+    def _client(self):
+        if self.base_url:
+            return anthropic.Client(self.api_key, base_url=self.base_url)
+        return anthropic.Client(self.api_key)
 
     def generate_completion(self, prompt: str, **kwargs):
         try:
-            client = anthropic.Client(self.api_key)
+            client = self._client()
             response = client.completions.create(
                 prompt=f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}",
-                model="claude-2",
+                model=self.model_name,
                 max_tokens_to_sample=1000,
+                timeout=self.timeout,
                 **kwargs
             )
             return response.completion
         except Exception as e:
-            print(f"Claude Error: {e}")
-            return None
\ No newline at end of file
+            raise ProviderError(f"Claude Error: {e}") from e
+
+    def stream_completion(self, prompt: str, **kwargs):
+        try:
+            client = self._client()
+            events = client.completions.create(
+                prompt=f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}",
+                model=self.model_name,
+                max_tokens_to_sample=1000,
+                timeout=self.timeout,
+                stream=True,
+                **kwargs
+            )
+            for event in events:
+                if event.completion:
+                    yield event.completion
+        except Exception as e:
+            raise ProviderError(f"Claude Error: {e}") from e
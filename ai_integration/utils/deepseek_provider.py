@@ -1,30 +1,68 @@
+import json
 import requests
 from django.conf import settings
 from ..ai_providers import AIProvider
+from ..exceptions import ProviderError, ProviderTimeout
 
 class DeepSeekProvider(AIProvider):
-    def __init__(self, api_key: str, model_name: str):
+    url = "https://api.deepseek.com/v1/chat/completions"
+
+    def __init__(self, api_key: str, model_name: str, timeout: float = None, base_url: str = None):
         self.api_key = api_key
         self.model_name = model_name
+        self.timeout = timeout or self.default_timeout
+        if base_url:
+            self.url = f"{base_url.rstrip('/')}/v1/chat/completions"
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(self, prompt, **kwargs):
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            **kwargs
+        }
 
     def generate_completion(self, prompt: str, **kwargs):
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": self.model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                **kwargs
-            }
             response = requests.post(
-                "https://api.deepseek.com/v1/chat/completions",
-                headers=headers,
-                json=payload
+                self.url,
+                headers=self._headers(),
+                json=self._payload(prompt, **kwargs),
+                timeout=self.timeout
             )
             response.raise_for_status()
             return response.json()["choices"][0]["message"]["content"]
+        except requests.Timeout as e:
+            raise ProviderTimeout(f"DeepSeek timed out after {self.timeout}s") from e
+        except Exception as e:
+            raise ProviderError(f"DeepSeek Error: {e}") from e
+
+    def stream_completion(self, prompt: str, **kwargs):
+        try:
+            response = requests.post(
+                self.url,
+                headers=self._headers(),
+                json=self._payload(prompt, stream=True, **kwargs),
+                timeout=self.timeout,
+                stream=True
+            )
+            response.raise_for_status()
+            # OpenAI-compatible server-sent events: "data: {...}" lines, then "data: [DONE]"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                content = json.loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+        except requests.Timeout as e:
+            raise ProviderTimeout(f"DeepSeek timed out after {self.timeout}s") from e
         except Exception as e:
-            print(f"DeepSeek Error: {e}")
-            return None
\ No newline at end of file
+            raise ProviderError(f"DeepSeek Error: {e}") from e
@@ -1,9 +1,12 @@
 from transformers import pipeline
 from ..ai_providers import AIProvider
+from ..exceptions import ProviderError
 
 class HuggingFaceProvider(AIProvider):
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, api_key: str = None, timeout: float = None):
+        # Runs locally: api_key and timeout are accepted so the registry can build every provider the same way
         self.model_name = model_name
+        self.timeout = timeout or self.default_timeout
 
     def generate_completion(self, prompt: str, **kwargs):
         try:
@@ -11,5 +14,4 @@ class HuggingFaceProvider(AIProvider):
             result = generator(prompt, **kwargs)
             return result[0]["generated_text"]
         except Exception as e:
-            print(f"HuggingFace Error: {e}")
-            return None
\ No newline at end of file
+            raise ProviderError(f"HuggingFace Error: {e}") from e
@@ -1,23 +1,154 @@
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
 import requests
+from django.conf import settings
+
 from ..ai_providers import AIProvider
+from ..backends import get_backend
+from ..exceptions import ProviderError, ProviderTimeout, RateLimitTimeout
+
+
+def _setting(name, default):
+    return getattr(settings, 'AI_OLLAMA', {}).get(name, default)
+
+
+def parallel_capacity(base_url: str) -> int:
+    """Requests the Ollama server at ``base_url`` handles at once (its ``OLLAMA_NUM_PARALLEL``)."""
+    by_server = _setting('PARALLEL_BY_SERVER', {})
+    return by_server.get(base_url.rstrip('/'), _setting('PARALLEL', 0))
+
 
 class OllamaProvider(AIProvider):
-    def __init__(self, base_url: str, model_name: str):
-        self.base_url = base_url
+    """
+    Ollama over its native API.
+
+    Every request carries a ``keep_alive`` hint so the model stays loaded
+    between calls instead of being unloaded after Ollama's five-minute
+    default; ``preload`` loads a model ahead of the first request. Responses
+    are always streamed and parsed one NDJSON line at a time, and callers
+    share the server's parallel request capacity through the coordination
+    backend, so workers queue here instead of inside Ollama where the wait
+    would eat into the request timeout.
+    """
+
+    def __init__(self, base_url: str, model_name: str, timeout: float = None, keep_alive=None, api_key: str = None):
+        self.base_url = (base_url or 'http://localhost:11434').rstrip('/')
         self.model_name = model_name
+        # Only needed for servers behind an authenticating proxy
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.timeout = timeout or self.default_timeout
+        self.keep_alive = keep_alive if keep_alive is not None else _setting('KEEP_ALIVE', '30m')
+        self._response = None
+
+    def _payload(self, prompt, kwargs):
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            "keep_alive": self.keep_alive,
+            **kwargs,
+            "stream": True
+        }
+
+    @contextmanager
+    def _parallel_slot(self):
+        """
+        Hold one of the server's parallel slots; yields a heartbeat to call
+        while the response streams in.
+
+        The slot expires after twice the request timeout so a crashed worker
+        can't hold it for good. ``requests`` applies the timeout to each read,
+        not to the whole response, so a long stream keeps its slot alive by
+        pushing the expiry back at least every half timeout.
+        """
+        capacity = parallel_capacity(self.base_url)
+        if not capacity:
+            yield lambda: None
+            return
+        backend = get_backend()
+        key = f'ollama:{self.base_url}:parallel'
+        holder = uuid.uuid4().hex
+        ttl = self.timeout * 2
+        max_wait = _setting('MAX_WAIT', 300.0)
+        poll_interval = _setting('POLL_INTERVAL', 0.05)
+        start = time.monotonic()
+        while not backend.acquire_slot(key, holder, capacity, ttl):
+            if time.monotonic() - start > max_wait:
+                raise RateLimitTimeout(f"Waited {max_wait}s for a free slot on {self.base_url}")
+            time.sleep(poll_interval)
+        touched = time.monotonic()
+
+        def heartbeat():
+            nonlocal touched
+            now = time.monotonic()
+            if now - touched >= self.timeout / 2:
+                backend.touch_slot(key, holder, ttl)
+                touched = now
+
+        try:
+            yield heartbeat
+        finally:
+            backend.release_slot(key, holder)
+
+    def _chunks(self, response):
+        # chunk_size=None hands over data as soon as it arrives instead of filling 512-byte blocks
+        for line in response.iter_lines(chunk_size=None):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise ProviderError(f"Ollama Error: {chunk['error']}")
+            yield chunk
+            if chunk.get("done"):
+                break
+
+    def stream_completion(self, prompt: str, **kwargs):
+        try:
+            with self._parallel_slot() as heartbeat:
+                response = self._response = requests.post(
+                    f"{self.base_url}/api/generate",
+                    json=self._payload(prompt, kwargs),
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    stream=True
+                )
+                try:
+                    response.raise_for_status()
+                    for chunk in self._chunks(response):
+                        heartbeat()
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                finally:
+                    response.close()
+        except ProviderError:
+            raise
+        except requests.Timeout as e:
+            raise ProviderTimeout(f"Ollama timed out after {self.timeout}s") from e
+        except Exception as e:
+            raise ProviderError(f"Ollama Error: {e}") from e
 
     def generate_completion(self, prompt: str, **kwargs):
+        return "".join(self.stream_completion(prompt, **kwargs))
+
+    def preload(self):
+        """Load the model into memory without generating anything."""
         try:
             response = requests.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    **kwargs
-                }
+                json={"model": self.model_name, "keep_alive": self.keep_alive},
+                headers=self.headers,
+                timeout=_setting('PRELOAD_TIMEOUT', 300.0)
             )
             response.raise_for_status()
-            return response.json().get("response")
+        except requests.Timeout as e:
+            raise ProviderTimeout(f"Ollama timed out loading {self.model_name}") from e
         except Exception as e:
-            print(f"Ollama Error: {e}")
-            return None
\ No newline at end of file
+            raise ProviderError(f"Ollama Error: {e}") from e
+
+    def cancel(self):
+        # Closing the stream makes Ollama stop generating for this request
+        response = self._response
+        if response is not None:
+            response.close()
@@ -1,11 +1,18 @@
 import openai
 from django.conf import settings
 from ..ai_providers import AIProvider
+from ..exceptions import ProviderError
 
 class OpenAIProvider(AIProvider):
-    def __init__(self, api_key: str, model_name: str):
+    def __init__(self, api_key: str, model_name: str, timeout: float = None, base_url: str = None):
         self.api_key = api_key
         self.model_name = model_name
+        self.timeout = timeout or self.default_timeout
+        # An OpenAI-compatible endpoint (proxy, local stand-in) instead of api.openai.com
+        self.base_url = base_url
+
+    def _request_options(self):
+        return {'api_base': self.base_url} if self.base_url else {}
 
     def generate_completion(self, prompt: str, **kwargs):
         try:
@@ -13,9 +20,28 @@ class OpenAIProvider(AIProvider):
             response = openai.ChatCompletion.create(
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
+                request_timeout=self.timeout,
+                **self._request_options(),
                 **kwargs
             )
             return response.choices[0].message.content
         except Exception as e:
-            print(f"OpenAI Error: {e}")
-            return None
\ No newline at end of file
+            raise ProviderError(f"OpenAI Error: {e}") from e
+
+    def stream_completion(self, prompt: str, **kwargs):
+        try:
+            openai.api_key = self.api_key
+            response = openai.ChatCompletion.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                request_timeout=self.timeout,
+                stream=True,
+                **self._request_options(),
+                **kwargs
+            )
+            for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+        except Exception as e:
+            raise ProviderError(f"OpenAI Error: {e}") from e
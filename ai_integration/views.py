@@ -1,13 +1,19 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import AIModelConfig, ModelComparison, TaskStatus
 from .serializers import AIModelConfigSerializer, ModelComparisonSerializer
-from .utils.openai_provider import OpenAIProvider
 from .serializers import TaskStatusSerializer
 from .providers_registry import ProviderRegistry
 from ai_integration.tasks import run_ai_model_task  # Import the task here
+from . import circuit_breaker, concurrency, hedging, rate_limit, singleflight
 from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from .exceptions import ProviderError
+from .gateway import ProviderGateway
+from .streaming import iterate_in_thread, sse_events
 
 class TaskStatusViewSet(viewsets.ModelViewSet):
     queryset = TaskStatus.objects.all()
@@ -20,6 +26,25 @@ class AIModelConfigViewSet(viewsets.ModelViewSet):
     queryset = AIModelConfig.objects.all()
     serializer_class = AIModelConfigSerializer
 
+    @action(detail=True, methods=['post'])
+    def stream(self, request, pk=None):
+        """
+        Stream a completion for ``prompt`` as server-sent events (``token``, then ``done`` or ``error``).
+        """
+        model_config = self.get_object()
+        prompt = request.data.get('prompt')
+        if not prompt:
+            return Response({'prompt': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = sse_events(ProviderGateway(model_config).stream_completion(prompt))
+        if isinstance(request._request, ASGIRequest):
+            # Under ASGI a blocking iterator would be buffered to the end, so feed it from a thread
+            events = iterate_in_thread(events)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
 
 class ModelComparisonViewSet(viewsets.ModelViewSet):
     queryset = ModelComparison.objects.all()
@@ -70,9 +95,10 @@ class ModelComparisonViewSet(viewsets.ModelViewSet):
         results = {}
         for model_id in models:
             model = AIModelConfig.objects.get(id=model_id)
-            provider = OpenAIProvider(api_key=model.api_key, model_name=model.model_name)
-            response = provider.generate_completion(prompt)
-            results[model.name] = response
+            try:
+                results[model.name] = ProviderGateway(model).generate_completion(prompt)
+            except ProviderError as e:
+                results[model.name] = {'error': str(e)}
         
         # Create a comparison object
         comparison = ModelComparison.objects.create(prompt=prompt)
@@ -90,3 +116,18 @@ class ModelComparisonViewSet(viewsets.ModelViewSet):
             "comparison_id": comparison.id,
             "results": results
         }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def runtime_stats(request):
+    """
+    Counters from the provider call layers in this process.
+    """
+    return Response({
+        'singleflight': singleflight.stats(),
+        'hedging': hedging.stats(),
+        'rate_limits': rate_limit.stats(),
+        'adaptive_concurrency': concurrency.stats(),
+        'circuit_breakers': circuit_breaker.stats(),
+    })
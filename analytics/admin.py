@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import (
+    ExecutionEvent, ExecutionMemoryReport, ExecutionProfile, LatencyRollup, NodeResult, NodeTimingRollup,
+    WorkflowTimingRollup,
+)
 
-# Register your models here.
+admin.site.register(LatencyRollup)
+admin.site.register(NodeTimingRollup)
+admin.site.register(WorkflowTimingRollup)
+admin.site.register(ExecutionProfile)
+admin.site.register(ExecutionMemoryReport)
+admin.site.register(NodeResult)
+admin.site.register(ExecutionEvent)
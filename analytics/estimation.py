@@ -0,0 +1,267 @@
+"""
+Run time estimates for workflows, from historical node timings.
+
+Each enabled node gets a run time distribution from the rollups, taking the
+most specific source with at least ``ESTIMATION['MIN_SAMPLES']`` runs:
+
+1. ``workflow``: this workflow's own runs of the node type and provider;
+2. ``model``: the latency of the model configuration in ``config['model_config_id']``;
+3. ``provider``: every workflow's runs of the node type with that provider;
+4. ``node_type``: every workflow's runs of the node type;
+5. ``default``: ``ESTIMATION['DEFAULT_RUN_TIME']``, when nothing has been recorded.
+
+``estimate_workflow`` samples those distributions (Monte Carlo, seeded by the
+workflow id so repeated estimates agree) to get the mean, p50 and p95 of:
+
+* the completion time: the executor runs nodes one after another, so this
+  is the sum over all nodes;
+* the critical path: the longest chain through the node connections, which
+  is what the run would take if independent nodes ran in parallel.
+
+It also names the node that dominates the critical path. ``priority_order``
+gives the scheduler a dependency-respecting order that starts long-pole
+nodes, those with the most expected work after them, first.
+"""
+import bisect
+import heapq
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from workflows.models import Node, NodeConnection
+from .histogram import Histogram, bucket_value
+from .models import LatencyRollup, NodeTimingRollup
+from .node_timing import _hours
+from .rollups import window_filter
+
+
+def _setting(name, default):
+    return getattr(settings, 'ESTIMATION', {}).get(name, default)
+
+
+class NodeEstimate:
+    def __init__(self, node, histogram=None, count=0, mean=None, source='default'):
+        self.node = node
+        self.histogram = histogram
+        self.count = count
+        self.source = source
+        if histogram is None or not histogram.total:
+            self.histogram = None
+            self.mean = mean if mean is not None else _setting('DEFAULT_RUN_TIME', 1.0)
+            self._values, self._cumulative = [self.mean], [1]
+        else:
+            self.mean = mean if mean is not None else sum(
+                bucket_value(index) * weight for index, weight in histogram.counts.items()
+            ) / histogram.total
+            indexes = sorted(histogram.counts)
+            self._values = [bucket_value(index) for index in indexes]
+            self._cumulative = []
+            running = 0
+            for index in indexes:
+                running += histogram.counts[index]
+                self._cumulative.append(running)
+
+    def quantile(self, q):
+        return self.histogram.quantile(q) if self.histogram is not None else self.mean
+
+    def sample(self, rng) -> float:
+        if len(self._values) == 1:
+            return self._values[0]
+        return self._values[bisect.bisect_right(self._cumulative, rng.random() * self._cumulative[-1])]
+
+    def to_dict(self) -> dict:
+        return {
+            'node_id': self.node.id,
+            'node_type': self.node.type,
+            'source': self.source,
+            'samples': self.count,
+            'mean': self.mean,
+            'p95': self.quantile(0.95),
+        }
+
+
+def _merge_rows(rows):
+    histogram, count, total = Histogram(), 0, 0.0
+    for row_count, row_sum, row_histogram in rows:
+        histogram.merge(row_histogram)
+        count += row_count
+        total += row_sum
+    return histogram, count, total
+
+
+def node_estimates(nodes, workflow_id, start=None, end=None) -> dict:
+    """``NodeEstimate`` per node id, from the rollups of ``[start, end)`` (default: the last ``WINDOW_DAYS``)."""
+    from workflows.utils import node_provider
+
+    end = end or timezone.now()
+    start = start or end - timedelta(days=_setting('WINDOW_DAYS', 7))
+    min_samples = _setting('MIN_SAMPLES', 5)
+    node_types = {node.type for node in nodes}
+
+    own, by_provider, by_type = defaultdict(list), defaultdict(list), defaultdict(list)
+    for row_workflow, node_type, provider, count, run_time, histogram in NodeTimingRollup.objects.filter(
+        node_type__in=node_types, **_hours(start, end)
+    ).values_list('workflow_id', 'node_type', 'provider', 'count', 'run_time_sum', 'run_time_histogram'):
+        row = (count, run_time, histogram)
+        if row_workflow == workflow_id:
+            own[node_type, provider].append(row)
+        by_provider[node_type, provider].append(row)
+        by_type[node_type].append(row)
+
+    model_ids = {node.config.get('model_config_id') for node in nodes} - {None}
+    by_model = defaultdict(list)
+    if model_ids:
+        for model_config_id, count, latency, histogram in LatencyRollup.objects.filter(
+            window_filter(start, end), model_config_id__in=model_ids
+        ).values_list('model_config_id', 'count', 'latency_sum', 'histogram'):
+            by_model[model_config_id].append((count, latency, histogram))
+
+    estimates = {}
+    for node in nodes:
+        provider = node_provider(node)
+        candidates = [
+            ('workflow', own.get((node.type, provider))),
+            ('model', by_model.get(node.config.get('model_config_id'))),
+            ('provider', by_provider.get((node.type, provider))),
+            ('node_type', by_type.get(node.type)),
+        ]
+        estimate = None
+        for source, rows in candidates:
+            if not rows:
+                continue
+            histogram, count, total = _merge_rows(rows)
+            if count >= min_samples:
+                estimate = NodeEstimate(node, histogram, count, total / count, source)
+                break
+        estimates[node.id] = estimate or NodeEstimate(node)
+    return estimates
+
+
+def upstream_map(nodes) -> dict:
+    """``{node_id: [upstream node ids]}`` from the connections between ``nodes``."""
+    ids = {node.id for node in nodes}
+    upstream = {node.id: [] for node in nodes}
+    for source_id, target_id in NodeConnection.objects.filter(
+        target_node_id__in=ids
+    ).values_list('source_node_id', 'target_node_id'):
+        if source_id in ids:
+            upstream[target_id].append(source_id)
+    return upstream
+
+
+def workflow_graph(workflow):
+    """Enabled nodes in execution order and their ``upstream_map``."""
+    nodes = list(Node.objects.filter(workflow=workflow, is_enabled=True).order_by('order'))
+    return nodes, upstream_map(nodes)
+
+
+def topological_order(nodes, upstream):
+    """Nodes with every upstream node first, ties broken by ``order``; nodes in a cycle keep their ``order``."""
+    position = {node.id: i for i, node in enumerate(nodes)}
+    return _ordered(nodes, upstream, key=lambda node: position[node.id])
+
+
+def _ordered(nodes, upstream, key):
+    by_id = {node.id: node for node in nodes}
+    downstream = defaultdict(list)
+    waiting = {}
+    for node in nodes:
+        waiting[node.id] = len(upstream[node.id])
+        for source in upstream[node.id]:
+            downstream[source].append(node.id)
+    ready = [(key(node), node.id) for node in nodes if not waiting[node.id]]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        _, node_id = heapq.heappop(ready)
+        ordered.append(by_id[node_id])
+        for target in downstream[node_id]:
+            waiting[target] -= 1
+            if not waiting[target]:
+                heapq.heappush(ready, (key(by_id[target]), target))
+    if len(ordered) < len(nodes):
+        placed = {node.id for node in ordered}
+        ordered += [node for node in nodes if node.id not in placed]
+    return ordered
+
+
+def _longest_paths(ordered, upstream, durations):
+    """Finish time of each node if every node started as soon as its inputs were ready, plus the slowest predecessor."""
+    finish, previous = {}, {}
+    for node in ordered:
+        ready_at, slowest = 0.0, None
+        for source in upstream[node.id]:
+            if source in finish and finish[source] > ready_at:
+                ready_at, slowest = finish[source], source
+        finish[node.id] = ready_at + durations[node.id]
+        previous[node.id] = slowest
+    return finish, previous
+
+
+def priority_order(nodes, upstream, estimates):
+    """
+    A dependency-respecting order that, among the nodes ready to run, starts
+    the one with the longest expected path to the end of the workflow first.
+    """
+    ordered = topological_order(nodes, upstream)
+    downstream = defaultdict(list)
+    for node in nodes:
+        for source in upstream[node.id]:
+            downstream[source].append(node.id)
+    remaining = {}
+    for node in reversed(ordered):
+        tail = max((remaining[target] for target in downstream[node.id] if target in remaining), default=0.0)
+        remaining[node.id] = estimates[node.id].mean + tail
+    position = {node.id: i for i, node in enumerate(nodes)}
+    return _ordered(nodes, upstream, key=lambda node: (-remaining[node.id], position[node.id]))
+
+
+def _quantiles(values):
+    values = sorted(values)
+    return {
+        'mean': sum(values) / len(values),
+        'p50': values[int(0.5 * (len(values) - 1))],
+        'p95': values[int(0.95 * (len(values) - 1))],
+    }
+
+
+def estimate_workflow(workflow, start=None, end=None, samples=None) -> dict:
+    nodes, upstream = workflow_graph(workflow)
+    if not nodes:
+        return {'workflow_id': workflow.id, 'nodes': [], 'completion': None, 'critical_path': None, 'dominant_node': None}
+    estimates = node_estimates(nodes, workflow.id, start, end)
+    ordered = topological_order(nodes, upstream)
+
+    rng = random.Random(workflow.id)
+    totals, paths = [], []
+    for _ in range(samples or _setting('SAMPLES', 1000)):
+        durations = {node.id: estimates[node.id].sample(rng) for node in nodes}
+        totals.append(sum(durations.values()))
+        paths.append(max(_longest_paths(ordered, upstream, durations)[0].values()))
+
+    finish, previous = _longest_paths(ordered, upstream, {node_id: e.mean for node_id, e in estimates.items()})
+    node_id = max(finish, key=finish.get)
+    path = []
+    while node_id is not None:
+        path.append(node_id)
+        node_id = previous[node_id]
+    path.reverse()
+    dominant = max(path, key=lambda node_id: estimates[node_id].mean)
+    path_mean = sum(estimates[node_id].mean for node_id in path)
+
+    return {
+        'workflow_id': workflow.id,
+        'completion': _quantiles(totals),
+        'critical_path': {'node_ids': path, **_quantiles(paths)},
+        'dominant_node': {
+            **estimates[dominant].to_dict(),
+            'share_of_critical_path': estimates[dominant].mean / path_mean if path_mean else None,
+        },
+        'nodes': [
+            {**estimates[node.id].to_dict(), 'on_critical_path': node.id in path}
+            for node in ordered
+        ],
+    }
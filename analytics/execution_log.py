@@ -0,0 +1,117 @@
+"""
+Per-node results and an append-only event log, written while an execution runs.
+
+``ExecutionLogRecorder`` is a workflow executor observer (add it to
+``WORKFLOW_EXECUTION_OBSERVERS``). It numbers the execution's events
+(``execution_started``, ``node_started``, ``node_retried``,
+``node_finished``, ``node_failed``, ``execution_finished``) from 1 and keeps a
+``NodeResult`` for each node that finishes or fails. Rows are buffered and
+written with one ``bulk_create`` per table. A flush happens when
+``EXECUTION_LOG['BATCH_SIZE']`` rows are waiting, when
+``EXECUTION_LOG['FLUSH_INTERVAL']`` seconds have passed since the last
+flush, when a node fails and when the execution finishes. A worker that
+dies mid-run loses at most the last unflushed batch, and readers can follow
+a run by asking for the events after the last sequence number they saw.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ExecutionEvent, NodeResult
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, 'EXECUTION_LOG', {}).get(name, default)
+
+
+def _jsonable(value):
+    # Node outputs are usually strings; anything else is stored as its JSON (or str) form
+    return json.loads(json.dumps(value, default=str))
+
+
+class ExecutionLogRecorder:
+    def __init__(self, execution, batch_size=None, flush_interval=None, clock=time.monotonic):
+        self.execution = execution
+        self.batch_size = batch_size or _setting('BATCH_SIZE', 50)
+        self.flush_interval = _setting('FLUSH_INTERVAL', 1.0) if flush_interval is None else flush_interval
+        self.clock = clock
+        self.sequence = 0
+        self.events = []
+        self.results = []
+        self.flushes = 0
+        self._started = {}
+        self._last_flush = clock()
+
+    def _event(self, event, node=None, **data):
+        self.sequence += 1
+        self.events.append(ExecutionEvent(
+            execution_id=self.execution.id,
+            sequence=self.sequence,
+            event=event,
+            node_id=node.id if node is not None else None,
+            data=_jsonable(data),
+            created_at=timezone.now(),
+        ))
+
+    def _result(self, executor, node, status, output=None, error=''):
+        self.results.append(NodeResult(
+            execution_id=self.execution.id,
+            node_id=node.id,
+            node_type=node.type,
+            status=status,
+            output=_jsonable(output),
+            error=error,
+            attempts=executor.attempts.get(node.id, 1),
+            started_at=self._started.pop(node.id, timezone.now()),
+            finished_at=timezone.now(),
+        ))
+
+    def _maybe_flush(self):
+        if len(self.events) + len(self.results) >= self.batch_size or self.clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = self.clock()
+        if not self.events and not self.results:
+            return
+        events, results = self.events, self.results
+        self.events, self.results = [], []
+        try:
+            NodeResult.objects.bulk_create(results)
+            ExecutionEvent.objects.bulk_create(events)
+            self.flushes += 1
+        except Exception:
+            # The log is for readers following the run; losing a batch must not fail the workflow
+            logger.warning(f"Could not write the execution log of execution {self.execution.id}", exc_info=True)
+
+    def on_execution_started(self, executor):
+        self._event('execution_started')
+        self.flush()
+
+    def on_node_started(self, executor, node):
+        self._started[node.id] = timezone.now()
+        self._event('node_started', node, attempt=1)
+        self._maybe_flush()
+
+    def on_node_retried(self, executor, node, error):
+        self._event('node_retried', node, attempt=executor.attempts.get(node.id, 1) + 1, error=str(error))
+        self._maybe_flush()
+
+    def on_node_finished(self, executor, node, result):
+        self._result(executor, node, 'completed', output=result)
+        self._event('node_finished', node, attempts=executor.attempts.get(node.id, 1))
+        self._maybe_flush()
+
+    def on_node_failed(self, executor, node, error):
+        self._result(executor, node, 'failed', error=str(error))
+        self._event('node_failed', node, attempts=executor.attempts.get(node.id, 1), error=str(error))
+        self.flush()
+
+    def on_execution_finished(self, executor, status):
+        self._event('execution_finished', status=status)
+        self.flush()
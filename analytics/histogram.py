@@ -0,0 +1,66 @@
+"""
+Mergeable latency histograms.
+
+Values go into logarithmic buckets (as in DDSketch / HDR histograms): bucket
+``i`` holds values in ``(GAMMA ** (i - 1), GAMMA ** i]``, so every quantile
+estimate is within ``RELATIVE_ACCURACY`` of the true value whatever the
+latency range, and a histogram has a few hundred buckets at most. Histograms
+are merged by adding counts, which is what lets rollups for different time
+buckets be combined into one distribution for any window.
+"""
+import math
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Anything faster than 0.1ms lands in the first bucket
+MIN_VALUE = 1e-4
+_LOG_GAMMA = math.log(GAMMA)
+_MIN_INDEX = math.ceil(math.log(MIN_VALUE) / _LOG_GAMMA)
+
+
+def bucket_index(value: float) -> int:
+    if value <= MIN_VALUE:
+        return _MIN_INDEX
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Representative value of a bucket, within ``RELATIVE_ACCURACY`` of everything in it."""
+    if index <= _MIN_INDEX:
+        return MIN_VALUE
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class Histogram:
+    def __init__(self, counts=None):
+        # JSON object keys are strings; keep ints internally
+        self.counts = {int(index): count for index, count in (counts or {}).items()}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, value: float, count: int = 1):
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other):
+        counts = other.counts if isinstance(other, Histogram) else Histogram(other).counts
+        for index, count in counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    def quantile(self, q: float):
+        total = self.total
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+    def to_json(self) -> dict:
+        return {str(index): count for index, count in self.counts.items()}
@@ -0,0 +1,111 @@
+"""
+Metrics for workflow execution, database queries and Celery queues.
+
+``ExecutionMetrics`` is a workflow executor observer. Query metrics come from
+an execute wrapper added to every database connection as it's opened, and
+the Celery queue depth is read from the broker on each scrape. Provider and
+single-flight metrics are recorded in ``ai_integration``.
+"""
+import logging
+import time
+
+from celery import current_app
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from ai_integration.singleflight import shared_results_in_thread
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+node_executions = metrics.counter(
+    'innoflow_node_executions_total', 'Workflow nodes executed, by node type and outcome', ['node_type', 'status']
+)
+node_duration = metrics.histogram(
+    'innoflow_node_duration_seconds', 'Workflow node run time, including retries', ['node_type']
+)
+node_cache_hits = metrics.counter(
+    'innoflow_node_cache_hits_total', 'Node runs that reused a coalesced result', ['node_type']
+)
+workflow_executions = metrics.counter(
+    'innoflow_workflow_executions_total', 'Workflow executions finished, by outcome', ['status']
+)
+executions_in_progress = metrics.gauge(
+    'innoflow_workflow_executions_in_progress', 'Workflow executions currently running', mode='livesum'
+)
+db_queries = metrics.counter('innoflow_db_queries_total', 'Database queries, by statement kind', ['alias', 'kind'])
+db_query_duration = metrics.histogram(
+    'innoflow_db_query_duration_seconds', 'Database query time', ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+celery_queue_depth = metrics.gauge(
+    'innoflow_celery_queue_depth', 'Messages waiting in a Celery queue', ['queue'], mode='max'
+)
+
+
+class ExecutionMetrics:
+    def __init__(self, execution):
+        self.execution = execution
+        self._started = {}
+
+    def on_execution_started(self, executor):
+        executions_in_progress.inc()
+
+    def on_node_started(self, executor, node):
+        self._started[node.id] = (time.perf_counter(), shared_results_in_thread())
+
+    def _finish(self, node, status):
+        started, shared = self._started.pop(node.id, (None, None))
+        node_executions.inc(node_type=node.type, status=status)
+        if started is not None:
+            node_duration.observe(time.perf_counter() - started, node_type=node.type)
+            if shared_results_in_thread() > shared:
+                node_cache_hits.inc(node_type=node.type)
+
+    def on_node_finished(self, executor, node, result):
+        self._finish(node, 'completed')
+
+    def on_node_failed(self, executor, node, error):
+        self._finish(node, 'failed')
+
+    def on_execution_finished(self, executor, status):
+        executions_in_progress.dec()
+        workflow_executions.inc(status=status)
+
+
+_KINDS = {'select', 'insert', 'update', 'delete'}
+
+
+def count_queries(execute, sql, params, many, context):
+    kind = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else 'other'
+    alias = context['connection'].alias
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        db_queries.inc(alias=alias, kind=kind if kind in _KINDS else 'other')
+        db_query_duration.observe(time.perf_counter() - start, alias=alias)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def collect_queue_depth():
+    if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        return
+    try:
+        with current_app.connection_for_read() as connection:
+            connection.ensure_connection(max_retries=1)
+            channel = connection.default_channel
+            for queue in getattr(settings, 'METRICS', {}).get('CELERY_QUEUES', ['celery']):
+                _, depth, _ = channel.queue_declare(queue=queue, passive=True)
+                celery_queue_depth.set(depth, queue=queue)
+    except Exception as e:
+        logger.debug(f"Could not read Celery queue depth: {e}")
+
+
+metrics.registry.add_collector(collect_queue_depth)
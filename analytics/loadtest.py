@@ -0,0 +1,252 @@
+"""
+End-to-end load tests of the REST API against local provider stand-ins.
+
+``LoadTest`` starts a ``FakeProviderServer`` for OpenAI, Anthropic and
+DeepSeek and a ``FakeOllamaServer``, all with the same latency distribution
+and error rate, and registers one ``AIModelConfig`` per server with its
+``base_url`` pointing there. It then drives the API in stages of increasing
+request rate and reports, per scenario and stage, the achieved throughput,
+latency percentiles and error rate. The first stage where throughput falls
+behind the offered rate, or errors exceed what the fakes inject, is roughly
+the saturation point.
+
+Scenarios:
+
+* ``execute``: ``POST /api/workflows/workflows/<id>/execute/`` on a two-node
+  text workflow (with ``wait``, until the execution has finished);
+* ``compare``: ``POST /api/modelcomparison/`` across the fake providers (with
+  ``wait``, until every model has answered).
+
+Requests are sent open-loop on a fixed schedule and latency is measured from
+the scheduled send time, so a server that falls behind shows up as growing
+latency instead of quietly lowering the request rate.
+
+Without a ``target`` the API is served in-process by a threaded WSGI server,
+which shares the GIL with the load generator; for real numbers, run the
+server separately with ``target`` set and the same database.
+"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+from ai_integration.fake_servers import FakeOllamaServer, FakeProviderServer, lognormal_latency
+from ai_integration.models import AIModelConfig, ModelResponse
+from workflows.models import Node, NodeConnection, Workflow, WorkflowExecution
+
+from .histogram import Histogram
+
+SCENARIOS = ('execute', 'compare')
+LOADTEST_USER = 'loadtest'
+LOADTEST_PREFIX = 'loadtest'
+FINISHED = ('completed', 'failed')
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class InProcessServer:
+    """Serves the project's WSGI application on a free local port."""
+
+    def __init__(self):
+        self._server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler, allow_reuse_address=False)
+        self._server.set_app(get_internal_wsgi_application())
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StageResult:
+    def __init__(self, scenario, rate, duration):
+        self.scenario = scenario
+        self.rate = rate
+        self.duration = duration
+        self.latencies = Histogram()
+        self.outcomes = Counter()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, outcome):
+        with self._lock:
+            self.latencies.add(latency)
+            self.outcomes[outcome] += 1
+
+    def summary(self) -> dict:
+        sent = sum(self.outcomes.values())
+        ok = self.outcomes.get('ok', 0)
+        return {
+            'scenario': self.scenario,
+            'offered_rate': self.rate,
+            'sent': sent,
+            'throughput': round(ok / self.elapsed, 3) if self.elapsed else 0.0,
+            'error_rate': round((sent - ok) / sent, 4) if sent else 0.0,
+            'p50': self.latencies.quantile(0.5),
+            'p90': self.latencies.quantile(0.9),
+            'p99': self.latencies.quantile(0.99),
+            'outcomes': dict(self.outcomes),
+        }
+
+
+class LoadTest:
+    def __init__(self, target=None, latency_median=0.2, latency_sigma=0.5, error_rate=0.0,
+                 wait=False, timeout=60.0, concurrency=64, seed=None):
+        self.target = target
+        self.error_rate = error_rate
+        self.wait = wait
+        self.timeout = timeout
+        self.concurrency = concurrency
+        latency = lognormal_latency(latency_median, latency_sigma, seed) if latency_median else 0.0
+        self.providers = {
+            'OPENAI': FakeProviderServer('openai', latency=latency, error_rate=error_rate, seed=seed),
+            'ANTHROPIC': FakeProviderServer('anthropic', latency=latency, error_rate=error_rate, seed=seed),
+            'DEEPSEEK': FakeProviderServer('deepseek', latency=latency, error_rate=error_rate, seed=seed),
+            'OLLAMA': FakeOllamaServer(error_rate=error_rate, seed=seed),
+        }
+        self._server = None
+        self._local = threading.local()
+
+    def setup(self):
+        for server in self.providers.values():
+            server.start()
+        if self.target is None:
+            self._server = InProcessServer().start()
+            self.target = self._server.url
+        self.user, _ = get_user_model().objects.get_or_create(username=LOADTEST_USER)
+        self.model_configs = [
+            AIModelConfig.objects.create(
+                name=f'{LOADTEST_PREFIX} {provider.lower()}',
+                provider=provider,
+                model_name='claude-2' if provider == 'ANTHROPIC' else f'fake-{provider.lower()}',
+                api_key='loadtest',
+                base_url=server.url,
+                model_type='text',
+            )
+            for provider, server in self.providers.items()
+        ]
+        self.workflow = Workflow.objects.create(name=f'{LOADTEST_PREFIX} workflow', user=self.user)
+        first = Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'Load test'}, order=1)
+        second = Node.objects.create(workflow=self.workflow, type='text_input', config={}, order=2)
+        NodeConnection.objects.create(source_node=first, target_node=second)
+        return self
+
+    def teardown(self, keep=False):
+        if not keep:
+            AIModelConfig.objects.filter(id__in=[config.id for config in self.model_configs]).delete()
+            self.workflow.delete()
+        for server in self.providers.values():
+            server.stop()
+        if self._server is not None:
+            self._server.stop()
+
+    def __enter__(self):
+        return self.setup()
+
+    def __exit__(self, *exc):
+        self.teardown()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            from rest_framework_simplejwt.tokens import AccessToken
+
+            session = self._local.session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {AccessToken.for_user(self.user)}'
+        return session
+
+    def _poll(self, done):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            result = done()
+            if result is not None:
+                return result
+            time.sleep(0.05)
+        return 'timeout'
+
+    def execute(self):
+        response = self._session().post(f'{self.target}/api/workflows/workflows/{self.workflow.id}/execute/', timeout=self.timeout)
+        if response.status_code >= 400:
+            return f'http_{response.status_code}'
+        if not self.wait:
+            return 'ok'
+        execution_id = response.json()['execution_id']
+
+        def finished():
+            status = WorkflowExecution.objects.filter(id=execution_id).values_list('status', flat=True).first()
+            if status in FINISHED:
+                return 'ok' if status == 'completed' else 'failed'
+            return None
+
+        return self._poll(finished)
+
+    def compare(self):
+        response = self._session().post(
+            f'{self.target}/api/modelcomparison/',
+            json={'prompt': 'Load test prompt', 'compared_models': [config.id for config in self.model_configs]},
+            timeout=self.timeout,
+        )
+        if response.status_code >= 400:
+            return f'http_{response.status_code}'
+        if not self.wait:
+            return 'ok'
+        comparison_id = response.json()['id']
+        expected = len(self.model_configs)
+        return self._poll(
+            lambda: 'ok' if ModelResponse.objects.filter(comparison_id=comparison_id).count() >= expected else None
+        )
+
+    def _send(self, scenario, scheduled, result):
+        try:
+            outcome = getattr(self, scenario)()
+        except requests.Timeout:
+            outcome = 'timeout'
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        result.record(time.perf_counter() - scheduled, outcome)
+
+    def run_stage(self, scenario, rate, duration) -> StageResult:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {scenario!r}; expected one of {SCENARIOS}")
+        result = StageResult(scenario, rate, duration)
+        count = max(1, int(rate * duration))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='loadtest') as pool:
+            for i in range(count):
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, scenario, scheduled, result)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def run(self, scenarios=SCENARIOS, rates=(1, 2, 5, 10), duration=10.0, on_stage=None) -> list:
+        """Run every scenario at each rate in turn; ``on_stage`` gets each summary as it finishes."""
+        summaries = []
+        for scenario in scenarios:
+            for rate in rates:
+                summary = self.run_stage(scenario, rate, duration).summary()
+                summary['saturated'] = (
+                    summary['throughput'] < 0.9 * rate
+                    # a comparison fails if any of the providers does
+                    or summary['error_rate'] > 1 - (1 - self.error_rate) ** len(self.providers) + 0.05
+                )
+                summaries.append(summary)
+                if on_stage:
+                    on_stage(summary)
+        return summaries
@@ -0,0 +1,72 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.loadtest import SCENARIOS, LoadTest
+
+
+def _float_list(value):
+    return [float(part) for part in value.split(',') if part]
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:>9.0f}' if seconds is not None else f"{'-':>9}"
+
+
+class Command(BaseCommand):
+    help = 'Load test the REST API at increasing request rates against local provider stand-ins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='Base URL of a running server (default: serve the API in-process)')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+        parser.add_argument('--rates', type=_float_list, default=[1, 2, 5, 10], help='Requests per second for each stage')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per stage')
+        parser.add_argument('--latency-median', type=float, default=0.2, help='Median fake provider latency in seconds')
+        parser.add_argument('--latency-sigma', type=float, default=0.5, help='Spread of the log-normal latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake provider requests that fail')
+        parser.add_argument('--wait', action='store_true', help='Count a request as done once its execution or comparison has finished')
+        parser.add_argument('--concurrency', type=int, default=64, help='Most requests in flight at once')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--keep', action='store_true', help='Keep the workflow and model configs created for the test')
+        parser.add_argument('--output', help='Write the stage results as JSON to this file')
+
+    def handle(self, *args, **options):
+        scenarios = [scenario for scenario in options['scenarios'].split(',') if scenario]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        test = LoadTest(
+            target=options['target'],
+            latency_median=options['latency_median'],
+            latency_sigma=options['latency_sigma'],
+            error_rate=options['error_rate'],
+            wait=options['wait'],
+            concurrency=options['concurrency'],
+            seed=options['seed'],
+        ).setup()
+        self.stdout.write(f'Driving {test.target}; fake providers:')
+        for provider, server in test.providers.items():
+            self.stdout.write(f'  {provider:<10} {server.url}')
+        self.stdout.write(
+            f"{'scenario':<10}{'rate/s':>8}{'sent':>7}{'done/s':>9}{'errors':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+        )
+
+        def report(stage):
+            self.stdout.write(
+                f"{stage['scenario']:<10}{stage['offered_rate']:>8g}{stage['sent']:>7}{stage['throughput']:>9.1f}"
+                f"{stage['error_rate']:>9.1%}{_ms(stage['p50'])}{_ms(stage['p90'])}{_ms(stage['p99'])}"
+                + ('  saturated' if stage['saturated'] else '')
+            )
+
+        try:
+            stages = test.run(scenarios, options['rates'], options['duration'], on_stage=report)
+        finally:
+            test.teardown(keep=options['keep'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'target': options['target'], 'options': {
+                    key: options[key] for key in ('rates', 'duration', 'latency_median', 'latency_sigma', 'error_rate', 'wait')
+                }, 'stages': stages}, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
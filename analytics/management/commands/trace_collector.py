@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ai_integration.fake_servers import FakeOtlpCollector
+
+
+class Command(BaseCommand):
+    help = 'Run a local OTLP/HTTP trace collector that appends received spans to a JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=4318)
+        parser.add_argument('--output', default='collected-spans.jsonl')
+
+    def handle(self, *args, **options):
+        collector = FakeOtlpCollector(path=options['output'], port=options['port'])
+        self.stdout.write(f"Collecting traces at {collector.url} into {options['output']}")
+        try:
+            collector.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,113 @@
+"""
+Per-node memory profiling with tracemalloc.
+
+``MemoryProfiler`` is a workflow executor observer for diagnosing memory
+growth (``run_workflow(..., memory_profile=True)``). Around each node it
+resets tracemalloc's peak and takes snapshots before and after, and records
+how far traced memory peaked above the starting point, how much the node left
+allocated, and the source lines that grew the most. The report is saved as an
+``ExecutionMemoryReport`` when the execution finishes.
+
+tracemalloc slows allocation-heavy code down noticeably, so this is for
+diagnostic runs only and is never enabled by default.
+"""
+import logging
+import tracemalloc
+
+from django.conf import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _setting(name, default):
+    return getattr(settings, 'MEMORY_PROFILING', {}).get(name, default)
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryProfiler:
+    def __init__(self, execution, top=None, frames=None):
+        self.execution = execution
+        self.top = top or _setting('TOP', 10)
+        self.frames = frames or _setting('FRAMES', 1)
+        self.nodes = []
+        self._started_tracing = False
+        self._before = None
+        self._baseline = 0
+
+    def on_execution_started(self, executor):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def on_node_started(self, executor, node):
+        if not tracemalloc.is_tracing():
+            return
+        self._before = self._snapshot()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+
+    def _finish(self, node, status):
+        if self._before is None or not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        after = self._snapshot()
+        growth = [stat for stat in after.compare_to(self._before, 'lineno') if stat.size_diff > 0]
+        growth.sort(key=lambda stat: stat.size_diff, reverse=True)
+        self.nodes.append({
+            'node_id': node.id,
+            'node_type': node.type,
+            'status': status,
+            'peak_bytes': peak - self._baseline,
+            'retained_bytes': current - self._baseline,
+            'max_rss_bytes': max_rss_bytes(),
+            'top_allocations': [
+                {
+                    'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                }
+                for stat in growth[:self.top]
+            ],
+        })
+        self._before = None
+
+    def on_node_finished(self, executor, node, result):
+        self._finish(node, 'completed')
+
+    def on_node_failed(self, executor, node, error):
+        self._finish(node, 'failed')
+
+    def on_execution_finished(self, executor, status):
+        from .models import ExecutionMemoryReport
+
+        if self._started_tracing:
+            tracemalloc.stop()
+        peak = max((node['peak_bytes'] for node in self.nodes), default=0)
+        try:
+            ExecutionMemoryReport.objects.update_or_create(
+                execution=self.execution,
+                defaults={'peak_bytes': peak, 'max_rss_bytes': max_rss_bytes(), 'nodes': self.nodes},
+            )
+        except Exception:
+            logger.warning(f"Could not save the memory report for execution {self.execution.id}", exc_info=True)
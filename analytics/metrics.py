@@ -0,0 +1,291 @@
+"""
+In-process metrics in the Prometheus text format.
+
+``counter``, ``gauge`` and ``histogram`` register metrics on the default
+registry; updating one is a dict update under a lock. ``render`` produces the
+text served by the ``/metrics`` view.
+
+Celery prefork children each have their own registry, so with
+``METRICS['MULTIPROCESS_DIR']`` set every process also writes its values to
+``<dir>/metrics_<pid>.json`` (at most every ``FLUSH_INTERVAL`` seconds, and on
+exit). Rendering then merges the files of all processes: counters and
+histograms are summed, including those of processes that have exited;
+gauges are combined according to their ``mode`` (``sum``, ``max``, or
+``livesum`` which skips exited processes). The directory should be emptied
+when the deployment restarts.
+"""
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _setting(name, default):
+    return getattr(settings, 'METRICS', {}).get(name, default)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self) -> dict:
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), mode='sum'):
+        super().__init__(registry, name, documentation, labelnames)
+        self.mode = mode
+
+    def describe(self) -> dict:
+        return {**super().describe(), 'mode': self.mode}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        self.registry.changed()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def describe(self) -> dict:
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            # Per-bucket (not cumulative) counts, then sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+        self.registry.changed()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(state)] for key, state in self._values.items()]
+
+
+class Registry:
+    def __init__(self, multiprocess_dir=None, flush_interval=1.0):
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = os.getpid()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), mode='sum'):
+        return self._register(Gauge(self, name, documentation, labelnames, mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """Register ``collect()``, called before each render to refresh gauges that are read on demand."""
+        self._collectors.append(collect)
+
+    def _path(self, pid):
+        return os.path.join(self.multiprocess_dir, f'metrics_{pid}.json')
+
+    def changed(self):
+        if self.multiprocess_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {**metric.describe(), 'values': metric.snapshot()} for metric in metrics}
+
+    def flush(self):
+        if not self.multiprocess_dir:
+            return
+        self._last_flush = time.monotonic()
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def after_fork(self):
+        # A forked child starts with a copy of the parent's values; those are already counted in the parent
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def collect(self):
+        for collect in self._collectors:
+            collect()
+
+    def _gather(self) -> dict:
+        if not self.multiprocess_dir:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics_*.json')):
+            pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, {**metric, 'values': {}})
+                if metric['type'] == 'gauge' and metric.get('mode') == 'livesum' and not alive:
+                    continue
+                for labels, value in metric['values']:
+                    key = tuple(labels)
+                    previous = target['values'].get(key)
+                    target['values'][key] = value if previous is None else _combine(metric, previous, value)
+        for metric in merged.values():
+            metric['values'] = [[list(key), value] for key, value in metric['values'].items()]
+        return merged
+
+    def render(self) -> str:
+        self.collect()
+        lines = []
+        for name, metric in sorted(self._gather().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric['labelnames']
+            for labels, value in sorted(metric['values']):
+                if metric['type'] != 'histogram':
+                    lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(metric['buckets']) + [math.inf], value[:-2]):
+                    cumulative += count
+                    le = _format_labels(labelnames, labels, [('le', _format_value(float(bound)))])
+                    lines.append(f'{name}_bucket{le} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labelnames, labels)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(labelnames, labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _combine(metric, previous, value):
+    if metric['type'] == 'histogram':
+        return [a + b for a, b in zip(previous, value)]
+    if metric['type'] == 'gauge' and metric.get('mode') == 'max':
+        return max(previous, value)
+    return previous + value
+
+
+registry = Registry(
+    multiprocess_dir=_setting('MULTIPROCESS_DIR', None),
+    flush_interval=_setting('FLUSH_INTERVAL', 1.0),
+)
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+render = registry.render
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.after_fork)
+atexit.register(registry.flush)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('ai_integration', '0005_aimodelconfig_rate_limits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatencyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('latency_sum', models.FloatField(default=0.0)),
+                ('histogram', models.JSONField(default=dict, help_text='Log-bucket index -> number of calls')),
+                ('model_config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latency_rollups', to='ai_integration.aimodelconfig')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='analytics_l_resolut_5a3bb5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model_config', 'resolution', 'bucket_start'), name='unique_latency_rollup')],
+            },
+        ),
+    ]
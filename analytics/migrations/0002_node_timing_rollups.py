@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('workflows', '0009_nodeport_nodeconnection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeTimingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_type', models.CharField(max_length=50)),
+                ('provider', models.CharField(blank=True, default='', max_length=50)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0, help_text='Runs that reused a coalesced result')),
+                ('queue_wait_sum', models.FloatField(default=0.0, help_text='Seconds between the node becoming ready and starting')),
+                ('run_time_sum', models.FloatField(default=0.0)),
+                ('input_bytes', models.BigIntegerField(default=0)),
+                ('output_bytes', models.BigIntegerField(default=0)),
+                ('run_time_histogram', models.JSONField(default=dict)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='node_timing_rollups', to='workflows.workflow')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='analytics_n_bucket__fdf3f5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('workflow', 'node_type', 'provider', 'bucket_start'), name='unique_node_timing_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkflowTimingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('executions', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('queue_wait_sum', models.FloatField(default=0.0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('duration_histogram', models.JSONField(default=dict)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timing_rollups', to='workflows.workflow')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='analytics_w_bucket__342127_idx')],
+                'constraints': [models.UniqueConstraint(fields=('workflow', 'bucket_start'), name='unique_workflow_timing_rollup')],
+            },
+        ),
+    ]
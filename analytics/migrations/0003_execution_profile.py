@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_node_timing_rollups'),
+        ('workflows', '0009_nodeport_nodeconnection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('cpu', 'CPU time'), ('wall', 'Wall-clock time')], max_length=10)),
+                ('interval', models.FloatField(help_text='Seconds between samples')),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('duration', models.FloatField(default=0.0, help_text='Seconds profiled')),
+                ('collapsed_stacks', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profiles', to='workflows.workflowexecution')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
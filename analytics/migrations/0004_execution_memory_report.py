@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_execution_profile'),
+        ('workflows', '0009_nodeport_nodeconnection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionMemoryReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peak_bytes', models.BigIntegerField(default=0, help_text='Highest per-node peak of traced memory')),
+                ('max_rss_bytes', models.BigIntegerField(blank=True, help_text="Worker's peak RSS at the end of the run", null=True)),
+                ('nodes', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('execution', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='memory_report', to='workflows.workflowexecution')),
+            ],
+        ),
+    ]
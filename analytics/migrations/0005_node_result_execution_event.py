@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-19 09:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_execution_memory_report'),
+        ('workflows', '0009_nodeport_nodeconnection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('event', models.CharField(max_length=30)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='workflows.workflowexecution')),
+                ('node', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='workflows.node')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('execution', 'sequence'), name='unique_execution_event')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NodeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_type', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('output', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='node_results', to='workflows.workflowexecution')),
+                ('node', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='workflows.node')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('execution', 'node'), name='unique_node_result')],
+            },
+        ),
+    ]
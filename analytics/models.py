@@ -1,3 +1,166 @@
 from django.db import models
+from ai_integration.models import AIModelConfig
+from workflows.models import Node, Workflow, WorkflowExecution
 
-# Create your models here.
+class LatencyRollup(models.Model):
+    """
+    Latency distribution and call counts of one model configuration in one time bucket.
+
+    Each call updates a minute row and an hour row; window queries combine
+    hour rows for the whole hours and minute rows for the partial ones.
+    """
+    RESOLUTION_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+    ]
+
+    model_config = models.ForeignKey(AIModelConfig, on_delete=models.CASCADE, related_name='latency_rollups')
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    latency_sum = models.FloatField(default=0.0)
+    histogram = models.JSONField(default=dict, help_text="Log-bucket index -> number of calls")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_config', 'resolution', 'bucket_start'], name='unique_latency_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.model_config} {self.resolution} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class NodeTimingRollup(models.Model):
+    """Hourly timing totals for one node type of one workflow, split by the provider it called."""
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='node_timing_rollups')
+    node_type = models.CharField(max_length=50)
+    provider = models.CharField(max_length=50, blank=True, default='')
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0, help_text="Runs that reused a coalesced result")
+    queue_wait_sum = models.FloatField(default=0.0, help_text="Seconds between the node becoming ready and starting")
+    run_time_sum = models.FloatField(default=0.0)
+    input_bytes = models.BigIntegerField(default=0)
+    output_bytes = models.BigIntegerField(default=0)
+    run_time_histogram = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workflow', 'node_type', 'provider', 'bucket_start'], name='unique_node_timing_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.node_type} in {self.workflow_id} {self.bucket_start:%Y-%m-%d %H:00}"
+
+
+class WorkflowTimingRollup(models.Model):
+    """Hourly execution totals for one workflow."""
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='timing_rollups')
+    bucket_start = models.DateTimeField()
+    executions = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    queue_wait_sum = models.FloatField(default=0.0)
+    duration_sum = models.FloatField(default=0.0)
+    duration_histogram = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['workflow', 'bucket_start'], name='unique_workflow_timing_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.workflow_id} {self.bucket_start:%Y-%m-%d %H:00}"
+
+
+class ExecutionProfile(models.Model):
+    """Sampling profile of one workflow execution, as collapsed stacks (see ``analytics.profiling``)."""
+    MODE_CHOICES = [
+        ('cpu', 'CPU time'),
+        ('wall', 'Wall-clock time'),
+    ]
+
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='profiles')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    interval = models.FloatField(help_text="Seconds between samples")
+    samples = models.PositiveIntegerField(default=0)
+    duration = models.FloatField(default=0.0, help_text="Seconds profiled")
+    collapsed_stacks = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.mode} profile of execution {self.execution_id}"
+
+
+class ExecutionMemoryReport(models.Model):
+    """Per-node tracemalloc results of one execution (see ``analytics.memory``)."""
+    execution = models.OneToOneField(WorkflowExecution, on_delete=models.CASCADE, related_name='memory_report')
+    peak_bytes = models.BigIntegerField(default=0, help_text="Highest per-node peak of traced memory")
+    max_rss_bytes = models.BigIntegerField(null=True, blank=True, help_text="Worker's peak RSS at the end of the run")
+    nodes = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Memory report of execution {self.execution_id}"
+
+
+class NodeResult(models.Model):
+    """One node's outcome in one execution, written as the run progresses (see ``analytics.execution_log``)."""
+    STATUS_CHOICES = [
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='node_results')
+    node = models.ForeignKey(Node, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    node_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    output = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=1)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['execution', 'node'], name='unique_node_result'),
+        ]
+
+    def __str__(self):
+        return f"Node {self.node_id} of execution {self.execution_id} ({self.status})"
+
+
+class ExecutionEvent(models.Model):
+    """Append-only progress log of an execution, numbered from 1 by ``sequence``."""
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='events')
+    sequence = models.PositiveIntegerField()
+    event = models.CharField(max_length=30)
+    node = models.ForeignKey(Node, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['execution', 'sequence'], name='unique_execution_event'),
+        ]
+
+    def __str__(self):
+        return f"#{self.sequence} {self.event} of execution {self.execution_id}"
@@ -0,0 +1,235 @@
+"""
+Per-node execution timing.
+
+``NodeTimingRecorder`` is a workflow executor observer (add it to
+``WORKFLOW_EXECUTION_OBSERVERS``). While an execution runs it measures each
+node's queue wait, run time, attempts, input/output size and whether its
+result came from a coalesced call; when the execution finishes it folds the
+measurements into hourly ``NodeTimingRollup`` and ``WorkflowTimingRollup``
+rows in one transaction. No per-node rows are written, so storage grows with
+workflows × node types × hours, not with executions.
+
+The aggregate queries below read only those rollups.
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ai_integration.singleflight import shared_results_in_thread
+from .histogram import Histogram
+from .models import NodeTimingRollup, WorkflowTimingRollup
+from .rollups import ceil_time, floor_time, upsert
+
+logger = logging.getLogger(__name__)
+
+
+def payload_size(value) -> int:
+    from workflows import artifacts
+
+    if value is None:
+        return 0
+    if artifacts.is_reference(value):
+        return value['size']
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+
+class NodeTimingRecorder:
+    def __init__(self, execution, clock=time.perf_counter):
+        self.execution = execution
+        self.clock = clock
+        self.timings = []
+        self._started = {}
+        self._shared_before = {}
+        self._ready_at = None
+        self._run_started = None
+        self._initial_wait = 0.0
+        self._queue_wait = 0.0
+
+    def on_execution_started(self, executor):
+        self._run_started = self._ready_at = self.clock()
+        if executor.queued_at is not None:
+            self._initial_wait = max((timezone.now() - executor.queued_at).total_seconds(), 0.0)
+
+    def on_node_started(self, executor, node):
+        now = self.clock()
+        self._started[node.id] = now
+        self._shared_before[node.id] = shared_results_in_thread()
+        wait = now - self._ready_at
+        if not self.timings:
+            # The first node also waited for a worker to pick the execution up
+            wait += self._initial_wait
+        self._queue_wait = wait
+
+    def _finish(self, executor, node, output, error):
+        from workflows.utils import node_provider
+
+        now = self.clock()
+        self._ready_at = now
+        attempts = executor.attempts.get(node.id, 1)
+        self.timings.append({
+            'node_type': node.type,
+            'provider': node_provider(node),
+            'queue_wait': self._queue_wait,
+            'run_time': now - self._started.pop(node.id, now),
+            'retries': attempts - 1,
+            'cache_hit': shared_results_in_thread() > self._shared_before.pop(node.id, 0),
+            'input_bytes': payload_size(executor.inputs.get(node.id)),
+            'output_bytes': payload_size(output),
+            'error': error,
+        })
+
+    def on_node_finished(self, executor, node, result):
+        self._finish(executor, node, result, error=False)
+
+    def on_node_failed(self, executor, node, error):
+        self._finish(executor, node, None, error=True)
+
+    def on_execution_finished(self, executor, status):
+        duration = self.clock() - self._run_started if self._run_started is not None else 0.0
+        try:
+            self.save(status, duration)
+        except Exception:
+            # Timing is diagnostics only; losing it must not fail the workflow
+            logger.warning(f"Could not save node timings for execution {self.execution.id}", exc_info=True)
+
+    def save(self, status, duration):
+        bucket_start = floor_time(timezone.now(), 'hour')
+        workflow_id = self.execution.workflow_id
+        groups = defaultdict(list)
+        for timing in self.timings:
+            groups[timing['node_type'], timing['provider']].append(timing)
+
+        with transaction.atomic():
+            for (node_type, provider), timings in groups.items():
+                def apply(rollup, timings=timings):
+                    histogram = Histogram(rollup.run_time_histogram)
+                    for timing in timings:
+                        histogram.add(timing['run_time'])
+                        rollup.count += 1
+                        rollup.error_count += int(timing['error'])
+                        rollup.retries += timing['retries']
+                        rollup.cache_hits += int(timing['cache_hit'])
+                        rollup.queue_wait_sum += timing['queue_wait']
+                        rollup.run_time_sum += timing['run_time']
+                        rollup.input_bytes += timing['input_bytes']
+                        rollup.output_bytes += timing['output_bytes']
+                    rollup.run_time_histogram = histogram.to_json()
+
+                upsert(NodeTimingRollup, apply, workflow_id=workflow_id, node_type=node_type,
+                       provider=provider, bucket_start=bucket_start)
+
+            def apply_workflow(rollup):
+                histogram = Histogram(rollup.duration_histogram)
+                histogram.add(duration)
+                rollup.duration_histogram = histogram.to_json()
+                rollup.executions += 1
+                rollup.failures += int(status != 'completed')
+                rollup.queue_wait_sum += self._initial_wait
+                rollup.duration_sum += duration
+
+            upsert(WorkflowTimingRollup, apply_workflow, workflow_id=workflow_id, bucket_start=bucket_start)
+
+
+def _hours(start, end):
+    return {'bucket_start__gte': floor_time(start, 'hour'), 'bucket_start__lt': ceil_time(end, 'hour')}
+
+
+def slowest_node_types(start, end, limit=10, workflow_ids=None):
+    """Node types ordered by mean run time over the (hour-aligned) window."""
+    rollups = NodeTimingRollup.objects.filter(**_hours(start, end))
+    if workflow_ids is not None:
+        rollups = rollups.filter(workflow_id__in=workflow_ids)
+    totals = defaultdict(lambda: {
+        'count': 0, 'errors': 0, 'retries': 0, 'cache_hits': 0, 'queue_wait': 0.0,
+        'run_time': 0.0, 'input_bytes': 0, 'output_bytes': 0, 'histogram': Histogram(),
+    })
+    for row in rollups.values_list('node_type', 'count', 'error_count', 'retries', 'cache_hits', 'queue_wait_sum',
+                                   'run_time_sum', 'input_bytes', 'output_bytes', 'run_time_histogram'):
+        entry = totals[row[0]]
+        entry['count'] += row[1]
+        entry['errors'] += row[2]
+        entry['retries'] += row[3]
+        entry['cache_hits'] += row[4]
+        entry['queue_wait'] += row[5]
+        entry['run_time'] += row[6]
+        entry['input_bytes'] += row[7]
+        entry['output_bytes'] += row[8]
+        entry['histogram'].merge(row[9])
+
+    summary = []
+    for node_type, entry in totals.items():
+        count = entry['count'] or 1
+        summary.append({
+            'node_type': node_type,
+            'count': entry['count'],
+            'error_rate': entry['errors'] / count,
+            'retries': entry['retries'],
+            'cache_hit_rate': entry['cache_hits'] / count,
+            'mean_queue_wait': entry['queue_wait'] / count,
+            'mean_run_time': entry['run_time'] / count,
+            'p95_run_time': entry['histogram'].quantile(0.95),
+            'total_run_time': entry['run_time'],
+            'mean_input_bytes': entry['input_bytes'] / count,
+            'mean_output_bytes': entry['output_bytes'] / count,
+        })
+    summary.sort(key=lambda entry: entry['mean_run_time'], reverse=True)
+    return summary[:limit]
+
+
+def slowest_workflows(start, end, limit=10, user=None):
+    """Workflows ordered by mean execution duration over the (hour-aligned) window."""
+    rollups = WorkflowTimingRollup.objects.filter(**_hours(start, end))
+    if user is not None:
+        rollups = rollups.filter(workflow__user=user)
+    totals = defaultdict(lambda: {'executions': 0, 'failures': 0, 'queue_wait': 0.0, 'duration': 0.0,
+                                  'histogram': Histogram()})
+    names = {}
+    for workflow_id, name, executions, failures, queue_wait, duration, histogram in rollups.values_list(
+        'workflow_id', 'workflow__name', 'executions', 'failures', 'queue_wait_sum', 'duration_sum',
+        'duration_histogram'
+    ):
+        names[workflow_id] = name
+        entry = totals[workflow_id]
+        entry['executions'] += executions
+        entry['failures'] += failures
+        entry['queue_wait'] += queue_wait
+        entry['duration'] += duration
+        entry['histogram'].merge(histogram)
+
+    summary = []
+    for workflow_id, entry in totals.items():
+        executions = entry['executions'] or 1
+        summary.append({
+            'workflow_id': workflow_id,
+            'name': names[workflow_id],
+            'executions': entry['executions'],
+            'failure_rate': entry['failures'] / executions,
+            'mean_queue_wait': entry['queue_wait'] / executions,
+            'mean_duration': entry['duration'] / executions,
+            'p95_duration': entry['histogram'].quantile(0.95),
+        })
+    summary.sort(key=lambda entry: entry['mean_duration'], reverse=True)
+    return summary[:limit]
+
+
+def time_per_provider(start, end, workflow_ids=None):
+    """Total node run time spent in each provider over the (hour-aligned) window."""
+    rollups = NodeTimingRollup.objects.filter(**_hours(start, end))
+    if workflow_ids is not None:
+        rollups = rollups.filter(workflow_id__in=workflow_ids)
+    rows = rollups.values('provider').annotate(
+        calls=Sum('count'), run_time=Sum('run_time_sum'), errors=Sum('error_count')
+    ).order_by('-run_time')
+    return [
+        {'provider': row['provider'] or 'none', 'calls': row['calls'], 'run_time': row['run_time'], 'errors': row['errors']}
+        for row in rows
+    ]
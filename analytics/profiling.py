@@ -0,0 +1,154 @@
+"""
+Sampling profiler for single workflow executions.
+
+``SamplingProfiler`` runs a daemon thread that reads the stack of one target
+thread (the Celery worker thread running the execution) every ``interval``
+seconds via ``sys._current_frames()``, so the profiled code runs unmodified
+and the cost is one stack walk per sample. Stacks are aggregated in the
+collapsed format (``outer;inner;leaf <weight>``) that flamegraph.pl,
+speedscope and most flame graph viewers read.
+
+Two modes:
+
+* ``wall``: every sample counts, so time spent waiting on providers, the DB
+  or sleeps shows up. Weights are sample counts.
+* ``cpu``: samples are weighted by the CPU time the target thread used since
+  the previous sample (in microseconds), so waiting contributes nothing.
+  Needs ``time.pthread_getcpuclockid``; elsewhere it falls back to ``wall``.
+
+Only the target thread is sampled: work handed to pool threads (hedged
+provider calls) shows up as the target waiting on a future.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cpu', 'wall')
+
+
+def _setting(name, default):
+    return getattr(settings, 'PROFILING', {}).get(name, default)
+
+
+def _label(code, roots):
+    filename = code.co_filename
+    for root in roots:
+        if filename.startswith(root):
+            filename = filename[len(root):].lstrip(os.sep)
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    def __init__(self, mode='wall', interval=None, thread_id=None, max_depth=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}; expected one of {MODES}")
+        self.interval = interval or _setting('INTERVAL', 0.005)
+        self.thread_id = thread_id or threading.get_ident()
+        self.max_depth = max_depth or _setting('MAX_DEPTH', 128)
+        self._cpu_clock = None
+        if mode == 'cpu':
+            try:
+                self._cpu_clock = time.pthread_getcpuclockid(self.thread_id)
+            except (AttributeError, OSError):
+                mode = 'wall'
+        self.mode = mode
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._labels = {}
+        self._roots = sorted({str(settings.BASE_DIR), *sys.path[1:]} - {''}, key=len, reverse=True)
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _label(code, self._roots)
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _run(self):
+        last_cpu = time.clock_gettime(self._cpu_clock) if self._cpu_clock is not None else None
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if self._cpu_clock is not None:
+                try:
+                    cpu = time.clock_gettime(self._cpu_clock)
+                except OSError:
+                    # The target thread has exited
+                    break
+                weight = int((cpu - last_cpu) * 1_000_000)
+                last_cpu = cpu
+                if weight <= 0:
+                    continue
+            else:
+                weight = 1
+            self.stacks[self._stack(frame)] += weight
+            self.samples += 1
+            del frame
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='innoflow-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {weight}\n' for stack, weight in self.stacks.most_common())
+
+
+@contextmanager
+def profile(mode='wall', interval=None):
+    """Profile the calling thread for the duration of the block."""
+    profiler = SamplingProfiler(mode, interval).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+@contextmanager
+def profile_execution(execution, mode, interval=None):
+    """Profile the block and save the result as an ``ExecutionProfile`` of ``execution``."""
+    from .models import ExecutionProfile
+
+    profiler = SamplingProfiler(mode, interval).start()
+    try:
+        yield profiler
+    finally:
+        # Saved for failed runs too; those are often the interesting ones
+        profiler.stop()
+        try:
+            ExecutionProfile.objects.create(
+                execution=execution,
+                mode=profiler.mode,
+                interval=profiler.interval,
+                samples=profiler.samples,
+                duration=profiler.duration,
+                collapsed_stacks=profiler.collapsed(),
+            )
+        except Exception:
+            # Never let a failed save replace the execution's own exception
+            logger.warning(f"Could not save the profile of execution {execution.id}", exc_info=True)
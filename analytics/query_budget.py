@@ -0,0 +1,198 @@
+"""
+Per-request and per-execution SQL query budgets.
+
+``track_queries`` collects every ORM query run in its block into a
+``QueryLog``: count, time, and how often each statement shape (the SQL with
+literals and ``IN`` lists folded) was run. The same shape run over and over is
+the signature of an N+1 pattern. Running the same SQL with the same
+parameters more than once is counted separately, as duplicates.
+
+``QueryBudgetMiddleware`` tracks each HTTP request and ``QueryBudgetObserver``
+each workflow execution; both log a warning when the work goes over the
+limits in ``QUERY_BUDGET``. The test helpers in ``analytics.testing`` assert
+budgets on endpoints.
+
+Queries are seen through an execute wrapper added to each connection as it's
+opened, which does nothing unless a block is being tracked.
+"""
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_active = contextvars.ContextVar('innoflow_query_logs', default=())
+
+_IN_LIST = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+def _setting(name, default):
+    return getattr(settings, 'QUERY_BUDGET', {}).get(name, default)
+
+
+def fingerprint(sql: str) -> str:
+    """``sql`` with literals replaced and ``IN`` lists folded, so the queries of an N+1 loop match."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryLog:
+    def __init__(self, label=''):
+        self.label = label
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.shape_time = Counter()
+        self.duplicates = 0
+        self._seen = set()
+
+    def record(self, sql, params, duration):
+        self.count += 1
+        self.duration += duration
+        shape = fingerprint(sql)
+        self.shapes[shape] += 1
+        self.shape_time[shape] += duration
+        try:
+            exact = (sql, repr(params))
+        except Exception:
+            return
+        if exact in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(exact)
+
+    def repeated(self, threshold=None):
+        """Statement shapes run at least ``threshold`` times, most frequent first."""
+        threshold = threshold or _setting('REPEAT_THRESHOLD', 10)
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def violations(self, max_queries=None, max_time=None, repeat_threshold=None) -> list:
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f'{self.count} queries (budget {max_queries})')
+        if max_time is not None and self.duration > max_time:
+            problems.append(f'{self.duration * 1000:.0f}ms in queries (budget {max_time * 1000:.0f}ms)')
+        for shape, count in self.repeated(repeat_threshold):
+            problems.append(f'{count}x {shape[:160]}')
+        return problems
+
+    def summary(self) -> dict:
+        return {
+            'queries': self.count,
+            'duration': round(self.duration, 6),
+            'duplicates': self.duplicates,
+            'top': [{'sql': shape, 'count': count} for shape, count in self.shapes.most_common(5)],
+        }
+
+    def report(self) -> str:
+        lines = [f'{self.count} queries, {self.duration * 1000:.1f}ms, {self.duplicates} exact duplicates']
+        lines += [f'  {count:>4}x {shape}' for shape, count in self.shapes.most_common()]
+        return '\n'.join(lines)
+
+
+def record_query(execute, sql, params, many, context):
+    logs = _active.get()
+    if not logs:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for log in logs:
+            log.record(sql, params, duration)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _instrument_open_connections():
+    # Connections opened before this module was imported never saw connection_created
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(None, connection)
+
+
+def start(label='') -> tuple:
+    """Start collecting into a new log; returns ``(log, token)`` for ``stop``."""
+    _instrument_open_connections()
+    log = QueryLog(label)
+    return log, _active.set(_active.get() + (log,))
+
+
+def stop(token):
+    _active.reset(token)
+
+
+@contextmanager
+def track_queries(label=''):
+    """Collect the queries run in this block (and nested tracked blocks) into a ``QueryLog``."""
+    log, token = start(label)
+    try:
+        yield log
+    finally:
+        stop(token)
+
+
+class QueryBudgetMiddleware:
+    """Logs requests over ``QUERY_BUDGET['REQUEST_MAX_QUERIES']``/``REQUEST_MAX_TIME`` or with N+1 patterns."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_queries(request.path) as log:
+            response = self.get_response(request)
+        problems = log.violations(_setting('REQUEST_MAX_QUERIES', None), _setting('REQUEST_MAX_TIME', None))
+        if problems:
+            logger.warning(f"{request.method} {request.path} is over its query budget: {'; '.join(problems)}")
+        if _setting('HEADERS', settings.DEBUG):
+            response['X-Query-Count'] = str(log.count)
+            response['X-Query-Time-Ms'] = f'{log.duration * 1000:.1f}'
+        return response
+
+
+class QueryBudgetObserver:
+    """
+    Workflow executor observer that tracks an execution's queries and logs
+    executions over ``EXECUTION_MAX_QUERIES_PER_NODE`` (on top of
+    ``EXECUTION_BASE_QUERIES``) or with N+1 patterns.
+    """
+
+    def __init__(self, execution):
+        self.execution = execution
+        self.log = None
+        self._token = None
+        self._nodes = 0
+
+    def on_execution_started(self, executor):
+        self.log, self._token = start(f'execution {self.execution.id}')
+
+    def on_node_started(self, executor, node):
+        self._nodes += 1
+
+    def on_execution_finished(self, executor, status):
+        if self._token is None:
+            return
+        stop(self._token)
+        self._token = None
+        budget = _setting('EXECUTION_BASE_QUERIES', 20) + _setting('EXECUTION_MAX_QUERIES_PER_NODE', 10) * self._nodes
+        # The executor looks up each node's input on its own, so allow one repeat per node
+        problems = self.log.violations(budget, repeat_threshold=max(_setting('REPEAT_THRESHOLD', 10), self._nodes + 1))
+        if problems:
+            logger.warning(f"Execution {self.execution.id} is over its query budget: {'; '.join(problems)}")
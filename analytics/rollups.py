@@ -0,0 +1,124 @@
+"""
+Time-bucketed rollups of provider call latency.
+
+``record`` folds one call into the minute and hour ``LatencyRollup`` rows for
+its model configuration. ``summarize`` answers percentile, throughput and
+error-rate questions for any window by merging at most a couple of hundred
+rollup rows, so its cost doesn't grow with the number of responses stored.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .histogram import Histogram
+from .models import LatencyRollup
+
+RESOLUTIONS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+}
+QUANTILES = {'p50': 0.5, 'p95': 0.95, 'p99': 0.99}
+
+
+def floor_time(moment, resolution):
+    moment = moment.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        moment = moment.replace(minute=0)
+    return moment
+
+
+def ceil_time(moment, resolution):
+    floored = floor_time(moment, resolution)
+    return floored if floored == moment else floored + RESOLUTIONS[resolution]
+
+
+def record(model_config_id, latency, error=False, at=None):
+    """Add one call to the rollups of ``model_config_id``."""
+    at = at or timezone.now()
+    for resolution in RESOLUTIONS:
+        _add(model_config_id, resolution, floor_time(at, resolution), latency, error)
+
+
+def _add(model_config_id, resolution, bucket_start, latency, error):
+    def apply(rollup):
+        histogram = Histogram(rollup.histogram)
+        histogram.add(latency)
+        rollup.histogram = histogram.to_json()
+        rollup.count += 1
+        rollup.error_count += int(error)
+        rollup.latency_sum += latency
+
+    upsert(LatencyRollup, apply, model_config_id=model_config_id, resolution=resolution, bucket_start=bucket_start)
+
+
+def upsert(model, apply, **lookup):
+    """Lock (or create) the rollup row matching ``lookup``, let ``apply`` update it in place and save it."""
+    with transaction.atomic():
+        rollup = model.objects.select_for_update().filter(**lookup).first()
+        if rollup is None:
+            try:
+                # Savepoint so a concurrent insert doesn't break the surrounding transaction
+                with transaction.atomic():
+                    rollup = model.objects.create(**lookup)
+            except IntegrityError:
+                rollup = model.objects.select_for_update().get(**lookup)
+        apply(rollup)
+        rollup.save()
+
+
+def window_filter(start, end):
+    """
+    Rollup rows covering ``[start, end)``: hour rows for the whole hours and
+    minute rows for the ragged edges (rounded out to whole minutes).
+    """
+    first_hour, last_hour = ceil_time(start, 'hour'), floor_time(end, 'hour')
+    minute_start, minute_end = floor_time(start, 'minute'), ceil_time(end, 'minute')
+    if first_hour >= last_hour:
+        return Q(resolution='minute', bucket_start__gte=minute_start, bucket_start__lt=minute_end)
+    return (
+        Q(resolution='minute', bucket_start__gte=minute_start, bucket_start__lt=first_hour)
+        | Q(resolution='hour', bucket_start__gte=first_hour, bucket_start__lt=last_hour)
+        | Q(resolution='minute', bucket_start__gte=last_hour, bucket_start__lt=minute_end)
+    )
+
+
+def summarize(start, end, model_config_ids=None):
+    """Latency percentiles, throughput and error rate per model configuration over ``[start, end)``."""
+    rollups = LatencyRollup.objects.filter(window_filter(start, end))
+    if model_config_ids is not None:
+        rollups = rollups.filter(model_config_id__in=model_config_ids)
+
+    merged = {}
+    for model_config_id, count, errors, latency_sum, histogram in rollups.values_list(
+        'model_config_id', 'count', 'error_count', 'latency_sum', 'histogram'
+    ):
+        totals = merged.setdefault(model_config_id, {'count': 0, 'errors': 0, 'latency_sum': 0.0, 'histogram': Histogram()})
+        totals['count'] += count
+        totals['errors'] += errors
+        totals['latency_sum'] += latency_sum
+        totals['histogram'].merge(histogram)
+
+    seconds = max((end - start).total_seconds(), 1.0)
+    summary = {}
+    for model_config_id, totals in merged.items():
+        count = totals['count']
+        summary[model_config_id] = {
+            'count': count,
+            'errors': totals['errors'],
+            'error_rate': totals['errors'] / count if count else 0.0,
+            'throughput': count / seconds,
+            'mean': totals['latency_sum'] / count if count else None,
+            **{name: totals['histogram'].quantile(q) for name, q in QUANTILES.items()},
+        }
+    return summary
+
+
+def prune(now=None):
+    """Drop minute rollups past ``ANALYTICS_ROLLUPS['MINUTE_RETENTION']``; hour rows are kept."""
+    retention = getattr(settings, 'ANALYTICS_ROLLUPS', {}).get('MINUTE_RETENTION', timedelta(days=7))
+    cutoff = (now or timezone.now()) - retention
+    deleted, _ = LatencyRollup.objects.filter(resolution='minute', bucket_start__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ai_integration.models import ModelResponse
+from ai_integration.signals import model_call_failed
+from . import rollups
+
+
+@receiver(post_save, sender=ModelResponse)
+def record_response_latency(sender, instance, created, **kwargs):
+    if created:
+        rollups.record(instance.model_config_id, instance.latency, at=instance.created_at)
+
+
+@receiver(model_call_failed)
+def record_failed_call(sender, model_config, latency, **kwargs):
+    rollups.record(model_config.id, latency, error=True)
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import rollups
+
+
+@shared_task
+def prune_latency_rollups() -> int:
+    return rollups.prune()
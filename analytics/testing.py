@@ -0,0 +1,40 @@
+"""
+Test helpers for query budgets.
+
+    with assert_query_budget(max_queries=5, max_repeats=3):
+        self.client.get('/api/workflows/workflows/')
+
+fails with the statements that ran when the block goes over budget. Test
+cases can mix in ``QueryBudgetMixin`` for ``self.assertQueryBudget(...)``.
+"""
+from contextlib import contextmanager
+
+from .query_budget import track_queries
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, max_repeats=None, max_duplicates=None):
+    """
+    Fail if the block runs more than ``max_queries`` queries, the same
+    statement shape more than ``max_repeats`` times, or more than
+    ``max_duplicates`` exact repeats of a query.
+    """
+    with track_queries('test') as log:
+        yield log
+    problems = []
+    if max_queries is not None and log.count > max_queries:
+        problems.append(f'{log.count} queries, budget {max_queries}')
+    if max_repeats is not None:
+        problems += [
+            f'statement run {count} times, budget {max_repeats}: {shape[:160]}'
+            for shape, count in log.shapes.most_common() if count > max_repeats
+        ]
+    if max_duplicates is not None and log.duplicates > max_duplicates:
+        problems.append(f'{log.duplicates} duplicate queries, budget {max_duplicates}')
+    if problems:
+        raise AssertionError('Query budget exceeded: ' + '; '.join(problems) + '\n' + log.report())
+
+
+class QueryBudgetMixin:
+    def assertQueryBudget(self, max_queries=None, max_repeats=None, max_duplicates=None):
+        return assert_query_budget(max_queries, max_repeats, max_duplicates)
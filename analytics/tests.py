@@ -1,3 +1,719 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+import requests
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import TestCase as SimpleTestCase
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from ai_integration.models import AIModelConfig, ModelComparison, ModelResponse
+from ai_integration.fake_servers import FakeOtlpCollector, FakeProviderServer
+from analytics import estimation, execution_log, node_timing, profiling, query_budget, rollups, tracing
+from analytics.histogram import Histogram, RELATIVE_ACCURACY
+from analytics.loadtest import LoadTest
+from analytics.models import ExecutionEvent, LatencyRollup, NodeResult, NodeTimingRollup, WorkflowTimingRollup
+from analytics.metrics import Registry
+from analytics.node_timing import NodeTimingRecorder
+from analytics.testing import QueryBudgetMixin
+from workflows.execution import WorkflowExecutor
+from workflows.models import Workflow, Node, WorkflowExecution, NodeConnection
 
-# Create your tests here.
+User = get_user_model()
+
+START = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        histogram = Histogram()
+        values = [i / 100 for i in range(1, 1001)]
+        for value in values:
+            histogram.add(value)
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(histogram.quantile(q), exact, delta=exact * RELATIVE_ACCURACY * 1.01)
+
+    def test_merge_matches_single_histogram(self):
+        a, b, both = Histogram(), Histogram(), Histogram()
+        for value in (0.1, 0.2, 0.3):
+            a.add(value)
+            both.add(value)
+        for value in (1.0, 5.0):
+            b.add(value)
+            both.add(value)
+        merged = Histogram(a.to_json()).merge(b.to_json())
+        self.assertEqual(merged.counts, both.counts)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+class LatencyRollupTests(TestCase):
+    def setUp(self):
+        self.config = AIModelConfig.objects.create(
+            name="Test Model", provider="OPENAI", model_name="gpt-3.5-turbo", api_key="key"
+        )
+
+    def test_record_updates_minute_and_hour_rows(self):
+        rollups.record(self.config.id, 0.5, at=START + timedelta(minutes=5, seconds=10))
+        rollups.record(self.config.id, 1.5, error=True, at=START + timedelta(minutes=5, seconds=50))
+        minute = LatencyRollup.objects.get(resolution='minute')
+        self.assertEqual(minute.bucket_start, START + timedelta(minutes=5))
+        self.assertEqual((minute.count, minute.error_count), (2, 1))
+        hour = LatencyRollup.objects.get(resolution='hour')
+        self.assertEqual(hour.bucket_start, START)
+        self.assertEqual(hour.latency_sum, 2.0)
+
+    def test_summary_over_window(self):
+        for minute in range(0, 180):
+            rollups.record(self.config.id, 1.0 if minute % 10 else 10.0, at=START + timedelta(minutes=minute))
+        summary = rollups.summarize(START + timedelta(minutes=30), START + timedelta(minutes=150))[self.config.id]
+        self.assertEqual(summary['count'], 120)
+        self.assertAlmostEqual(summary['throughput'], 120 / 7200)
+        self.assertAlmostEqual(summary['p50'], 1.0, delta=0.02)
+        self.assertAlmostEqual(summary['p95'], 10.0, delta=0.2)
+        self.assertEqual(summary['error_rate'], 0.0)
+
+    def test_query_reads_hour_rows_for_whole_hours(self):
+        for minute in range(0, 24 * 60, 7):
+            rollups.record(self.config.id, 0.2, at=START + timedelta(minutes=minute))
+        window = rollups.window_filter(START + timedelta(minutes=30), START + timedelta(hours=23, minutes=15))
+        rows = LatencyRollup.objects.filter(window)
+        self.assertEqual(rows.filter(resolution='hour').count(), 22)
+        self.assertLessEqual(rows.filter(resolution='minute').count(), 45)
+
+    def test_saved_responses_are_recorded(self):
+        comparison = ModelComparison.objects.create(prompt="Hi")
+        ModelResponse.objects.create(comparison=comparison, model_config=self.config, response="Hello", latency=0.75)
+        self.assertEqual(LatencyRollup.objects.filter(model_config=self.config).count(), 2)
+
+    def test_prune_keeps_hour_rows(self):
+        rollups.record(self.config.id, 0.5, at=START)
+        self.assertEqual(rollups.prune(now=START + timedelta(days=30)), 1)
+        self.assertTrue(LatencyRollup.objects.filter(resolution='hour').exists())
+
+class LatencyEndpointTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+
+    def test_latency_summary(self):
+        config = AIModelConfig.objects.create(
+            name="Test Model", provider="OPENAI", model_name="gpt-3.5-turbo", api_key="key"
+        )
+        rollups.record(config.id, 0.5, at=START + timedelta(minutes=1))
+        response = self.client.get(f'/api/analytics/latency/{config.id}/', {
+            'start': '2026-01-01T00:00:00Z', 'end': '2026-01-01T01:00:00Z'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['models'][str(config.id)]['count'], 1)
+
+    def test_bad_window_is_rejected(self):
+        response = self.client.get('/api/analytics/latency/', {'window': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/analytics/latency/', {'window': '99999999999d'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/analytics/latency/').status_code, 401)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class NodeTimingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.workflow = Workflow.objects.create(name='Test Workflow', user=self.user)
+        self.text = Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'Hello'}, order=1)
+        self.summary = Node.objects.create(
+            workflow=self.workflow, type='huggingface_summarization', config={'max_retries': 1}, order=2
+        )
+        NodeConnection.objects.create(source_node=self.text, target_node=self.summary)
+
+    def run_execution(self, outcomes):
+        clock = FakeClock()
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        recorder = NodeTimingRecorder(execution, clock=clock)
+        outcomes = iter(outcomes)
+
+        def fake_execute_node(node, input_data, continue_on_error=False):
+            seconds, outcome = next(outcomes)
+            clock.now += seconds
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with patch('workflows.execution.execute_node', side_effect=fake_execute_node):
+            WorkflowExecutor(execution, observers=[recorder]).execute_workflow()
+        return recorder
+
+    def test_records_rollups_per_node_type(self):
+        recorder = self.run_execution([(0.1, 'Hello'), (2.0, ConnectionError('flaky')), (3.0, 'Summary')])
+        summary = [t for t in recorder.timings if t['node_type'] == 'huggingface_summarization'][0]
+        self.assertEqual(summary['retries'], 1)
+        self.assertEqual(summary['run_time'], 5.0)
+        self.assertEqual(summary['input_bytes'], 5)
+        self.assertEqual(summary['provider'], 'huggingface')
+
+        rollup = NodeTimingRollup.objects.get(node_type='huggingface_summarization')
+        self.assertEqual((rollup.count, rollup.retries, rollup.output_bytes), (1, 1, 7))
+        workflow_rollup = WorkflowTimingRollup.objects.get(workflow=self.workflow)
+        self.assertEqual(workflow_rollup.executions, 1)
+        self.assertAlmostEqual(workflow_rollup.duration_sum, 5.1)
+
+    def test_aggregates(self):
+        self.run_execution([(0.1, 'Hello'), (3.0, 'Summary')])
+        self.run_execution([(0.1, 'Hello'), (1.0, 'Summary')])
+        now = timezone.now()
+        start, end = now - timedelta(hours=1), now + timedelta(minutes=1)
+        slowest = node_timing.slowest_node_types(start, end)
+        self.assertEqual(slowest[0]['node_type'], 'huggingface_summarization')
+        self.assertAlmostEqual(slowest[0]['mean_run_time'], 2.0)
+        self.assertEqual(node_timing.slowest_workflows(start, end)[0]['executions'], 2)
+        providers = {p['provider']: p for p in node_timing.time_per_provider(start, end)}
+        self.assertAlmostEqual(providers['huggingface']['run_time'], 4.0)
+        self.assertEqual(providers['none']['calls'], 2)
+
+    def test_endpoints_only_show_own_workflows(self):
+        self.run_execution([(0.1, 'Hello'), (3.0, 'Summary')])
+        other = User.objects.create_user(username='other', password='testpassword')
+        self.client.force_authenticate(user=other)
+        response = self.client.get('/api/analytics/nodes/slowest/', {'window': '1h'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['node_types'], [])
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/analytics/workflows/slowest/', {'window': '1h'})
+        self.assertEqual(response.data['workflows'][0]['workflow_id'], self.workflow.id)
+        response = self.client.get('/api/analytics/providers/time/', {'window': '1h'})
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_render_text_format(self):
+        registry = Registry()
+        calls = registry.counter('test_calls_total', 'Calls', ['provider'])
+        latency = registry.histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        calls.inc(provider='OPENAI')
+        calls.inc(2, provider='OPENAI')
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        text = registry.render()
+        self.assertIn('# TYPE test_calls_total counter', text)
+        self.assertIn('test_calls_total{provider="OPENAI"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count 3', text)
+
+    def test_wrong_labels_are_rejected(self):
+        calls = Registry().counter('test_calls_total', 'Calls', ['provider'])
+        with self.assertRaises(ValueError):
+            calls.inc(model='x')
+
+    def test_multiprocess_merge(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = Registry(multiprocess_dir=directory)
+            calls = registry.counter('test_calls_total', 'Calls')
+            running = registry.gauge('test_running', 'Running', mode='livesum')
+            calls.inc()
+            running.set(2)
+            # Another process, since exited: its counters still count, its live gauges don't
+            dead_pid = 2 ** 22 + 12345
+            with open(os.path.join(directory, f'metrics_{dead_pid}.json'), 'w') as f:
+                json.dump({
+                    'test_calls_total': {'type': 'counter', 'help': 'Calls', 'labelnames': [], 'values': [[[], 4]]},
+                    'test_running': {'type': 'gauge', 'help': 'Running', 'labelnames': [], 'mode': 'livesum',
+                                     'values': [[[], 7]]},
+                }, f)
+            text = registry.render()
+        self.assertIn('test_calls_total 5', text)
+        self.assertIn('test_running 2', text)
+
+    def test_forked_child_starts_empty(self):
+        registry = Registry()
+        calls = registry.counter('test_calls_total', 'Calls')
+        calls.inc()
+        registry.after_fork()
+        self.assertNotIn('test_calls_total 1', registry.render())
+
+class MetricsEndpointTests(TestCase):
+    def test_scrape(self):
+        AIModelConfig.objects.count()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('innoflow_db_queries_total{alias="default",kind="select"}', response.content.decode())
+
+    @override_settings(METRICS={'AUTH_TOKEN': 'secret'})
+    def test_scrape_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(span.to_dict() for span in spans)
+
+@override_settings(TRACING={'ENABLED': True, 'SAMPLE_RATE': 0.0})
+class TracingTests(TestCase):
+    def setUp(self):
+        self.exporter = RecordingExporter()
+        tracing.set_exporter(self.exporter)
+        self.addCleanup(tracing.set_exporter, None)
+
+    def test_sampling_is_stable_per_key(self):
+        decisions = {tracing.sampled(key, rate=0.5) for _ in range(5) for key in [42]}
+        self.assertEqual(len(decisions), 1)
+        self.assertAlmostEqual(sum(tracing.sampled(key, rate=0.25) for key in range(4000)), 1000, delta=100)
+        with tracing.start_trace('run_workflow', key=1) as root:
+            self.assertIsNone(root)
+            with tracing.span('execute_node') as child:
+                self.assertIsNone(child)
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_spans_nest_and_carry_execution_id(self):
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        workflow = Workflow.objects.create(name='Test Workflow', user=user)
+        Node.objects.create(workflow=workflow, type='text_input', config={'text': 'Hi'}, order=1)
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+        with patch('workflows.execution.execute_node', return_value='Hi'):
+            with tracing.start_trace('run_workflow', force=True, execution_id=execution.id):
+                WorkflowExecutor(execution, observers=[]).execute_workflow()
+
+        spans = {span['name']: span for span in self.exporter.spans}
+        root = spans['run_workflow']
+        self.assertIsNone(root['parent_id'])
+        self.assertEqual(spans['execute_node']['parent_id'], root['span_id'])
+        self.assertEqual(spans['execute_node']['attributes']['node_type'], 'text_input')
+        self.assertIn('db.query', spans)
+        self.assertTrue(all(span['attributes']['execution_id'] == execution.id for span in self.exporter.spans))
+        self.assertEqual(len({span['trace_id'] for span in self.exporter.spans}), 1)
+
+    def test_errors_are_marked(self):
+        with self.assertRaises(ValueError):
+            with tracing.start_trace('run_workflow', force=True):
+                with tracing.span('execute_node'):
+                    raise ValueError('bad input')
+        self.assertTrue(all(span['status'] == 'error' for span in self.exporter.spans))
+
+    def test_wrapped_functions_join_the_trace_from_other_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        def work():
+            with tracing.span('provider.request'):
+                pass
+
+        with tracing.start_trace('run_workflow', force=True):
+            with ThreadPoolExecutor(1) as pool:
+                pool.submit(tracing.wrap(work)).result()
+        self.assertEqual({span['name'] for span in self.exporter.spans}, {'run_workflow', 'provider.request'})
+
+class TraceExporterTests(SimpleTestCase):
+    def make_trace(self):
+        trace = tracing.Trace({'execution_id': 7})
+        root = tracing.Span(trace, 'run_workflow', start=100.0)
+        child = tracing.Span(trace, 'execute_node', root.span_id, {'node_type': 'text_input'}, start=100.5)
+        child.finish(101.0)
+        root.finish(102.0)
+        return trace.spans
+
+    def test_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.jsonl')
+            tracing.JsonlExporter(path).export(self.make_trace())
+            with open(path) as f:
+                spans = [json.loads(line) for line in f]
+        self.assertEqual(spans[0]['duration'], 0.5)
+        self.assertEqual(spans[1]['attributes'], {'execution_id': 7})
+
+    def test_chrome_trace_can_be_appended(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'traces.json')
+            exporter = tracing.ChromeTraceExporter(path)
+            exporter.export(self.make_trace())
+            exporter.export(self.make_trace())
+            with open(path) as f:
+                events = json.loads(f.read().rstrip().rstrip(',') + ']')
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertEqual(events[0]['dur'], 500000)
+
+    def test_otlp_to_collector_stand_in(self):
+        with FakeOtlpCollector() as collector:
+            tracing.OtlpHttpExporter(collector.url).export(self.make_trace())
+        self.assertEqual(len(collector.spans), 2)
+        child = [span for span in collector.spans if span['name'] == 'execute_node'][0]
+        self.assertIn('parentSpanId', child)
+        self.assertIn({'key': 'execution_id', 'value': {'intValue': '7'}}, child['attributes'])
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class SamplingProfilerTests(SimpleTestCase):
+    def test_wall_mode_sees_sleeping(self):
+        with profiling.profile('wall', interval=0.002) as profiler:
+            time.sleep(0.1)
+        self.assertGreater(profiler.samples, 5)
+        self.assertIn('test_wall_mode_sees_sleeping', profiler.collapsed())
+
+    def test_cpu_mode_weights_by_cpu_time(self):
+        with profiling.profile('cpu', interval=0.002) as profiler:
+            time.sleep(0.1)
+            busy(0.1)
+        if profiler.mode != 'cpu':
+            self.skipTest('Per-thread CPU clocks are not available here')
+        busy_weight = sum(weight for stack, weight in profiler.stacks.items() if 'busy (' in stack)
+        self.assertGreater(busy_weight, 0.8 * sum(profiler.stacks.values()))
+
+    def test_collapsed_format(self):
+        with profiling.profile('wall', interval=0.002) as profiler:
+            busy(0.05)
+        for line in profiler.collapsed().splitlines():
+            stack, weight = line.rsplit(' ', 1)
+            self.assertTrue(weight.isdigit())
+            self.assertIn(';', stack)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            profiling.SamplingProfiler('gpu')
+
+class ProfiledExecutionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Test Workflow', user=self.user)
+        Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'Hi'}, order=1)
+
+    def test_execute_with_profile_flag(self):
+        with patch('workflows.execution.execute_node', side_effect=lambda *args, **kwargs: busy(0.05) or 'Hi'):
+            response = self.client.post(f'/api/workflows/workflows/{self.workflow.id}/execute/', {'profile': 'wall'}, format='json')
+        execution_id = response.data['execution_id']
+        response = self.client.get(f'/api/workflows/workflow_executions/{execution_id}/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profile-Mode'], 'wall')
+        self.assertIn('busy', response.content.decode())
+
+    def test_failed_profile_save_keeps_the_execution_error(self):
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        with patch('analytics.models.ExecutionProfile.objects.create', side_effect=RuntimeError('database gone')):
+            with self.assertLogs('analytics.profiling', 'WARNING'):
+                with self.assertRaisesMessage(ValueError, 'node failed'):
+                    with profiling.profile_execution(execution, 'wall'):
+                        raise ValueError('node failed')
+
+    def test_unprofiled_execution_has_no_profile(self):
+        with patch('workflows.execution.execute_node', return_value='Hi'):
+            response = self.client.post(f'/api/workflows/workflows/{self.workflow.id}/execute/')
+        response = self.client.get(f"/api/workflows/workflow_executions/{response.data['execution_id']}/profile/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bad_profile_mode(self):
+        response = self.client.post(f'/api/workflows/workflows/{self.workflow.id}/execute/', {'profile': 'gpu'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+def allocate(size):
+    return bytearray(size)
+
+
+class MemoryProfilerTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Test Workflow', user=self.user)
+        self.small = Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'Hi'}, order=1)
+        self.big = Node.objects.create(workflow=self.workflow, type='summarization', config={}, order=2)
+
+    def test_per_node_peak_and_allocation_sites(self):
+        kept = []
+
+        def fake_execute(node, input_data, continue_on_error=False):
+            if node.type == 'summarization':
+                kept.append(allocate(5_000_000))
+            return 'Hi'
+
+        with patch('workflows.execution.execute_node', side_effect=fake_execute):
+            response = self.client.post(f'/api/workflows/workflows/{self.workflow.id}/execute/', {'memory_profile': True}, format='json')
+        response = self.client.get(f"/api/workflows/workflow_executions/{response.data['execution_id']}/memory/")
+        self.assertEqual(response.status_code, 200)
+        nodes = {node['node_id']: node for node in response.data['nodes']}
+        self.assertLess(nodes[self.small.id]['peak_bytes'], 1_000_000)
+        self.assertGreaterEqual(nodes[self.big.id]['peak_bytes'], 5_000_000)
+        self.assertGreaterEqual(nodes[self.big.id]['retained_bytes'], 5_000_000)
+        self.assertIn('analytics/tests.py', nodes[self.big.id]['top_allocations'][0]['location'])
+        self.assertGreaterEqual(response.data['peak_bytes'], 5_000_000)
+
+    def test_execution_without_memory_profile(self):
+        with patch('workflows.execution.execute_node', return_value='Hi'):
+            response = self.client.post(f'/api/workflows/workflows/{self.workflow.id}/execute/')
+        response = self.client.get(f"/api/workflows/workflow_executions/{response.data['execution_id']}/memory/")
+        self.assertEqual(response.status_code, 404)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    def test_stages_report_throughput_and_errors(self):
+        test = LoadTest(target=self.live_server_url, latency_median=0.001, concurrency=4, seed=1).setup()
+        try:
+            self.assertEqual(AIModelConfig.objects.filter(name__startswith='loadtest').count(), 4)
+            stages = test.run(['execute', 'compare'], rates=[20], duration=0.25)
+        finally:
+            test.teardown()
+        execute, compare = stages
+        self.assertEqual(execute['sent'], 5)
+        self.assertEqual(execute['outcomes'], {'ok': 5})
+        self.assertEqual(execute['error_rate'], 0.0)
+        self.assertIsNotNone(execute['p99'])
+        self.assertEqual(compare['sent'], 5)
+        self.assertFalse(AIModelConfig.objects.filter(name__startswith='loadtest').exists())
+
+    def test_fake_provider_error_rate(self):
+        with FakeProviderServer('deepseek', error_rate=1.0) as server:
+            response = requests.post(f'{server.url}/v1/chat/completions', json={'model': 'fake'})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(server.errors, 1)
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def make_workflows(self, count, nodes=3):
+        for i in range(count):
+            workflow = Workflow.objects.create(name=f'Workflow {i}', user=self.user)
+            for order in range(nodes):
+                Node.objects.create(workflow=workflow, type='text_input', config={}, order=order)
+
+    def test_fingerprint_folds_literals_and_in_lists(self):
+        self.assertEqual(
+            query_budget.fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            query_budget.fingerprint("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 21"),
+        )
+
+    def test_detects_n_plus_one(self):
+        self.make_workflows(12)
+        with query_budget.track_queries() as log:
+            for workflow in Workflow.objects.all():
+                list(workflow.nodes.all())
+        self.assertEqual(log.count, 13)
+        shape, count = log.repeated(10)[0]
+        self.assertEqual(count, 12)
+        self.assertIn('workflows_node', shape)
+
+    def test_duplicates(self):
+        self.make_workflows(1)
+        with query_budget.track_queries() as log:
+            Workflow.objects.count()
+            Workflow.objects.count()
+        self.assertEqual(log.duplicates, 1)
+
+    def test_workflow_list_budget_does_not_grow_with_data(self):
+        self.make_workflows(15)
+        with self.assertQueryBudget(max_queries=5, max_repeats=1):
+            response = self.client.get('/api/workflows/workflows/')
+        self.assertEqual(len(response.data), 15)
+
+    def test_node_and_execution_lists_budget(self):
+        self.make_workflows(5)
+        for workflow in Workflow.objects.all():
+            WorkflowExecution.objects.create(workflow=workflow)
+        with self.assertQueryBudget(max_queries=3, max_repeats=1):
+            self.client.get('/api/workflows/nodes/')
+        with self.assertQueryBudget(max_queries=3, max_repeats=1):
+            self.client.get('/api/workflows/workflow_executions/')
+
+    def test_budget_failure_lists_statements(self):
+        self.make_workflows(3)
+        with self.assertRaises(AssertionError) as cm:
+            with self.assertQueryBudget(max_repeats=2):
+                for workflow in Workflow.objects.all():
+                    list(workflow.nodes.all())
+        self.assertIn('workflows_node', str(cm.exception))
+
+    @override_settings(QUERY_BUDGET={'REQUEST_MAX_QUERIES': 1, 'HEADERS': True})
+    def test_middleware_logs_and_reports(self):
+        self.make_workflows(2)
+        with self.assertLogs('analytics.query_budget', 'WARNING') as logs:
+            response = self.client.get('/api/workflows/workflows/')
+        self.assertGreater(int(response['X-Query-Count']), 1)
+        self.assertIn('over its query budget', logs.output[0])
+
+    @override_settings(QUERY_BUDGET={'EXECUTION_BASE_QUERIES': 0, 'EXECUTION_MAX_QUERIES_PER_NODE': 1})
+    def test_execution_observer(self):
+        self.make_workflows(1, nodes=2)
+        execution = WorkflowExecution.objects.create(workflow=Workflow.objects.get())
+        observer = query_budget.QueryBudgetObserver(execution)
+        with patch('workflows.execution.execute_node', return_value='Hi'), \
+                self.assertLogs('analytics.query_budget', 'WARNING') as logs:
+            WorkflowExecutor(execution, observers=[observer]).execute_workflow()
+        self.assertGreater(observer.log.count, 2)
+        self.assertIn(f'Execution {execution.id}', logs.output[0])
+
+
+class EstimationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        # input -> (slow summary, fast text) -> output
+        self.workflow = Workflow.objects.create(name='Diamond', user=self.user)
+        self.start = Node.objects.create(workflow=self.workflow, type='text_input', config={}, order=0)
+        self.fast = Node.objects.create(workflow=self.workflow, type='text_output', config={}, order=1)
+        self.slow = Node.objects.create(workflow=self.workflow, type='huggingface_summarization', config={}, order=2)
+        self.end = Node.objects.create(workflow=self.workflow, type='text_output', config={'provider': 'last'}, order=3)
+        for source, target in [(self.start, self.fast), (self.start, self.slow), (self.fast, self.end), (self.slow, self.end)]:
+            NodeConnection.objects.create(source_node=source, target_node=target)
+
+        bucket = rollups.floor_time(timezone.now(), 'hour')
+        self.add_rollup(self.workflow, 'text_input', '', bucket, [0.01] * 10)
+        self.add_rollup(self.workflow, 'text_output', '', bucket, [0.02] * 10)
+        self.add_rollup(self.workflow, 'huggingface_summarization', 'huggingface', bucket, [2.0] * 8 + [6.0] * 2)
+        other = Workflow.objects.create(name='Other', user=self.user)
+        self.add_rollup(other, 'text_output', 'elsewhere', bucket, [0.5] * 10)
+
+    def add_rollup(self, workflow, node_type, provider, bucket, run_times):
+        histogram = Histogram()
+        for run_time in run_times:
+            histogram.add(run_time)
+        NodeTimingRollup.objects.create(
+            workflow=workflow, node_type=node_type, provider=provider, bucket_start=bucket,
+            count=len(run_times), run_time_sum=sum(run_times), run_time_histogram=histogram.to_json(),
+        )
+
+    def test_estimate_endpoint(self):
+        response = self.client.get(f'/api/workflows/workflows/{self.workflow.id}/estimate/')
+        self.assertEqual(response.status_code, 200)
+        estimate = response.data
+        self.assertEqual(estimate['critical_path']['node_ids'], [self.start.id, self.slow.id, self.end.id])
+        self.assertEqual(estimate['dominant_node']['node_id'], self.slow.id)
+        self.assertGreater(estimate['dominant_node']['share_of_critical_path'], 0.8)
+        # The executor runs every node, so the completion time includes the fast branch too
+        self.assertGreater(estimate['completion']['mean'], estimate['critical_path']['mean'])
+        self.assertAlmostEqual(estimate['completion']['mean'], 2.8 + 0.01 + 0.02 + 0.5, delta=0.3)
+        self.assertAlmostEqual(estimate['critical_path']['p95'], 6.0, delta=6.0 * RELATIVE_ACCURACY + 0.6)
+        self.assertEqual(estimate, self.client.get(f'/api/workflows/workflows/{self.workflow.id}/estimate/').data)
+
+    def test_sources_fall_back_to_broader_history(self):
+        Node.objects.create(workflow=self.workflow, type='text_to_speech', config={}, order=4)
+        estimates = estimation.node_estimates(Node.objects.filter(workflow=self.workflow), self.workflow.id)
+        sources = {node_id: estimate.source for node_id, estimate in estimates.items()}
+        self.assertEqual(sources[self.fast.id], 'workflow')
+        # No runs of the 'last' provider anywhere: every workflow's text_output runs
+        self.assertEqual(sources[self.end.id], 'node_type')
+        self.assertEqual(estimates[self.end.id].count, 20)
+        new_node = Node.objects.get(type='text_to_speech')
+        self.assertEqual(sources[new_node.id], 'default')
+        self.assertEqual(estimates[new_node.id].mean, 1.0)
+
+    def test_old_history_is_outside_the_window(self):
+        response = self.client.get(
+            f'/api/workflows/workflows/{self.workflow.id}/estimate/',
+            {'start': (timezone.now() - timedelta(days=10)).isoformat(), 'end': (timezone.now() - timedelta(days=9)).isoformat()},
+        )
+        self.assertEqual({node['source'] for node in response.data['nodes']}, {'default'})
+
+    @override_settings(WORKFLOW_SCHEDULING='critical_path')
+    def test_scheduler_starts_the_long_pole_first(self):
+        nodes, upstream = estimation.workflow_graph(self.workflow)
+        estimates = estimation.node_estimates(nodes, self.workflow.id)
+        order = [node.id for node in estimation.priority_order(nodes, upstream, estimates)]
+        self.assertEqual(order, [self.start.id, self.slow.id, self.fast.id, self.end.id])
+
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        ran = []
+        with patch('workflows.execution.execute_node', side_effect=lambda node, *args, **kwargs: ran.append(node.id)):
+            WorkflowExecutor(execution, observers=[]).execute_workflow()
+        self.assertEqual(ran, order)
+
+
+class ExecutionLogTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Logged', user=self.user)
+        self.nodes = [
+            Node.objects.create(workflow=self.workflow, type='text_input', config={'max_retries': 1}, order=i)
+            for i in range(3)
+        ]
+        self.execution = WorkflowExecution.objects.create(workflow=self.workflow)
+
+    def run_execution(self, outputs, **recorder_options):
+        recorder = execution_log.ExecutionLogRecorder(self.execution, **recorder_options)
+        outputs = iter(outputs)
+
+        def execute_node(node, input_data, continue_on_error=False):
+            output = next(outputs)
+            if isinstance(output, Exception):
+                raise output
+            return output
+
+        with patch('workflows.execution.execute_node', side_effect=execute_node):
+            try:
+                WorkflowExecutor(self.execution, observers=[recorder]).execute_workflow()
+            except Exception:
+                pass
+        return recorder
+
+    def test_events_and_results_in_batches(self):
+        with query_budget.track_queries() as log:
+            recorder = self.run_execution(['a', ValueError('flaky'), 'b', 'c'], batch_size=100, flush_interval=3600)
+        self.assertEqual(recorder.flushes, 2)
+        # Events at the start, then one insert per table for everything else
+        self.assertEqual(sum(count for shape, count in log.shapes.items() if shape.startswith('INSERT')), 3)
+        events = list(ExecutionEvent.objects.filter(execution=self.execution).order_by('sequence'))
+        self.assertEqual([event.sequence for event in events], list(range(1, 10)))
+        self.assertEqual([event.event for event in events], [
+            'execution_started', 'node_started', 'node_finished', 'node_started', 'node_retried',
+            'node_finished', 'node_started', 'node_finished', 'execution_finished',
+        ])
+        self.assertEqual(events[4].data, {'attempt': 2, 'error': 'flaky'})
+        results = {result.node_id: result for result in NodeResult.objects.filter(execution=self.execution)}
+        self.assertEqual([results[node.id].output for node in self.nodes], ['a', 'b', 'c'])
+        self.assertEqual(results[self.nodes[1].id].attempts, 2)
+
+    def test_failed_run_keeps_partial_progress(self):
+        self.run_execution(['a', ValueError('down'), ValueError('still down')], batch_size=100, flush_interval=3600)
+        results = {result.node_id: result for result in NodeResult.objects.filter(execution=self.execution)}
+        self.assertEqual(results[self.nodes[0].id].output, 'a')
+        self.assertEqual(results[self.nodes[1].id].status, 'failed')
+        self.assertEqual(results[self.nodes[1].id].error, 'still down')
+        self.assertNotIn(self.nodes[2].id, results)
+        last = ExecutionEvent.objects.filter(execution=self.execution).order_by('-sequence').first()
+        self.assertEqual((last.event, last.data), ('execution_finished', {'status': 'failed'}))
+
+    def test_small_batches_flush_as_the_run_goes(self):
+        recorder = self.run_execution(['a', 'b', 'c'], batch_size=2, flush_interval=3600)
+        self.assertGreater(recorder.flushes, 3)
+        self.assertEqual(ExecutionEvent.objects.filter(execution=self.execution).count(), 8)
+
+    def test_node_result_and_event_tail_endpoints(self):
+        self.run_execution(['a', 'b', 'c'])
+        url = f'/api/workflows/workflow_executions/{self.execution.id}'
+        response = self.client.get(f'{url}/nodes/{self.nodes[1].id}/')
+        self.assertEqual((response.data['output'], response.data['status']), ('b', 'completed'))
+        self.assertEqual(self.client.get(f'{url}/nodes/999999/').status_code, 404)
+
+        response = self.client.get(f'{url}/events/', {'after': 5, 'limit': 2})
+        self.assertEqual([event['sequence'] for event in response.data['events']], [6, 7])
+        self.assertEqual(response.data['last_sequence'], 7)
+        response = self.client.get(f'{url}/events/', {'after': response.data['last_sequence']})
+        self.assertEqual([event['event'] for event in response.data['events']], ['execution_finished'])
+        self.assertEqual(self.client.get(f'{url}/events/', {'after': 'x'}).status_code, 400)
+
+    def test_node_result_of_older_executions(self):
+        self.execution.results = {str(self.nodes[0].id): 'from the blob'}
+        self.execution.save()
+        response = self.client.get(f'/api/workflows/workflow_executions/{self.execution.id}/nodes/{self.nodes[0].id}/')
+        self.assertEqual(response.data['output'], 'from the blob')
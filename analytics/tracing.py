@@ -0,0 +1,296 @@
+"""
+Lightweight tracing spans for workflow executions.
+
+A trace starts at ``run_workflow`` (``start_trace``) and is sampled there
+with probability ``TRACING['SAMPLE_RATE']``, keyed on the execution id so a
+retried execution gets the same decision. Inside a sampled trace, ``span()``
+records nested spans for node execution, provider calls and ORM queries,
+each tagged with the execution id; outside one, ``span()`` costs a context
+variable lookup.
+
+Finished traces go to the configured exporter:
+
+* ``jsonl``: one JSON object per span, appended to ``TRACING['PATH']``;
+* ``chrome``: Chrome trace events (open ``PATH`` in ``chrome://tracing`` or
+  Perfetto);
+* ``otlp``: OTLP/HTTP JSON posted to ``TRACING['OTLP_ENDPOINT']``, e.g. an
+  OpenTelemetry collector or ``FakeOtlpCollector`` during development.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('innoflow_span', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, 'TRACING', {}).get(name, default)
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'status', 'thread_id')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None, start=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.attributes = attributes or {}
+        self.status = 'ok'
+        self.thread_id = threading.get_ident()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, end=None):
+        self.end = time.time() if end is None else end
+        self.trace.spans.append(self)
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.end - self.start,
+            'status': self.status,
+            'attributes': {**self.trace.attributes, **self.attributes},
+            'pid': os.getpid(),
+            'tid': self.thread_id,
+        }
+
+
+class Trace:
+    def __init__(self, attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.attributes = attributes
+        # list.append is atomic, so spans from hedging threads can finish concurrently
+        self.spans = []
+
+
+def sampled(key=None, rate=None) -> bool:
+    rate = _setting('SAMPLE_RATE', 0.0) if rate is None else rate
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    if key is None:
+        return random.random() < rate
+    digest = hashlib.sha256(str(key).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 < rate
+
+
+def active() -> bool:
+    return _current.get() is not None
+
+
+@contextmanager
+def _enter(span):
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = 'error'
+        span.attributes['error'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        span.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def start_trace(name, key=None, force=False, **attributes):
+    """
+    Start a trace rooted at a ``name`` span, if sampled. ``key`` (e.g. the
+    execution id) makes the decision stable; ``force`` always samples. Yields
+    the root span, or ``None`` when the trace isn't sampled.
+    """
+    if not _setting('ENABLED', False) or not (force or sampled(key)):
+        token = _current.set(None)
+        try:
+            yield None
+        finally:
+            _current.reset(token)
+        return
+
+    trace = Trace(attributes)
+    root = Span(trace, name)
+    try:
+        with _enter(root):
+            yield root
+    finally:
+        export(trace)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Record a child span of the current one; does nothing outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _enter(Span(parent.trace, name, parent.span_id, attributes)) as child:
+        yield child
+
+
+def record_span(name, start, end, **attributes):
+    """Add an already finished span (e.g. a queue wait measured after the fact) under the current span."""
+    parent = _current.get()
+    if parent is not None:
+        Span(parent.trace, name, parent.span_id, attributes, start=start).finish(end)
+
+
+def wrap(fn):
+    """Bind ``fn`` to the current context, so spans it opens in another thread join this trace."""
+    if _current.get() is None:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+class JsonlExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+class ChromeTraceExporter:
+    """Trace Event Format as an unterminated JSON array, which the viewers accept, so it can be appended to."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        events = []
+        for span in spans:
+            data = span.to_dict()
+            events.append(json.dumps({
+                'name': data['name'],
+                'cat': data['name'].split('.')[0],
+                'ph': 'X',
+                'ts': int(data['start'] * 1e6),
+                'dur': int(data['duration'] * 1e6),
+                'pid': data['pid'],
+                'tid': data['tid'],
+                'args': {**data['attributes'], 'trace_id': data['trace_id'], 'status': data['status']},
+            }, default=str))
+        with self._lock:
+            new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a') as f:
+                f.write(('[\n' if new else '') + ''.join(event + ',\n' for event in events))
+
+
+class OtlpHttpExporter:
+    """OTLP/HTTP with the JSON encoding, one request per trace."""
+
+    def __init__(self, endpoint, service_name='innoflow', timeout=2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def payload(self, spans) -> dict:
+        otlp_spans = []
+        for span in spans:
+            data = span.to_dict()
+            otlp_span = {
+                'traceId': data['trace_id'],
+                'spanId': data['span_id'],
+                'name': data['name'],
+                'kind': 1,
+                'startTimeUnixNano': str(int(data['start'] * 1e9)),
+                'endTimeUnixNano': str(int(data['end'] * 1e9)),
+                'attributes': [{'key': key, 'value': self._value(value)} for key, value in data['attributes'].items()],
+                'status': {'code': 2 if data['status'] == 'error' else 1},
+            }
+            if data['parent_id']:
+                otlp_span['parentSpanId'] = data['parent_id']
+            otlp_spans.append(otlp_span)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'innoflow'}, 'spans': otlp_spans}],
+        }]}
+
+    def export(self, spans):
+        requests.post(self.endpoint, json=self.payload(spans), timeout=self.timeout).raise_for_status()
+
+
+EXPORTERS = {
+    'jsonl': lambda: JsonlExporter(_setting('PATH', 'traces.jsonl')),
+    'chrome': lambda: ChromeTraceExporter(_setting('PATH', 'traces.json')),
+    'otlp': lambda: OtlpHttpExporter(_setting('OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')),
+}
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = EXPORTERS[_setting('EXPORTER', 'jsonl')]()
+        return _exporter
+
+
+def set_exporter(exporter):
+    """Replace the exporter (``None`` goes back to the configured one)."""
+    global _exporter
+    with _exporter_lock:
+        _exporter = exporter
+
+
+def export(trace):
+    if not trace.spans:
+        return
+    try:
+        get_exporter().export(sorted(trace.spans, key=lambda span: span.start))
+    except Exception as e:
+        # Losing a trace is fine; failing the traced work is not
+        logger.warning(f"Could not export trace {trace.trace_id}: {e}")
+
+
+def trace_queries(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    with span('db.query', statement=sql[:200], alias=context['connection'].alias):
+        return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if trace_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_queries)
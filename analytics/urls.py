@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import latency_summary, provider_time, slowest_node_types, slowest_workflows
+
+urlpatterns = [
+    path('latency/', latency_summary, name='latency-summary'),
+    path('latency/<int:model_config_id>/', latency_summary, name='model-latency-summary'),
+    path('nodes/slowest/', slowest_node_types, name='slowest-node-types'),
+    path('workflows/slowest/', slowest_workflows, name='slowest-workflows'),
+    path('providers/time/', provider_time, name='provider-time'),
+]
@@ -1,3 +1,127 @@
-from django.shortcuts import render
+import re
+from datetime import timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from workflows.models import Workflow
+from . import metrics, node_timing, rollups
+
+_WINDOW = re.compile(r'^(\d+)([mhd])$')
+_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def parse_window(params):
+    """
+    Read the query window from ``start``/``end`` (ISO 8601) or ``window``
+    (``15m``, ``24h``, ``7d``, ending now). Defaults to the last 24 hours.
+    """
+    end = timezone.now()
+    if params.get('end'):
+        end = parse_datetime(params['end'])
+        if end is None:
+            raise ValidationError({'end': 'Expected an ISO 8601 datetime.'})
+    if params.get('start'):
+        start = parse_datetime(params['start'])
+        if start is None:
+            raise ValidationError({'start': 'Expected an ISO 8601 datetime.'})
+    else:
+        match = _WINDOW.match(params.get('window', '24h'))
+        if not match:
+            raise ValidationError({'window': 'Expected a number followed by m, h or d.'})
+        try:
+            start = end - timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+        except OverflowError:
+            raise ValidationError({'window': 'Window is too long.'})
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if start >= end:
+        raise ValidationError({'start': 'Must be before end.'})
+    return start, end
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def latency_summary(request, model_config_id=None):
+    """
+    p50/p95/p99 latency, throughput (calls per second) and error rate per model
+    configuration. Filter with ``model`` (repeatable) or the model id in the path.
+    """
+    start, end = parse_window(request.query_params)
+    if model_config_id is not None:
+        ids = [model_config_id]
+    else:
+        ids = [int(pk) for pk in request.query_params.getlist('model') if pk.isdigit()] or None
+    summary = rollups.summarize(start, end, ids)
+    return Response({
+        'start': start,
+        'end': end,
+        'models': {str(pk): stats for pk, stats in summary.items()},
+    })
+
+
+def _limit(params, default=10):
+    try:
+        return max(1, min(int(params.get('limit', default)), 100))
+    except ValueError:
+        raise ValidationError({'limit': 'Expected an integer.'})
+
+
+def _user_workflow_ids(request):
+    ids = Workflow.objects.filter(user=request.user).values_list('id', flat=True)
+    requested = {int(pk) for pk in request.query_params.getlist('workflow') if pk.isdigit()}
+    return [pk for pk in ids if pk in requested] if requested else list(ids)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slowest_node_types(request):
+    """Node types of the user's workflows by mean run time, with queue wait, retries, cache hits and payload sizes."""
+    start, end = parse_window(request.query_params)
+    return Response({
+        'start': start,
+        'end': end,
+        'node_types': node_timing.slowest_node_types(
+            start, end, _limit(request.query_params), _user_workflow_ids(request)
+        ),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slowest_workflows(request):
+    """The user's workflows by mean execution duration."""
+    start, end = parse_window(request.query_params)
+    return Response({
+        'start': start,
+        'end': end,
+        'workflows': node_timing.slowest_workflows(start, end, _limit(request.query_params), request.user),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def provider_time(request):
+    """Node run time spent in each provider by the user's workflows."""
+    start, end = parse_window(request.query_params)
+    return Response({
+        'start': start,
+        'end': end,
+        'providers': node_timing.time_per_provider(start, end, _user_workflow_ids(request)),
+    })
+
+
+def metrics_view(request):
+    """Prometheus text exposition of the metrics registry."""
+    token = getattr(settings, 'METRICS', {}).get('AUTH_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,259 @@
+"""
+Content-addressed storage for large node outputs.
+
+``offload`` stores byte outputs, and text or JSON outputs of at least
+``ARTIFACTS['THRESHOLD']`` bytes, as blobs named by their SHA-256. It
+returns a small reference to put in the execution's results instead:
+
+    {'artifact': 'sha256:<hex>', 'size': <bytes>, 'content_type': <type>}
+
+Identical outputs share one blob. ``load`` turns a reference back into the
+value, and ``open_blob`` gives a file object for streaming it, e.g. to a
+``FileResponse``, which the WSGI server can send with ``sendfile``.
+``LocalArtifactStorage`` also hands out read-only memory maps via
+``read_view``.
+
+The backend is ``ARTIFACTS['BACKEND']``, built with ``ARTIFACTS['OPTIONS']``.
+An object store plugs in by subclassing ``ArtifactStorage``.
+
+``collect_garbage`` deletes blobs that no execution result or node result
+refers to. Blobs written or reused within ``ARTIFACTS['GC_GRACE']`` seconds
+are kept, because a running execution holds its references in memory until
+it saves them.
+"""
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+PREFIX = 'sha256:'
+
+
+def _setting(name, default):
+    return getattr(settings, 'ARTIFACTS', {}).get(name, default)
+
+
+class ArtifactStorage(ABC):
+    """Blob store keyed by hex SHA-256 digest."""
+
+    @abstractmethod
+    def exists(self, digest) -> bool:
+        """Whether a blob is stored under ``digest``."""
+        pass
+
+    @abstractmethod
+    def put(self, digest, data: bytes):
+        """Store ``data`` under ``digest``; if it is already there, mark it as recently used instead."""
+        pass
+
+    @abstractmethod
+    def open(self, digest):
+        """A binary file object for reading the blob; raises ``FileNotFoundError`` if it's missing."""
+        pass
+
+    @abstractmethod
+    def delete(self, digest):
+        """Remove the blob; a missing blob is not an error."""
+        pass
+
+    @abstractmethod
+    def blobs(self):
+        """``(digest, size, last_used)`` for every stored blob, ``last_used`` as a Unix timestamp."""
+        pass
+
+    def clean(self, older_than):
+        """Remove partial writes left from before ``older_than``. Backends that write atomically can keep this."""
+        pass
+
+
+class LocalArtifactStorage(ArtifactStorage):
+    """Blobs as files under ``root``, sharded by the first two bytes of the digest."""
+
+    def __init__(self, root=None):
+        self.root = str(root or os.path.join(settings.BASE_DIR, 'artifacts'))
+        self.tmp = os.path.join(self.root, 'tmp')
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, digest, data):
+        path = self.path(digest)
+        try:
+            # Reused blobs get a new mtime, so garbage collection's grace period covers them too
+            os.utime(path)
+            return
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(self.tmp, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # Readers see either no blob or the whole blob; concurrent writers of the same content are harmless
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def read_view(self, digest) -> memoryview:
+        """A read-only view of the blob backed by a memory map, without copying it into memory."""
+        with self.open(digest) as f:
+            if not os.fstat(f.fileno()).st_size:
+                return memoryview(b'')
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def delete(self, digest):
+        try:
+            os.unlink(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def blobs(self):
+        for directory, _, files in os.walk(self.root):
+            if directory == self.tmp:
+                continue
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                yield name, stat.st_size, stat.st_mtime
+
+    def clean(self, older_than):
+        if not os.path.isdir(self.tmp):
+            return
+        for name in os.listdir(self.tmp):
+            path = os.path.join(self.tmp, name)
+            try:
+                if os.stat(path).st_mtime < older_than:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> ArtifactStorage:
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            backend = import_string(_setting('BACKEND', 'workflows.artifacts.LocalArtifactStorage'))
+            _storage = backend(**_setting('OPTIONS', {}))
+        return _storage
+
+
+def reset():
+    """Forget the configured storage, e.g. after changing ``ARTIFACTS``."""
+    global _storage
+    with _storage_lock:
+        _storage = None
+
+
+def is_reference(value) -> bool:
+    return (
+        isinstance(value, dict) and set(value) == {'artifact', 'size', 'content_type'}
+        and isinstance(value['artifact'], str) and value['artifact'].startswith(PREFIX)
+    )
+
+
+def store(data: bytes, content_type='application/octet-stream', storage=None) -> dict:
+    digest = hashlib.sha256(data).hexdigest()
+    (storage or get_storage()).put(digest, data)
+    return {'artifact': PREFIX + digest, 'size': len(data), 'content_type': content_type}
+
+
+def offload(value, content_type=None, threshold=None, storage=None):
+    """``value``, or a reference to it in the store if it is bytes or serializes to ``threshold`` bytes or more."""
+    threshold = _setting('THRESHOLD', 64 * 1024) if threshold is None else threshold
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return store(bytes(value), content_type or 'application/octet-stream', storage)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        # UTF-8 takes at most four bytes per character, so short strings can skip encoding
+        if len(value) < threshold // 4:
+            return value
+        data = value.encode('utf-8')
+        content_type = content_type or 'text/plain; charset=utf-8'
+    else:
+        data = json.dumps(value, default=str).encode('utf-8')
+        content_type = content_type or 'application/json'
+    if len(data) < threshold:
+        return value
+    return store(data, content_type, storage)
+
+
+def open_blob(reference, storage=None):
+    return (storage or get_storage()).open(reference['artifact'][len(PREFIX):])
+
+
+def load(reference, storage=None):
+    """The value a reference stands for: ``str`` for text, parsed JSON, otherwise ``bytes``."""
+    with open_blob(reference, storage) as f:
+        data = f.read()
+    if reference['content_type'].startswith('text/'):
+        return data.decode('utf-8')
+    if reference['content_type'] == 'application/json':
+        return json.loads(data)
+    return data
+
+
+def references(value):
+    """Digests of every reference nested in ``value``."""
+    if is_reference(value):
+        yield value['artifact'][len(PREFIX):]
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+
+
+def referenced_digests() -> set:
+    from analytics.models import NodeResult
+    from .models import WorkflowExecution
+
+    digests = set()
+    for results in WorkflowExecution.objects.exclude(results=None).values_list('results', flat=True).iterator(chunk_size=500):
+        digests.update(references(results))
+    for output in NodeResult.objects.exclude(output=None).values_list('output', flat=True).iterator(chunk_size=500):
+        digests.update(references(output))
+    return digests
+
+
+def collect_garbage(grace=None, dry_run=False, storage=None, now=None) -> dict:
+    """Delete blobs nothing refers to that are older than ``grace`` seconds; returns what was (or would be) removed."""
+    storage = storage or get_storage()
+    grace = _setting('GC_GRACE', 24 * 3600) if grace is None else grace
+    cutoff = (now or time.time()) - grace
+    # Blobs are listed after the references are read; a blob stored in between is newer than the cutoff
+    referenced = referenced_digests()
+    removed, freed, kept = 0, 0, 0
+    for digest, size, last_used in list(storage.blobs()):
+        if digest in referenced or last_used >= cutoff:
+            kept += 1
+            continue
+        if not dry_run:
+            storage.delete(digest)
+        removed += 1
+        freed += size
+    if not dry_run:
+        storage.clean(cutoff)
+    return {'removed': removed, 'freed_bytes': freed, 'kept': kept}
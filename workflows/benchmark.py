@@ -0,0 +1,188 @@
+"""
+Benchmarks of the workflow engine itself.
+
+``run_benchmark`` builds synthetic workflows of a given shape and size, runs
+them through ``WorkflowExecutor`` with the stand-ins from ``mock_handlers``
+(each sleeping ``latency`` seconds, so provider time is known exactly) and
+measures what the engine adds on top: executions per second, overhead per
+node, DB queries per execution and peak traced memory. Everything runs in a
+transaction that is rolled back, so the database is left as it was.
+
+Shapes:
+
+* ``chain``: every node feeds the next one;
+* ``fanout``: one input node feeds all the others;
+* ``diamond``: one input node fans out to ``size - 2`` nodes that all feed a
+  final node.
+"""
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .execution import WorkflowExecutor
+from .mock_handlers import HANDLERS
+from .models import Node, NodeConnection, Workflow, WorkflowExecution
+
+SHAPES = ('chain', 'fanout', 'diamond')
+BENCHMARK_USER = 'benchmark'
+
+
+def _edges(shape, size):
+    if shape == 'chain':
+        return [(i, i + 1) for i in range(size - 1)]
+    if shape == 'fanout':
+        return [(0, i) for i in range(1, size)]
+    if shape == 'diamond':
+        middle = range(1, size - 1)
+        return [(0, i) for i in middle] + [(i, size - 1) for i in middle]
+    raise ValueError(f"Unknown workflow shape {shape!r}; expected one of {SHAPES}")
+
+
+def build_workflow(user, shape, size) -> Workflow:
+    """Create a ``shape`` workflow of ``size`` nodes (at least 3 for a diamond)."""
+    if size < (3 if shape == 'diamond' else 1):
+        raise ValueError(f"A {shape} workflow needs more than {size} nodes")
+    edges = _edges(shape, size)
+    workflow = Workflow.objects.create(name=f'benchmark {shape} x{size}', user=user)
+    processing = ['huggingface_summarization', 'openai_tts']
+    nodes = Node.objects.bulk_create([
+        Node(
+            workflow=workflow,
+            type='text_input' if order == 0 else processing[order % len(processing)],
+            config={'text': 'The quick brown fox jumps over the lazy dog. ' * 4} if order == 0 else {},
+            order=order,
+        )
+        for order in range(size)
+    ])
+    NodeConnection.objects.bulk_create([
+        NodeConnection(source_node=nodes[source], target_node=nodes[target])
+        for source, target in edges
+    ])
+    return workflow
+
+
+class MockNodeRunner:
+    """Replaces ``execute_node``: dispatches to the mock handlers and keeps track of the time spent in them."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.handler_time = 0.0
+        self.calls = 0
+
+    def __call__(self, node, input_data, continue_on_error=False):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        result = HANDLERS[node.type]().execute(node, input_data)
+        self.handler_time += time.perf_counter() - started
+        self.calls += 1
+        return result
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+class QueryCounter:
+    """Counts queries through an execute wrapper; unlike the debug query log it has no size limit."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def run_execution(workflow, runner, observers=False):
+    """Create an execution of ``workflow`` and run it with ``runner`` in place of ``execute_node``."""
+    execution = WorkflowExecution.objects.create(workflow=workflow)
+    executor = WorkflowExecutor(execution, observers=None if observers else [])
+    with patch('workflows.execution.execute_node', runner):
+        executor.execute_workflow()
+    return executor
+
+
+def measure(workflow, size, latency=0.0, runs=3, observers=True) -> dict:
+    # One untimed run warms up query compilation and imports
+    run_execution(workflow, MockNodeRunner(latency), observers)
+
+    runner = MockNodeRunner(latency)
+    with count_queries() as queries:
+        started = time.perf_counter()
+        for _ in range(runs):
+            run_execution(workflow, runner, observers)
+        elapsed = time.perf_counter() - started
+
+    # tracemalloc slows everything down, so peak memory gets a run of its own
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run_execution(workflow, MockNodeRunner(latency), observers)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    overhead = elapsed - runner.handler_time
+    return {
+        'runs': runs,
+        'seconds': round(elapsed, 6),
+        'executions_per_second': round(runs / elapsed, 3),
+        'node_overhead_ms': round(overhead / (runs * size) * 1000, 4),
+        'queries_per_execution': queries.count / runs,
+        'peak_memory_bytes': peak,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(shapes=SHAPES, sizes=(10, 100, 1000), latency=0.0, runs=3, observers=True) -> dict:
+    """Benchmark every shape/size combination and return a JSON-serialisable report."""
+    results = []
+    with rolled_back():
+        user, _ = get_user_model().objects.get_or_create(username=BENCHMARK_USER)
+        for shape in shapes:
+            for size in sizes:
+                workflow = build_workflow(user, shape, size)
+                results.append({
+                    'shape': shape,
+                    'nodes': size,
+                    **measure(workflow, size, latency, runs, observers),
+                })
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'latency': latency,
+        'observers': observers,
+        'results': results,
+    }
@@ -1,33 +1,100 @@
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from ai_integration.exceptions import ProviderError
+from ai_integration.gateway import ProviderGateway
+from ai_integration.models import AIModelConfig
+from ai_integration.streaming import iterate_in_thread
+from .events import execution_group_name
+from .models import WorkflowExecution
+from .protocol import ProgressProtocol
 import logging
 
 logger = logging.getLogger(__name__)
 
 class WorkflowExecutionConsumer(AsyncWebsocketConsumer):
+    execution_group_name = None
+
     async def connect(self):
         execution_id = self.scope.get('url_route', {}).get('kwargs', {}).get('execution_id')
-        if not execution_id:
+        if not execution_id or not await self.can_watch(execution_id):
             await self.close()
             return
         self.execution_id = execution_id
-        await self.accept()
-
-    async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
+        self.execution_group_name = execution_group_name(execution_id)
+        self.protocol = ProgressProtocol.from_query_string(self.scope.get('query_string', b''))
+        await self.channel_layer.group_add(
             self.execution_group_name,
             self.channel_name
         )
+        await self.accept()
+        if self.protocol.negotiated:
+            # Tell the client what it actually got, e.g. JSON when msgpack isn't installed
+            await self.send(text_data=json.dumps(self.protocol.describe()))
+
+    @database_sync_to_async
+    def can_watch(self, execution_id):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            return False
+        return WorkflowExecution.objects.filter(id=execution_id, workflow__user=user).exists()
+
+    async def disconnect(self, close_code):
+        if self.execution_group_name:
+            await self.channel_layer.group_discard(
+                self.execution_group_name,
+                self.channel_name
+            )
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or '{}')
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Invalid JSON'}))
+            return
+        if not isinstance(data, dict):
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Expected a JSON object'}))
+            return
+
+        if data.get('type') == 'stream_completion':
+            await self.stream_completion(data)
+        elif data.get('type') == 'resync':
+            self.protocol.resync()
+
+    async def stream_completion(self, data):
+        """
+        Stream a completion to this client token by token.
+
+        Expects ``model_config_id`` and ``prompt``; an optional ``request_id`` is
+        echoed back on every message so the client can match them up.
+        """
+        request_id = data.get('request_id')
+        try:
+            model_config = await database_sync_to_async(AIModelConfig.objects.get)(id=data.get('model_config_id'))
+        except (AIModelConfig.DoesNotExist, ValueError, TypeError):
+            # A missing or malformed id gets the same answer; it must not close the socket
+            await self.send(text_data=json.dumps({
+                'type': 'stream_error', 'request_id': request_id, 'error': 'Unknown model configuration'
+            }))
+            return
+
+        try:
+            chunks = ProviderGateway(model_config).stream_completion(data.get('prompt', ''))
+            async for token in iterate_in_thread(chunks):
+                await self.send(text_data=json.dumps({'type': 'token', 'request_id': request_id, 'token': token}))
+        except ProviderError as e:
+            logger.warning(f"Completion stream for execution {self.execution_id} failed: {e}")
+            await self.send(text_data=json.dumps({'type': 'stream_error', 'request_id': request_id, 'error': str(e)}))
+            return
+        except Exception:
+            # A bug in a provider's stream must not take the client's socket down with it
+            logger.exception(f"Completion stream for execution {self.execution_id} failed")
+            await self.send(text_data=json.dumps({
+                'type': 'stream_error', 'request_id': request_id, 'error': 'Completion stream failed'
+            }))
+            return
+        await self.send(text_data=json.dumps({'type': 'stream_end', 'request_id': request_id}))
 
     async def send_update(self, event):
-        message = event['message']
-        status = event['status']
-        results = event.get('results', {})
-        errors = event.get('errors', {})
-
-        await self.send(text_data=json.dumps({
-            'message': message,
-            'status': status,
-            'results': results,
-            'errors': errors
-        }))
\ No newline at end of file
+        text_data, bytes_data = self.protocol.encode(self.protocol.build(event))
+        await self.send(text_data=text_data, bytes_data=bytes_data)
@@ -0,0 +1,132 @@
+"""
+Push execution progress to websocket clients over the channel layer.
+
+``ProgressPublisher`` is an executor observer (see ``WorkflowExecutor``). It
+turns node-started, node-finished and execution-finished notifications into
+``send_update`` messages for the execution's group. To avoid flooding the
+channel layer when nodes finish quickly, events are buffered and flushed at
+most once per ``WORKFLOW_PROGRESS_MIN_INTERVAL`` seconds. An event that has to
+wait is sent by a timer once the interval has passed, so a node that runs for
+a long time is reported as started while it runs. A node's finish never
+replaces its unsent start; repeated events of the same kind for a node within
+one flush are coalesced into the latest one. The final execution-finished
+event is always sent straight away.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def execution_group_name(execution_id) -> str:
+    return f'workflow_execution_{execution_id}'
+
+
+class ProgressPublisher:
+    def __init__(self, execution, channel_layer=None, min_interval=None, clock=time.monotonic, timer=threading.Timer):
+        self.execution = execution
+        self.group_name = execution_group_name(execution.id)
+        self.channel_layer = channel_layer or get_channel_layer()
+        if min_interval is None:
+            min_interval = getattr(settings, 'WORKFLOW_PROGRESS_MIN_INTERVAL', 0.25)
+        self.min_interval = min_interval
+        self.clock = clock
+        self.timer = timer
+        self.executor = None
+        self.pending = {}
+        self.last_flush = None
+        self.messages_sent = 0
+        # The deferred flush runs on the timer's thread
+        self._lock = threading.RLock()
+        self._deferred = None
+
+    def _event(self, key, event, force=False):
+        with self._lock:
+            # Later events of the same kind for a node replace earlier unsent ones
+            self.pending.pop(key, None)
+            self.pending[key] = event
+            now = self.clock()
+            if force or self.last_flush is None or now - self.last_flush >= self.min_interval:
+                self.flush(now)
+            elif self._deferred is None:
+                self._deferred = self.timer(self.last_flush + self.min_interval - now, self._flush_deferred)
+                self._deferred.daemon = True
+                self._deferred.start()
+
+    def _flush_deferred(self):
+        with self._lock:
+            self._deferred = None
+            self.flush()
+
+    def flush(self, now=None):
+        with self._lock:
+            if self._deferred is not None:
+                self._deferred.cancel()
+                self._deferred = None
+            if not self.pending or self.channel_layer is None:
+                return
+            events = list(self.pending.values())
+            self.pending.clear()
+            self.last_flush = self.clock() if now is None else now
+            self._send(events)
+
+    def _send(self, events):
+        executor = self.executor
+        latest = events[-1]
+        try:
+            async_to_sync(self.channel_layer.group_send)(self.group_name, {
+                'type': 'send_update',
+                'message': latest['message'],
+                'status': latest.get('execution_status', self.execution.status),
+                'results': {str(k): v for k, v in executor.results.items()} if executor else {},
+                'errors': {str(k): v for k, v in executor.errors.items()} if executor else {},
+                'events': events,
+            })
+            self.messages_sent += 1
+        except Exception:
+            # Progress updates are best effort and must never fail the workflow
+            logger.warning(f"Could not publish progress for execution {self.execution.id}", exc_info=True)
+
+    def on_execution_started(self, executor):
+        self.executor = executor
+        self._event('execution', {
+            'event': 'execution_started',
+            'message': 'Workflow execution started',
+            'execution_status': 'running',
+        }, force=True)
+
+    def on_node_started(self, executor, node):
+        self._event((node.id, 'started'), {
+            'event': 'node_started',
+            'node_id': node.id,
+            'node_type': node.type,
+            'message': f'Node {node.id} ({node.type}) started',
+        })
+
+    def on_node_finished(self, executor, node, result):
+        self._event((node.id, 'ended'), {
+            'event': 'node_finished',
+            'node_id': node.id,
+            'node_type': node.type,
+            'message': f'Node {node.id} ({node.type}) finished',
+        })
+
+    def on_node_failed(self, executor, node, error):
+        self._event((node.id, 'ended'), {
+            'event': 'node_failed',
+            'node_id': node.id,
+            'node_type': node.type,
+            'message': f'Node {node.id} ({node.type}) failed: {error}',
+        })
+
+    def on_execution_finished(self, executor, status):
+        self._event('execution', {
+            'event': 'execution_finished',
+            'message': f'Workflow execution {status}',
+            'execution_status': status,
+        }, force=True)
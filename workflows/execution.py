@@ -1,52 +1,124 @@
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
+from django.utils.module_loading import import_string
+from . import artifacts
 from .models import WorkflowExecution, Node, NodeConnection
-from workflows.utils import execute_node  # Import the execute_node function
+from workflows.utils import NODE_CONTENT_TYPES, execute_node  # Import the execute_node function
+from ai_integration.exceptions import CircuitOpenError
+from analytics import estimation, tracing
 from typing import Any, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+def default_observers(execution: WorkflowExecution) -> list:
+    """Instantiate the observers listed in ``WORKFLOW_EXECUTION_OBSERVERS`` for ``execution``."""
+    paths = getattr(settings, 'WORKFLOW_EXECUTION_OBSERVERS', [])
+    return [import_string(path)(execution) for path in paths]
 
 class WorkflowExecutor:
-    def __init__(self, execution: WorkflowExecution):
+    """
+    Runs a workflow's nodes and reports progress to observers.
+
+    Observers receive ``on_execution_started``, ``on_node_started``,
+    ``on_node_retried``, ``on_node_finished``, ``on_node_failed`` and
+    ``on_execution_finished`` calls; they only need to define the hooks they
+    care about.
+    """
+    def __init__(self, execution: WorkflowExecution, observers=None):
         self.execution = execution
         self.context = {}
         self.results = {}
+        self.outputs = {}
+        self.errors = {}
+        self.inputs = {}
+        self.attempts = {}
+        # started_at is the creation time until the run begins, i.e. when the execution was queued
+        self.queued_at = execution.started_at
+        self.observers = default_observers(execution) if observers is None else list(observers)
+
+    def notify(self, hook: str, *args):
+        for observer in self.observers:
+            handler = getattr(observer, hook, None)
+            if handler is None:
+                continue
+            try:
+                handler(self, *args)
+            except Exception:
+                # A broken observer must not take the workflow down with it
+                logger.exception(f"Execution observer {observer!r} failed in {hook}")
 
-    def execute_node(self, node: Node, input_data: Any = None) -> Dict:
+    def execute_node(self, node: Node, input_data: Any = None, attempt: int = 0) -> Dict:
+        self.attempts[node.id] = attempt + 1
         try:
-            result = execute_node(node, input_data, continue_on_error=False)
-            self.results[node.id] = result
-            return result
+            return self.store_output(node, execute_node(node, input_data, continue_on_error=False))
+        except CircuitOpenError:
+            # Retrying an open circuit only waits out the same failure; use the node's fallback if it has one
+            if 'fallback_output' in node.config:
+                return self.store_output(node, node.config['fallback_output'])
+            raise
         except Exception as e:
-            if node.retry_count < node.max_retries:
-                node.retry_count += 1
-                node.save()
-                return self.execute_node(node, input_data)
+            # Nodes have no retry columns; the count comes from the node's config
+            if attempt < node.config.get('max_retries', 0):
+                self.notify('on_node_retried', node, e)
+                return self.execute_node(node, input_data, attempt + 1)
             raise
 
+    def store_output(self, node: Node, output: Any) -> Any:
+        """Keep ``output`` for downstream nodes and return what goes in ``results``."""
+        self.outputs[node.id] = output
+        self.results[node.id] = artifacts.offload(output, NODE_CONTENT_TYPES.get(node.type))
+        return self.results[node.id]
+
     def execute_workflow(self):
         try:
             self.execution.status = 'running'
             self.execution.started_at = timezone.now()
             self.execution.save()
+            self.notify('on_execution_started')
 
             nodes = Node.objects.filter(
                 workflow=self.execution.workflow,
                 is_enabled=True
             ).order_by('order')
 
-            for node in nodes:
-                input_data = self.get_node_input(node)
-                result = self.execute_node(node, input_data)
+            for node in self.schedule(nodes):
+                input_data = self.inputs[node.id] = self.get_node_input(node)
+                self.notify('on_node_started', node)
+                try:
+                    with tracing.span('execute_node', node_id=node.id, node_type=node.type):
+                        result = self.execute_node(node, input_data)
+                except Exception as e:
+                    self.errors[node.id] = str(e)
+                    self.notify('on_node_failed', node, e)
+                    raise
+                self.notify('on_node_finished', node, result)
 
             self.execution.status = 'completed'
             self.execution.completed_at = timezone.now()
             self.execution.results = self.results
             self.execution.save()
+            self.notify('on_execution_finished', 'completed')
         except Exception as e:
             self.execution.status = 'failed'
             self.execution.error_logs = str(e)
             self.execution.save()
+            self.notify('on_execution_finished', 'failed')
             raise
 
+    def schedule(self, nodes):
+        """
+        The order to run ``nodes`` in. With ``WORKFLOW_SCHEDULING`` set to
+        ``critical_path``, nodes run after their inputs, longest expected
+        remaining path first; otherwise they run by ``order``.
+        """
+        if getattr(settings, 'WORKFLOW_SCHEDULING', 'order') != 'critical_path':
+            return nodes
+        nodes = list(nodes)
+        estimates = estimation.node_estimates(nodes, self.execution.workflow_id)
+        return estimation.priority_order(nodes, estimation.upstream_map(nodes), estimates)
+
     def get_node_input(self, node: Node) -> Any:
         input_connections = NodeConnection.objects.filter(
             target_node=node,
@@ -55,5 +127,5 @@ class WorkflowExecutor:
         if not input_connections:
             return None
         source_connection = input_connections.first()
-        source_result = self.results.get(source_connection.source_node_id)
+        source_result = self.outputs.get(source_connection.source_node_id)
         return source_result
@@ -0,0 +1,43 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import WorkflowExecution
+
+
+def _datetime(params, name):
+    value = parse_datetime(params[name])
+    if value is None:
+        raise ValidationError({name: 'Expected an ISO 8601 datetime.'})
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+class ExecutionFilter(BaseFilterBackend):
+    """
+    Filters executions by ``workflow`` (ids, comma separated), ``status``
+    (comma separated) and ``started_after``/``started_before`` (ISO 8601).
+    """
+    statuses = {value for value, _ in WorkflowExecution.STATUS_CHOICES}
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get('workflow'):
+            try:
+                workflow_ids = [int(value) for value in params['workflow'].split(',')]
+            except ValueError:
+                raise ValidationError({'workflow': 'Expected workflow ids separated by commas.'})
+            queryset = queryset.filter(workflow_id__in=workflow_ids)
+        if params.get('status'):
+            statuses = params['status'].split(',')
+            unknown = set(statuses) - self.statuses
+            if unknown:
+                raise ValidationError({
+                    'status': f"Unknown status {', '.join(sorted(unknown))}; expected one of {', '.join(sorted(self.statuses))}."
+                })
+            queryset = queryset.filter(status__in=statuses)
+        if params.get('started_after'):
+            queryset = queryset.filter(started_at__gte=_datetime(params, 'started_after'))
+        if params.get('started_before'):
+            queryset = queryset.filter(started_at__lt=_datetime(params, 'started_before'))
+        return queryset
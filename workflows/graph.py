@@ -0,0 +1,86 @@
+"""
+The whole graph of a workflow (nodes, ports and connections) as one document
+for the editor.
+
+A graph's version is its workflow's ``updated_at``. Saving the workflow moves
+it forward, and the receivers below move it forward whenever a node or
+connection is saved or deleted. Rendered graphs are cached under their
+version, so a change makes the next request render a fresh copy, and the
+version doubles as the response's ETag. Queryset ``update()`` and
+``bulk_create()`` don't send these signals; call ``touch`` after using them
+on nodes or connections.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Node, NodeConnection, Workflow
+
+DEFAULT_INPUT_PORT = 'input'
+DEFAULT_OUTPUT_PORT = 'output'
+
+
+def version(workflow) -> int:
+    return int(workflow.updated_at.timestamp() * 1_000_000)
+
+
+def etag(workflow) -> str:
+    return f'"{workflow.id}-{version(workflow)}"'
+
+
+def touch(workflow_id):
+    """Move the graph version of ``workflow_id`` forward."""
+    Workflow.objects.filter(pk=workflow_id).update(updated_at=timezone.now())
+
+
+def render(workflow) -> dict:
+    """The graph document; two queries besides the workflow itself."""
+    nodes = list(Node.objects.filter(workflow=workflow).order_by('order', 'id').values(
+        'id', 'type', 'order', 'is_enabled', 'config'
+    ))
+    connections = list(NodeConnection.objects.filter(target_node__workflow=workflow).order_by('id').values_list(
+        'id', 'source_node_id', 'source_port', 'target_node_id', 'target_port'
+    ))
+    ports = {node['id']: ({DEFAULT_INPUT_PORT}, {DEFAULT_OUTPUT_PORT}) for node in nodes}
+    for _, source, source_port, target, target_port in connections:
+        if source in ports:
+            ports[source][1].add(source_port)
+        ports[target][0].add(target_port)
+    return {
+        'id': workflow.id,
+        'name': workflow.name,
+        'version': version(workflow),
+        'config': workflow.config,
+        'nodes': [
+            {**node, 'inputs': sorted(ports[node['id']][0]), 'outputs': sorted(ports[node['id']][1])}
+            for node in nodes
+        ],
+        'connections': [
+            {'id': id, 'source': source, 'source_port': source_port, 'target': target, 'target_port': target_port}
+            for id, source, source_port, target, target_port in connections
+        ],
+    }
+
+
+def get_graph(workflow) -> dict:
+    """``render(workflow)``, from the cache when this version has been rendered before."""
+    key = f'workflow_graph:{workflow.id}:{version(workflow)}'
+    graph = cache.get(key)
+    if graph is None:
+        graph = render(workflow)
+        cache.set(key, graph, getattr(settings, 'WORKFLOW_GRAPH_CACHE_TIMEOUT', 3600))
+    return graph
+
+
+@receiver(post_save, sender=Node)
+@receiver(post_delete, sender=Node)
+def node_changed(sender, instance, **kwargs):
+    touch(instance.workflow_id)
+
+
+@receiver(post_save, sender=NodeConnection)
+@receiver(post_delete, sender=NodeConnection)
+def connection_changed(sender, instance, **kwargs):
+    Workflow.objects.filter(nodes__id=instance.target_node_id).update(updated_at=timezone.now())
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from workflows.benchmark import SHAPES, run_benchmark
+
+COLUMNS = [
+    ('executions_per_second', 'exec/s', '{:>12.1f}'),
+    ('node_overhead_ms', 'ms/node', '{:>12.3f}'),
+    ('queries_per_execution', 'queries', '{:>12.1f}'),
+    ('peak_memory_bytes', 'peak KiB', '{:>12.0f}'),
+]
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the workflow engine on synthetic workflows run with mock handlers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shapes', default=','.join(SHAPES), help=f"Comma-separated subset of {', '.join(SHAPES)}")
+        parser.add_argument('--sizes', type=_int_list, default=[10, 100, 1000], help='Comma-separated node counts')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds each mock handler sleeps')
+        parser.add_argument('--runs', type=int, default=3, help='Timed executions per workflow')
+        parser.add_argument('--no-observers', action='store_true', help='Run without WORKFLOW_EXECUTION_OBSERVERS')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Earlier --output file to show changes against')
+
+    def handle(self, *args, **options):
+        shapes = [shape for shape in options['shapes'].split(',') if shape]
+        unknown = set(shapes) - set(SHAPES)
+        if unknown:
+            raise CommandError(f"Unknown shapes: {', '.join(sorted(unknown))}")
+        baseline, baseline_label = {}, None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous_report = json.load(f)
+            baseline = {(row['shape'], row['nodes']): row for row in previous_report['results']}
+            baseline_label = previous_report.get('commit') or options['compare']
+
+        report = run_benchmark(
+            shapes=shapes,
+            sizes=options['sizes'],
+            latency=options['latency'],
+            runs=options['runs'],
+            observers=not options['no_observers'],
+        )
+
+        self.stdout.write(f"{'shape':<10}{'nodes':>7}" + ''.join(f'{label:>12}' for _, label, _ in COLUMNS))
+        for row in report['results']:
+            line = f"{row['shape']:<10}{row['nodes']:>7}"
+            for key, _, fmt in COLUMNS:
+                value = row[key] / 1024 if key == 'peak_memory_bytes' else row[key]
+                line += fmt.format(value)
+            self.stdout.write(line)
+            previous = baseline.get((row['shape'], row['nodes']))
+            if previous:
+                changes = ''.join(
+                    f"{(row[key] - previous[key]) / previous[key]:>+12.1%}" if previous[key] else f"{'n/a':>12}"
+                    for key, _, _ in COLUMNS
+                )
+                self.stdout.write(f"{'  vs ' + baseline_label:<17}{changes}")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
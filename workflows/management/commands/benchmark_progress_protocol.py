@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from workflows.protocol import ProgressProtocol
+
+PROTOCOLS = [
+    ('json (full)', {}),
+    ('json delta', {'delta': True}),
+    ('json delta + zlib', {'delta': True, 'compress': True}),
+    ('msgpack (full)', {'format': 'msgpack'}),
+    ('msgpack delta', {'format': 'msgpack', 'delta': True}),
+    ('msgpack delta + zlib', {'format': 'msgpack', 'delta': True, 'compress': True}),
+]
+
+
+def simulated_updates(nodes, output_size):
+    """The ``send_update`` events of an execution where one node finishes per update."""
+    results = {}
+    for node_id in range(1, nodes + 1):
+        results[str(node_id)] = {
+            'text': f'Output of node {node_id}. ' + 'lorem ipsum dolor sit amet ' * (output_size // 27),
+            'tokens': output_size // 4,
+        }
+        yield {
+            'message': f'Node {node_id} (ai_text) finished',
+            'status': 'running',
+            'results': dict(results),
+            'errors': {},
+            'events': [{'event': 'node_finished', 'node_id': node_id, 'node_type': 'ai_text'}],
+        }
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes on the wire and encode time of the execution progress protocols'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=200)
+        parser.add_argument('--output-size', type=int, default=500, help='Approximate bytes of output per node')
+
+    def handle(self, *args, **options):
+        updates = list(simulated_updates(options['nodes'], options['output_size']))
+        self.stdout.write(f"{len(updates)} updates for a {options['nodes']}-node execution\n")
+        self.stdout.write(f"{'protocol':<24}{'bytes':>14}{'largest frame':>16}{'encode ms':>12}")
+        for label, kwargs in PROTOCOLS:
+            protocol = ProgressProtocol(**kwargs)
+            if protocol.format != kwargs.get('format', 'json'):
+                self.stdout.write(f'{label:<24}  skipped, msgpack is not installed')
+                continue
+            total = largest = 0
+            started = time.perf_counter()
+            for event in updates:
+                text_data, bytes_data = protocol.encode(protocol.build(event))
+                size = len(text_data.encode()) if text_data is not None else len(bytes_data)
+                total += size
+                largest = max(largest, size)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'{label:<24}{total:>14,}{largest:>16,}{elapsed:>12.1f}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from workflows import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Delete stored node output artifacts that no execution refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=float, help="Keep unreferenced blobs used within this many seconds (default: ARTIFACTS['GC_GRACE'])")
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it')
+
+    def handle(self, *args, **options):
+        report = artifacts.collect_garbage(options['grace'], options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(
+            f"{verb} {report['removed']} artifacts ({report['freed_bytes']} bytes); {report['kept']} kept"
+        )
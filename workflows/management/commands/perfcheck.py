@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from workflows import perfcheck
+
+REGRESSIONS = ('slower', 'more queries')
+
+
+class Command(BaseCommand):
+    help = 'Run the engine and API micro-benchmarks and fail on regressions against the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', help='Run benchmarks whose name starts with this (repeatable)')
+        parser.add_argument('--runs', type=int, default=10, help='Samples per benchmark')
+        parser.add_argument('--min-time', type=float, default=0.05, help='Seconds each sample runs for at least')
+        parser.add_argument('--threshold', type=float, default=0.10, help='Slowdown that counts as a regression (0.10 = 10%%)')
+        parser.add_argument('--baseline', default=str(perfcheck.BASELINE_PATH))
+        parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline instead of comparing')
+        parser.add_argument('--output', help='Write the raw samples of this run as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 2:
+            raise CommandError('--runs must be at least 2 to estimate noise')
+        report = perfcheck.run(options['only'], options['runs'], options['min_time'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['update_baseline']:
+            perfcheck.save_baseline(report, options['baseline'])
+            self.stdout.write(f"Baseline with {len(report['benchmarks'])} benchmarks written to {options['baseline']}")
+            return
+
+        try:
+            baseline = perfcheck.load_baseline(options['baseline'])
+        except FileNotFoundError:
+            raise CommandError(f"No baseline at {options['baseline']}; create one with --update-baseline")
+        if baseline.get('database') != report['database']:
+            self.stderr.write(
+                f"Baseline was recorded on {baseline.get('database')}, this run uses {report['database']}; "
+                "timings and query counts may not be comparable"
+            )
+
+        rows = perfcheck.compare(report, baseline, options['threshold'])
+        self.stdout.write(
+            f"{'benchmark':<30}{'baseline ms':>12}{'now ms':>10}{'change':>9}{'95% CI':>20}{'queries':>11}  verdict"
+        )
+        for row in rows:
+            if row['verdict'] == 'new':
+                self.stdout.write(f"{row['name']:<30}{'-':>12}{row['current'] * 1000:>10.3f}{'':>29}{row['queries']:>11}  new")
+                continue
+            low, high = row['interval']
+            interval = f'[{low:+.1%}, {high:+.1%}]'
+            queries = f"{row['baseline_queries']}->{row['queries']}"
+            self.stdout.write(
+                f"{row['name']:<30}{row['baseline'] * 1000:>12.3f}{row['scaled'] * 1000:>10.3f}{row['change']:>+9.1%}"
+                f"{interval:>20}{queries:>11}  {row['verdict']}"
+            )
+
+        regressed = [row['name'] for row in rows if row['verdict'] in REGRESSIONS]
+        if regressed:
+            raise CommandError(f"Performance regressed in {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS(f'No regressions beyond {options["threshold"]:.0%}'))
@@ -0,0 +1,31 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    try:
+        token = AccessToken(raw_token)
+        return User.objects.get(id=token['user_id'])
+    except (TokenError, KeyError, User.DoesNotExist):
+        return AnonymousUser()
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate websocket connections with a JWT access token passed as ``?token=``.
+
+    Browsers can't set an Authorization header on websockets, so the token the
+    REST API uses travels in the query string instead. Connections without a
+    token keep whatever user the session middleware found.
+    """
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        if 'token' in query:
+            scope = dict(scope, user=await get_user_for_token(query['token'][0]))
+        return await super().__call__(scope, receive, send)
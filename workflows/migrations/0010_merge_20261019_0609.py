@@ -0,0 +1,14 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0002_node_is_enabled'),
+        ('workflows', '0009_nodeport_nodeconnection'),
+    ]
+
+    operations = [
+    ]
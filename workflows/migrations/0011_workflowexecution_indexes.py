@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0010_merge_20261019_0609'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['-started_at', '-id'], name='execution_started'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['workflow', '-started_at'], name='execution_workflow_started'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['workflow', 'status', '-started_at'], name='execution_status_started'),
+        ),
+    ]
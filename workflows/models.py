@@ -38,7 +38,15 @@ class WorkflowExecution(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     results = models.JSONField(null=True, blank=True)
     error_logs = models.TextField(null=True, blank=True)
-    
+
+    class Meta:
+        # Execution history is listed newest first, per user or per workflow and status
+        indexes = [
+            models.Index(fields=['-started_at', '-id'], name='execution_started'),
+            models.Index(fields=['workflow', '-started_at'], name='execution_workflow_started'),
+            models.Index(fields=['workflow', 'status', '-started_at'], name='execution_status_started'),
+        ]
+
     def __str__(self):
         return f"Execution of {self.workflow.name} ({self.status.capitalize()})"
 
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ExecutionCursorPagination(CursorPagination):
+    """
+    Newest executions first. The cursor encodes the last ``started_at`` seen,
+    so each page is an index range scan however deep the history goes.
+    """
+    ordering = ('-started_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,235 @@
+"""
+Performance regression checks for the engine and the API.
+
+Each benchmark is a setup function, registered with ``@benchmark``, that
+creates its data and returns the operation to time. ``run`` takes
+``runs`` samples of every benchmark. Each sample times enough back-to-back
+operations to last ``min_time`` seconds. ``run`` also counts the DB queries of
+one operation. Everything runs in a rolled-back transaction.
+
+``compare`` checks the results against a stored baseline (``BASELINE_PATH``,
+written with ``perfcheck --update-baseline``):
+
+* time per operation regresses when the mean is more than ``threshold``
+  slower and the 95% confidence interval of the change (Welch's t) excludes
+  zero, so noise alone doesn't fail the check;
+* query counts are deterministic, so any increase is a regression.
+
+To make baselines from one machine usable on another, every run also times a
+fixed pure-Python workload, and timings are scaled by how fast that
+calibration ran compared with the baseline's. Baselines are only
+comparable on the same database backend.
+"""
+import gc
+import json
+import math
+import platform
+import statistics
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .benchmark import MockNodeRunner, build_workflow, count_queries, git_commit, rolled_back, run_execution
+from .models import Workflow
+from .serializers import WorkflowSerializer
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'perf_baselines.json'
+PERFCHECK_USER = 'perfcheck'
+
+# Two-sided 95% critical values of Student's t for 1-30 degrees of freedom
+_T95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('engine.chain_50')
+def engine_chain(user):
+    workflow = build_workflow(user, 'chain', 50)
+    return lambda: run_execution(workflow, MockNodeRunner())
+
+
+@benchmark('engine.fanout_50_observers')
+def engine_fanout_observers(user):
+    workflow = build_workflow(user, 'fanout', 50)
+    return lambda: run_execution(workflow, MockNodeRunner(), observers=True)
+
+
+@benchmark('serializer.workflow_list')
+def serializer_workflow_list(user):
+    for _ in range(20):
+        build_workflow(user, 'chain', 10)
+    return lambda: WorkflowSerializer(Workflow.objects.filter(user=user), many=True).data
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@benchmark('api.workflow_list')
+def api_workflow_list(user):
+    for _ in range(20):
+        build_workflow(user, 'chain', 10)
+    client = _client(user)
+    return lambda: client.get('/api/workflows/workflows/')
+
+
+@benchmark('api.execution_detail')
+def api_execution_detail(user):
+    workflow = build_workflow(user, 'chain', 10)
+    execution = run_execution(workflow, MockNodeRunner()).execution
+    client = _client(user)
+    return lambda: client.get(f'/api/workflows/workflow_executions/{execution.id}/')
+
+
+@benchmark('api.execute')
+def api_execute(user):
+    workflow = build_workflow(user, 'chain', 5)
+    client = _client(user)
+
+    def execute():
+        # Celery runs eagerly here, so this covers the request and the whole run
+        with patch('workflows.execution.execute_node', MockNodeRunner()):
+            client.post(f'/api/workflows/workflows/{workflow.id}/execute/')
+    return execute
+
+
+def calibration_workload():
+    """Fixed CPU-bound work, used to compare machine speed between runs."""
+    data = {}
+    for i in range(20000):
+        data[f'key{i}'] = i * i
+    return sum(value % 7 for value in data.values())
+
+
+def sample(operation, runs=10, min_time=0.05) -> list:
+    """``runs`` measurements of seconds per ``operation`` call."""
+    operation()
+    started = time.perf_counter()
+    operation()
+    once = max(time.perf_counter() - started, 1e-6)
+    iterations = max(1, math.ceil(min_time / once))
+    samples = []
+    # As in timeit, collector pauses would otherwise land in random samples
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(runs):
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                operation()
+            samples.append((time.perf_counter() - started) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def run(names=None, runs=10, min_time=0.05) -> dict:
+    results = {}
+    # The API benchmarks go through the test client, whose requests come from 'testserver'
+    with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, setup in BENCHMARKS.items():
+            if names and not any(name.startswith(prefix) for prefix in names):
+                continue
+            # A user per benchmark, so list endpoints only see that benchmark's data
+            user, _ = get_user_model().objects.get_or_create(username=f'{PERFCHECK_USER}.{name}')
+            operation = setup(user)
+            samples = sample(operation, runs, min_time)
+            with count_queries() as queries:
+                operation()
+            results[name] = {'samples': samples, 'queries': queries.count}
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'calibration': sample(calibration_workload, runs, min_time),
+        'benchmarks': results,
+    }
+
+
+def _t95(df):
+    if df < 1:
+        return _T95[0]
+    return _T95[int(df) - 1] if df <= len(_T95) else 1.96
+
+
+def welch_interval(current, baseline):
+    """95% confidence interval of ``mean(current) - mean(baseline)``."""
+    mean_c, mean_b = statistics.fmean(current), statistics.fmean(baseline)
+    var_c = statistics.variance(current) / len(current) if len(current) > 1 else 0.0
+    var_b = statistics.variance(baseline) / len(baseline) if len(baseline) > 1 else 0.0
+    se = math.sqrt(var_c + var_b)
+    if se == 0:
+        return mean_c - mean_b, mean_c - mean_b
+    df = (var_c + var_b) ** 2 / (
+        (var_c ** 2 / (len(current) - 1) if len(current) > 1 else 0)
+        + (var_b ** 2 / (len(baseline) - 1) if len(baseline) > 1 else 0)
+    )
+    margin = _t95(df) * se
+    return mean_c - mean_b - margin, mean_c - mean_b + margin
+
+
+def compare(report, baseline, threshold=0.10) -> list:
+    """One row per benchmark with the scaled change against ``baseline`` and a verdict."""
+    speed = statistics.median(report['calibration']) / statistics.median(baseline['calibration'])
+    rows = []
+    for name, result in report['benchmarks'].items():
+        row = {'name': name, 'current': statistics.fmean(result['samples']), 'queries': result['queries']}
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            rows.append({**row, 'verdict': 'new'})
+            continue
+        scaled = [value / speed for value in result['samples']]
+        mean_b = statistics.fmean(previous['samples'])
+        low, high = welch_interval(scaled, previous['samples'])
+        change = statistics.fmean(scaled) / mean_b - 1
+        verdict = 'ok'
+        if result['queries'] > previous['queries']:
+            verdict = 'more queries'
+        elif change > threshold and low > 0:
+            verdict = 'slower'
+        elif change < -threshold and high < 0:
+            verdict = 'faster'
+        rows.append({
+            **row,
+            'scaled': statistics.fmean(scaled),
+            'baseline': mean_b,
+            'baseline_queries': previous['queries'],
+            'change': change,
+            'interval': (low / mean_b, high / mean_b),
+            'verdict': verdict,
+        })
+    return rows
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
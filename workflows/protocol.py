@@ -0,0 +1,142 @@
+"""
+Wire protocol for execution progress messages.
+
+By default every progress update is a JSON text frame with the execution's
+full ``results`` and ``errors``, which for large workflows means resending
+every node's output each time. Clients can negotiate a cheaper protocol with
+query-string parameters when they connect:
+
+* ``delta=1``: after the first (full) message, only nodes whose result or
+  error changed are sent, plus ``removed`` ids. Every message carries ``seq``
+  and ``delta``; a client that loses track sends ``{"type": "resync"}`` and
+  the next message is a full snapshot again.
+* ``format=msgpack``: frames are MessagePack instead of JSON. Falls back to
+  JSON if the ``msgpack`` package isn't installed.
+* ``compress=1``: frames larger than ``WORKFLOW_PROGRESS_COMPRESS_THRESHOLD``
+  bytes are zlib-compressed.
+
+MessagePack and compressed frames are sent as binary websocket frames whose
+first byte holds flags (``FLAG_MSGPACK``, ``FLAG_ZLIB``) and the rest the
+payload. Uncompressed JSON is still sent as a text frame, so the default
+protocol is unchanged for existing clients.
+"""
+import json
+import zlib
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+
+_missing = object()
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+def _truthy(value) -> bool:
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+class ProgressProtocol:
+    def __init__(self, format='json', delta=False, compress=False, compress_threshold=None, compress_level=6):
+        if format == 'msgpack' and _msgpack() is None:
+            format = 'json'
+        self.format = format
+        self.delta = delta
+        self.compress = compress
+        if compress_threshold is None:
+            compress_threshold = getattr(settings, 'WORKFLOW_PROGRESS_COMPRESS_THRESHOLD', 1024)
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.seq = 0
+        self._sent = {'results': {}, 'errors': {}}
+
+    @classmethod
+    def from_query_string(cls, query_string):
+        if isinstance(query_string, bytes):
+            query_string = query_string.decode()
+        params = {key: values[0] for key, values in parse_qs(query_string).items()}
+        return cls(
+            format='msgpack' if params.get('format') == 'msgpack' else 'json',
+            delta=_truthy(params.get('delta', '')),
+            compress=_truthy(params.get('compress', '')),
+        )
+
+    @property
+    def negotiated(self) -> bool:
+        return self.format != 'json' or self.delta or self.compress
+
+    def describe(self) -> dict:
+        return {'type': 'protocol', 'format': self.format, 'delta': self.delta, 'compress': self.compress}
+
+    def resync(self):
+        """Forget what was sent so the next message is a full snapshot."""
+        self._sent = {'results': {}, 'errors': {}}
+
+    def _diff(self, name, current):
+        previous = self._sent[name]
+        changed = {key: value for key, value in current.items() if previous.get(key, _missing) != value}
+        removed = [key for key in previous if key not in current]
+        self._sent[name] = dict(current)
+        return changed, removed
+
+    def build(self, event) -> dict:
+        """Turn a ``send_update`` channel event into the message for this client."""
+        self.seq += 1
+        message = {
+            'message': event['message'],
+            'status': event['status'],
+            'events': event.get('events', []),
+        }
+        results = event.get('results', {})
+        errors = event.get('errors', {})
+        if not self.delta:
+            message.update(results=results, errors=errors)
+            return message
+
+        full = not self._sent['results'] and not self._sent['errors']
+        changed_results, removed_results = self._diff('results', results)
+        changed_errors, removed_errors = self._diff('errors', errors)
+        message.update(seq=self.seq, delta=not full, results=changed_results, errors=changed_errors)
+        removed = {}
+        if removed_results:
+            removed['results'] = removed_results
+        if removed_errors:
+            removed['errors'] = removed_errors
+        if removed:
+            message['removed'] = removed
+        return message
+
+    def encode(self, message):
+        """Encode ``message`` as a ``(text_data, bytes_data)`` pair; exactly one is set."""
+        flags = 0
+        if self.format == 'msgpack':
+            payload = _msgpack().packb(message, use_bin_type=True)
+            flags |= FLAG_MSGPACK
+        else:
+            payload = json.dumps(message, separators=(',', ':')).encode()
+        if self.compress and len(payload) > self.compress_threshold:
+            payload = zlib.compress(payload, self.compress_level)
+            flags |= FLAG_ZLIB
+        if not flags:
+            return payload.decode(), None
+        return None, bytes([flags]) + payload
+
+
+def decode(text_data=None, bytes_data=None):
+    """Decode a frame produced by ``ProgressProtocol.encode``."""
+    if text_data is not None:
+        return json.loads(text_data)
+    flags, payload = bytes_data[0], bytes_data[1:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    if flags & FLAG_MSGPACK:
+        return _msgpack().unpackb(payload, raw=False, strict_map_key=False)
+    return json.loads(payload)
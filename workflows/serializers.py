@@ -40,6 +40,20 @@ class WorkflowSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'user', 'created_at', 'updated_at', 'nodes','config']
 
 class WorkflowExecutionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for WorkflowExecution objects.
+
+    Pass ``fields`` to serialize only those fields.
+    """
+    # Left out of execution lists unless asked for; they can be megabytes per row
+    LARGE_FIELDS = ('results', 'error_logs')
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = WorkflowExecution
         fields = [
@@ -1,21 +1,45 @@
 from celery import shared_task
 from .models import Workflow, WorkflowExecution
-from .execution import WorkflowExecutor
+from .execution import WorkflowExecutor, default_observers
+from ai_integration.exceptions import CircuitOpenError
+from analytics import profiling, tracing
+from analytics.memory import MemoryProfiler
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
-def run_workflow(self, workflow_id, execution_id):
+@shared_task(bind=True, autoretry_for=(Exception,), dont_autoretry_for=(CircuitOpenError,), retry_kwargs={'max_retries': 3})
+def run_workflow(self, workflow_id, execution_id, profile=None, memory_profile=False):
+    """
+    Run an execution. ``profile`` ('cpu' or 'wall') attaches the sampling
+    profiler and saves an ``ExecutionProfile`` for the run; ``memory_profile``
+    records per-node tracemalloc results in an ``ExecutionMemoryReport``.
+    """
     try:
-        workflow = Workflow.objects.get(id=workflow_id)
-        execution = WorkflowExecution.objects.get(id=execution_id)
-        executor = WorkflowExecutor(execution)
-        executor.execute_workflow()
+        with tracing.start_trace('run_workflow', key=execution_id, execution_id=execution_id, workflow_id=workflow_id):
+            workflow = Workflow.objects.get(id=workflow_id)
+            execution = WorkflowExecution.objects.get(id=execution_id)
+            if execution.status == 'pending':
+                # started_at still holds the creation time, so this is how long the task sat in the queue
+                tracing.record_span('celery.queue', execution.started_at.timestamp(), time.time())
+            observers = default_observers(execution)
+            if memory_profile:
+                observers.append(MemoryProfiler(execution))
+            executor = WorkflowExecutor(execution, observers=observers)
+            if profile:
+                with profiling.profile_execution(execution, profile):
+                    executor.execute_workflow()
+            else:
+                executor.execute_workflow()
     except Workflow.DoesNotExist:
         logger.error(f"Workflow {workflow_id} not found")
     except WorkflowExecution.DoesNotExist:
         logger.error(f"WorkflowExecution {execution_id} not found")
+    except CircuitOpenError as e:
+        # The provider is known to be down; retrying the whole workflow would fail the same way
+        logger.warning(f"Workflow {workflow_id} stopped: {e}")
+        raise
     except Exception as e:
         logger.critical(f"Critical workflow error: {str(e)}", exc_info=True)
         raise self.retry(exc=e)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from analytics.execution_log import ExecutionLogRecorder
+from workflows import artifacts
+from workflows.execution import WorkflowExecutor
+from workflows.models import Workflow, Node, NodeConnection, WorkflowExecution
+
+User = get_user_model()
+
+class ArtifactStoreTests(APITestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(ARTIFACTS={'OPTIONS': {'root': self.root}, 'THRESHOLD': 1024, 'GC_GRACE': 60})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        artifacts.reset()
+        self.addCleanup(artifacts.reset)
+        self.storage = artifacts.get_storage()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def test_offload_thresholds_and_round_trip(self):
+        self.assertEqual(artifacts.offload('short'), 'short')
+        self.assertEqual(artifacts.offload({'a': 1}), {'a': 1})
+        values = ['x' * 2000, list(range(1000)), b'\x00\x01' * 10]
+        for value in values:
+            reference = artifacts.offload(value)
+            self.assertTrue(artifacts.is_reference(reference), value)
+            self.assertEqual(artifacts.load(reference), value)
+        reference = artifacts.offload(b'audio', 'audio/mpeg')
+        self.assertEqual(reference['content_type'], 'audio/mpeg')
+        self.assertEqual(bytes(self.storage.read_view(reference['artifact'][len(artifacts.PREFIX):])), b'audio')
+
+    def test_identical_outputs_share_a_blob(self):
+        first = artifacts.offload('y' * 5000)
+        second = artifacts.offload('y' * 5000)
+        self.assertEqual(first, second)
+        self.assertEqual(len(list(self.storage.blobs())), 1)
+
+    def run_workflow(self, large):
+        workflow = Workflow.objects.create(name='Large', user=self.user)
+        source = Node.objects.create(workflow=workflow, type='text_input', config={}, order=0)
+        target = Node.objects.create(workflow=workflow, type='text_input', config={}, order=1)
+        NodeConnection.objects.create(source_node=source, target_node=target)
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+        inputs = []
+
+        def execute_node(node, input_data, continue_on_error=False):
+            inputs.append(input_data)
+            return large if node == source else 'done'
+
+        with patch('workflows.execution.execute_node', side_effect=execute_node):
+            WorkflowExecutor(execution, observers=[ExecutionLogRecorder(execution)]).execute_workflow()
+        execution.refresh_from_db()
+        return execution, source, inputs
+
+    def test_executor_keeps_references_in_results(self):
+        large = 'z' * 4000
+        execution, source, inputs = self.run_workflow(large)
+        # The downstream node still gets the value itself
+        self.assertEqual(inputs[1], large)
+        reference = execution.results[str(source.id)]
+        self.assertTrue(artifacts.is_reference(reference))
+
+        url = f'/api/workflows/workflow_executions/{execution.id}/nodes/{source.id}/'
+        self.assertEqual(self.client.get(url).data['output'], reference)
+        response = self.client.get(f'{url}artifact/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(b''.join(response.streaming_content).decode(), large)
+        self.assertEqual(self.client.get(url.replace(str(source.id), str(source.id + 1)) + 'artifact/').status_code, 404)
+
+    def test_garbage_collection(self):
+        execution, source, _ = self.run_workflow('kept' * 1000)
+        referenced = artifacts.offload('kept' * 1000)['artifact'][len(artifacts.PREFIX):]
+        orphan = artifacts.offload('orphan' * 1000)['artifact'][len(artifacts.PREFIX):]
+        recent = artifacts.offload('recent' * 1000)['artifact'][len(artifacts.PREFIX):]
+        old = time.time() - 120
+        for digest in (referenced, orphan):
+            os.utime(self.storage.path(digest), (old, old))
+
+        self.assertEqual(artifacts.collect_garbage(dry_run=True), {'removed': 1, 'freed_bytes': 6000, 'kept': 2})
+        self.assertTrue(self.storage.exists(orphan))
+        call_command('gc_artifacts', stdout=io.StringIO())
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(referenced))
+        self.assertTrue(self.storage.exists(recent))
+
+        # Once the execution is gone, nothing refers to its output
+        execution.delete()
+        self.assertEqual(artifacts.collect_garbage(grace=0)['removed'], 2)
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from workflows.benchmark import build_workflow, run_benchmark
+from workflows.models import NodeConnection, Workflow
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class BuildWorkflowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def test_shapes(self):
+        chain = build_workflow(self.user, 'chain', 5)
+        self.assertEqual(NodeConnection.objects.filter(source_node__workflow=chain).count(), 4)
+        fanout = build_workflow(self.user, 'fanout', 5)
+        self.assertEqual(NodeConnection.objects.filter(source_node__workflow=fanout, source_node__order=0).count(), 4)
+        diamond = build_workflow(self.user, 'diamond', 5)
+        self.assertEqual(NodeConnection.objects.filter(target_node__workflow=diamond, target_node__order=4).count(), 3)
+
+    def test_unknown_shape(self):
+        with self.assertRaises(ValueError):
+            build_workflow(self.user, 'star', 5)
+
+class EngineBenchmarkTests(TestCase):
+    def test_report_and_rollback(self):
+        report = run_benchmark(shapes=['chain', 'diamond'], sizes=[5], runs=2)
+        self.assertEqual([(row['shape'], row['nodes']) for row in report['results']], [('chain', 5), ('diamond', 5)])
+        for row in report['results']:
+            self.assertGreater(row['executions_per_second'], 0)
+            self.assertGreater(row['queries_per_execution'], 0)
+            self.assertGreater(row['peak_memory_bytes'], 0)
+        self.assertFalse(Workflow.objects.exists())
+
+    def test_command_writes_and_compares(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            call_command('benchmark_engine', shapes='fanout', sizes=[4], runs=1, output=path, stdout=StringIO())
+            with open(path) as f:
+                self.assertEqual(json.load(f)['results'][0]['shape'], 'fanout')
+            out = StringIO()
+            call_command('benchmark_engine', shapes='fanout', sizes=[4], runs=1, compare=path, stdout=out)
+            self.assertIn('vs', out.getvalue())
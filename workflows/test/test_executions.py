@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from workflows.models import Workflow, WorkflowExecution
+
+User = get_user_model()
+URL = '/api/workflows/workflow_executions/'
+
+class ExecutionHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.workflows = [Workflow.objects.create(name=f'Workflow {i}', user=self.user) for i in range(2)]
+        self.now = timezone.now()
+        for i in range(30):
+            execution = WorkflowExecution.objects.create(
+                workflow=self.workflows[i % 2],
+                status='failed' if i % 3 == 0 else 'completed',
+                results={'output': 'x' * 100},
+                error_logs='boom',
+            )
+            # Some share a start time, so the cursor has to break ties
+            execution.started_at = self.now - timedelta(minutes=i // 2)
+            execution.save()
+        other = User.objects.create_user(username='other', password='testpassword')
+        WorkflowExecution.objects.create(workflow=Workflow.objects.create(name='Theirs', user=other))
+
+    def all_pages(self, params):
+        ids, response = [], self.client.get(URL, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [execution['id'] for execution in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_cover_history_newest_first(self):
+        ids = self.all_pages({'page_size': 7})
+        expected = WorkflowExecution.objects.filter(workflow__user=self.user).order_by('-started_at', '-id')
+        self.assertEqual(ids, list(expected.values_list('id', flat=True)))
+
+    def test_filters(self):
+        workflow = self.workflows[1]
+        ids = self.all_pages({'workflow': workflow.id, 'status': 'failed', 'page_size': 2})
+        expected = WorkflowExecution.objects.filter(workflow=workflow, status='failed')
+        self.assertEqual(set(ids), set(expected.values_list('id', flat=True)))
+
+        params = {'started_after': (self.now - timedelta(minutes=3)).isoformat(), 'started_before': self.now.isoformat()}
+        ids = self.all_pages(params)
+        self.assertEqual(len(ids), 6)
+
+    def test_bad_filters(self):
+        for params in [{'status': 'done'}, {'workflow': 'abc'}, {'started_after': 'yesterday'}, {'fields': 'secret'}]:
+            self.assertEqual(self.client.get(URL, params).status_code, 400, params)
+
+    def test_list_leaves_out_large_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(URL)
+        self.assertNotIn('results', response.data['results'][0])
+        self.assertNotIn('error_logs', response.data['results'][0])
+        self.assertFalse([query for query in queries.captured_queries if '"error_logs"' in query['sql']])
+
+        response = self.client.get(URL, {'fields': 'id,status,results'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status', 'results'})
+        self.assertEqual(response.data['results'][0]['results'], {'output': 'x' * 100})
+
+    def test_detail_has_every_field(self):
+        execution = WorkflowExecution.objects.filter(workflow__user=self.user).first()
+        response = self.client.get(f'{URL}{execution.id}/')
+        self.assertEqual(response.data['error_logs'], 'boom')
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from analytics.testing import QueryBudgetMixin
+from workflows.models import Workflow, Node, NodeConnection
+
+User = get_user_model()
+
+class WorkflowGraphTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Graph', user=self.user)
+        self.nodes = [
+            Node.objects.create(workflow=self.workflow, type='text_input', config={'i': i}, order=i)
+            for i in range(10)
+        ]
+        for source, target in zip(self.nodes, self.nodes[1:]):
+            NodeConnection.objects.create(source_node=source, target_node=target)
+        NodeConnection.objects.create(
+            source_node=self.nodes[0], target_node=self.nodes[9], source_port='text', target_port='context'
+        )
+        self.url = f'/api/workflows/workflows/{self.workflow.id}/graph/'
+
+    def test_graph_document(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        graph = response.data
+        self.assertEqual([node['id'] for node in graph['nodes']], [node.id for node in self.nodes])
+        self.assertEqual(len(graph['connections']), 10)
+        self.assertEqual(graph['nodes'][0]['outputs'], ['output', 'text'])
+        self.assertEqual(graph['nodes'][9]['inputs'], ['context', 'input'])
+        self.assertEqual(response['ETag'], f'"{self.workflow.id}-{graph["version"]}"')
+
+    def test_queries_do_not_grow_with_the_graph(self):
+        with self.assertQueryBudget(max_queries=4, max_repeats=1):
+            self.client.get(self.url)
+        # Rendered once; later requests only look up the workflow
+        with self.assertQueryBudget(max_queries=2):
+            self.client.get(self.url)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_mutations_change_the_version(self):
+        mutations = [
+            lambda: Node.objects.create(workflow=self.workflow, type='text_input', config={}, order=10),
+            lambda: self.nodes[3].save(),
+            lambda: NodeConnection.objects.filter(target_node=self.nodes[9], target_port='context').get().delete(),
+            lambda: self.nodes[5].delete(),
+            lambda: self.client.patch(f'/api/workflows/workflows/{self.workflow.id}/', {'name': 'Renamed'}),
+        ]
+        response = self.client.get(self.url)
+        for mutate in mutations:
+            mutate()
+            fresh = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(fresh.status_code, 200)
+            self.assertGreater(fresh.data['version'], response.data['version'])
+            response = fresh
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertEqual(len(response.data['nodes']), 10)
+        self.assertEqual(len(response.data['connections']), 7)
+
+    def test_other_users_workflow(self):
+        other = User.objects.create_user(username='other', password='testpassword')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
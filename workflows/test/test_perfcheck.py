@@ -0,0 +1,49 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from workflows import perfcheck
+
+def report(samples, queries=10, calibration=(1.0, 1.0, 1.0)):
+    return {'calibration': list(calibration), 'benchmarks': {'engine.chain_50': {'samples': list(samples), 'queries': queries}}}
+
+class CompareTests(SimpleTestCase):
+    baseline = report([1.00, 1.02, 0.98, 1.01, 0.99])
+
+    def test_noise_is_not_a_regression(self):
+        row, = perfcheck.compare(report([1.03, 0.97, 1.05, 0.99, 1.01]), self.baseline)
+        self.assertEqual(row['verdict'], 'ok')
+
+    def test_consistent_slowdown_is(self):
+        row, = perfcheck.compare(report([1.30, 1.32, 1.28, 1.31, 1.29]), self.baseline)
+        self.assertEqual(row['verdict'], 'slower')
+        self.assertGreater(row['interval'][0], 0)
+
+    def test_noisy_slowdown_is_not(self):
+        row, = perfcheck.compare(report([0.6, 2.0, 0.9, 1.8, 1.0]), self.baseline)
+        self.assertGreater(row['change'], 0.10)
+        self.assertEqual(row['verdict'], 'ok')
+
+    def test_slower_machine_is_scaled(self):
+        row, = perfcheck.compare(report([2.00, 2.04, 1.96, 2.02, 1.98], calibration=(2.0, 2.0, 2.0)), self.baseline)
+        self.assertEqual(row['verdict'], 'ok')
+
+    def test_more_queries(self):
+        row, = perfcheck.compare(report([1.0, 1.0, 1.0], queries=11), self.baseline)
+        self.assertEqual(row['verdict'], 'more queries')
+
+class PerfcheckCommandTests(TestCase):
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            options = {'only': ['api.execution_detail'], 'runs': 3, 'min_time': 0.001, 'baseline': path, 'stdout': StringIO()}
+            call_command('perfcheck', update_baseline=True, **options)
+            out = StringIO()
+            call_command('perfcheck', **{**options, 'stdout': out, 'threshold': 100})
+            self.assertIn('api.execution_detail', out.getvalue())
+
+    def test_missing_baseline(self):
+        with self.assertRaises(CommandError):
+            call_command('perfcheck', only=['api.execution_detail'], runs=2, min_time=0.001, baseline='/nonexistent/baseline.json', stdout=StringIO())
@@ -0,0 +1,123 @@
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from workflows.events import ProgressPublisher, execution_group_name
+from workflows.execution import WorkflowExecutor
+from workflows.models import Workflow, Node, WorkflowExecution
+
+User = get_user_model()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeTimer:
+    """Stands in for ``threading.Timer``; the test fires it."""
+
+    def __init__(self, delay, function):
+        self.delay = delay
+        self.function = function
+        self.cancelled = False
+
+    @classmethod
+    def factory(cls, timers):
+        def make(delay, function):
+            timers.append(cls(delay, function))
+            return timers[-1]
+        return make
+
+    def start(self):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fire(self):
+        if not self.cancelled:
+            self.function()
+
+class RecordingObserver:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, hook):
+        if not hook.startswith('on_'):
+            raise AttributeError(hook)
+        return lambda executor, *args: self.calls.append(hook)
+
+class ProgressPublisherTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='testpassword')
+        workflow = Workflow.objects.create(name='Test Workflow', user=user)
+        self.node = Node.objects.create(workflow=workflow, type='text_input', config={'text': 'Hi'}, order=1)
+        self.execution = WorkflowExecution.objects.create(workflow=workflow)
+        self.layer = InMemoryChannelLayer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(execution_group_name(self.execution.id), self.channel)
+        self.clock = FakeClock()
+
+    def receive_all(self):
+        messages = []
+        while self.layer.channels.get(self.channel):
+            messages.append(async_to_sync(self.layer.receive)(self.channel))
+        return messages
+
+    def test_held_events_are_delivered_after_the_interval(self):
+        timers = []
+        publisher = ProgressPublisher(self.execution, self.layer, min_interval=1.0, clock=self.clock, timer=FakeTimer.factory(timers))
+        executor = WorkflowExecutor(self.execution, observers=[publisher])
+        publisher.on_execution_started(executor)
+        publisher.on_node_started(executor, self.node)
+        self.assertEqual(len(self.receive_all()), 1)
+        # The start of a long-running node goes out once the interval has passed, not at the end of the run
+        self.assertEqual([timer.delay for timer in timers], [1.0])
+        self.clock.now = 1.0
+        timers[0].fire()
+        messages = self.receive_all()
+        self.assertEqual([e['event'] for m in messages for e in m['events']], ['node_started'])
+
+        self.clock.now = 1.5
+        publisher.on_node_finished(executor, self.node, 'Hi')
+        self.assertEqual(self.receive_all(), [])
+        self.clock.now = 2.0
+        publisher.on_execution_finished(executor, 'completed')
+        self.assertTrue(timers[1].cancelled)
+        messages = self.receive_all()
+        self.assertEqual(len(messages), 1)
+        self.assertEqual([e['event'] for e in messages[0]['events']], ['node_finished', 'execution_finished'])
+        self.assertEqual(messages[0]['status'], 'completed')
+
+    def test_finish_does_not_replace_an_unsent_start(self):
+        timers = []
+        publisher = ProgressPublisher(self.execution, self.layer, min_interval=1.0, clock=self.clock, timer=FakeTimer.factory(timers))
+        executor = WorkflowExecutor(self.execution, observers=[publisher])
+        publisher.on_execution_started(executor)
+        publisher.on_node_started(executor, self.node)
+        publisher.on_node_finished(executor, self.node, 'Hi')
+        self.receive_all()
+        self.assertEqual(len(timers), 1)
+        self.clock.now = 1.0
+        timers[0].fire()
+        events = [e['event'] for m in self.receive_all() for e in m['events']]
+        self.assertEqual(events, ['node_started', 'node_finished'])
+
+    def test_executor_publishes_progress(self):
+        publisher = ProgressPublisher(self.execution, self.layer, min_interval=0, clock=self.clock)
+        with patch('workflows.execution.execute_node', return_value='Hi'):
+            WorkflowExecutor(self.execution, observers=[publisher]).execute_workflow()
+        events = [e['event'] for m in self.receive_all() for e in m['events']]
+        self.assertEqual(events, ['execution_started', 'node_started', 'node_finished', 'execution_finished'])
+
+    def test_failed_node_is_reported(self):
+        observer = RecordingObserver()
+        with patch('workflows.execution.execute_node', side_effect=ValueError('bad input')):
+            with self.assertRaises(ValueError):
+                WorkflowExecutor(self.execution, observers=[observer]).execute_workflow()
+        self.assertEqual(observer.calls, [
+            'on_execution_started', 'on_node_started', 'on_node_failed', 'on_execution_finished'
+        ])
@@ -0,0 +1,177 @@
+import zlib
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, TestCase
+from ai_integration.models import AIModelConfig
+from workflows.events import execution_group_name
+from workflows.models import Workflow, WorkflowExecution
+from workflows.protocol import ProgressProtocol, decode, FLAG_MSGPACK, FLAG_ZLIB
+from workflows.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+def update(results, errors=None):
+    return {'message': 'progress', 'status': 'running', 'results': results, 'errors': errors or {}, 'events': []}
+
+class ProgressProtocolTests(TestCase):
+    def test_default_sends_full_json_text(self):
+        protocol = ProgressProtocol()
+        text_data, bytes_data = protocol.encode(protocol.build(update({'1': 'a'})))
+        self.assertIsNone(bytes_data)
+        self.assertEqual(decode(text_data)['results'], {'1': 'a'})
+
+    def test_delta_sends_only_changes(self):
+        protocol = ProgressProtocol(delta=True)
+        first = protocol.build(update({'1': 'a'}))
+        self.assertFalse(first['delta'])
+        second = protocol.build(update({'1': 'a', '2': 'b'}, {'3': 'boom'}))
+        self.assertTrue(second['delta'])
+        self.assertEqual(second['results'], {'2': 'b'})
+        self.assertEqual(second['errors'], {'3': 'boom'})
+        third = protocol.build(update({'2': 'c'}))
+        self.assertEqual(third['results'], {'2': 'c'})
+        self.assertEqual(third['removed'], {'results': ['1'], 'errors': ['3']})
+        self.assertEqual(third['seq'], 3)
+
+    def test_resync_sends_full_snapshot(self):
+        protocol = ProgressProtocol(delta=True)
+        protocol.build(update({'1': 'a'}))
+        protocol.resync()
+        message = protocol.build(update({'1': 'a'}))
+        self.assertFalse(message['delta'])
+        self.assertEqual(message['results'], {'1': 'a'})
+
+    def test_msgpack_and_compression_round_trip(self):
+        protocol = ProgressProtocol(format='msgpack', compress=True, compress_threshold=100)
+        message = protocol.build(update({'1': 'x' * 1000}))
+        text_data, bytes_data = protocol.encode(message)
+        self.assertIsNone(text_data)
+        self.assertEqual(bytes_data[0], FLAG_MSGPACK | FLAG_ZLIB)
+        self.assertLess(len(bytes_data), 200)
+        self.assertEqual(decode(bytes_data=bytes_data), message)
+
+    def test_small_frames_are_not_compressed(self):
+        protocol = ProgressProtocol(compress=True, compress_threshold=1000)
+        text_data, bytes_data = protocol.encode(protocol.build(update({'1': 'a'})))
+        self.assertIsNotNone(text_data)
+
+    def test_compressed_json_is_binary(self):
+        protocol = ProgressProtocol(compress=True, compress_threshold=10)
+        _, bytes_data = protocol.encode(protocol.build(update({'1': 'a' * 100})))
+        self.assertEqual(bytes_data[0], FLAG_ZLIB)
+        self.assertIn(b'"results"', zlib.decompress(bytes_data[1:]))
+
+    def test_negotiated_from_query_string(self):
+        protocol = ProgressProtocol.from_query_string(b'token=abc&format=msgpack&delta=1')
+        self.assertEqual(protocol.format, 'msgpack')
+        self.assertTrue(protocol.delta)
+        self.assertFalse(protocol.compress)
+        self.assertFalse(ProgressProtocol.from_query_string(b'token=abc').negotiated)
+
+class ProgressConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        workflow = Workflow.objects.create(name='Test Workflow', user=self.user)
+        self.execution = WorkflowExecution.objects.create(workflow=workflow)
+
+    def test_delta_msgpack_updates(self):
+        async def run():
+            communicator = WebsocketCommunicator(
+                URLRouter(websocket_urlpatterns),
+                f'/ws/workflow-executions/{self.execution.id}/?format=msgpack&delta=1'
+            )
+            communicator.scope['user'] = self.user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            hello = await communicator.receive_json_from()
+            self.assertEqual(hello['format'], 'msgpack')
+
+            layer = get_channel_layer()
+            group = execution_group_name(self.execution.id)
+            await layer.group_send(group, {'type': 'send_update', **update({'1': 'a'})})
+            await layer.group_send(group, {'type': 'send_update', **update({'1': 'a', '2': 'b'})})
+            first = decode(bytes_data=await communicator.receive_from())
+            second = decode(bytes_data=await communicator.receive_from())
+            await communicator.disconnect()
+            return first, second
+
+        first, second = async_to_sync(run)()
+        self.assertEqual(first['results'], {'1': 'a'})
+        self.assertEqual(second['results'], {'2': 'b'})
+
+    def test_other_users_cannot_watch(self):
+        async def run():
+            communicator = WebsocketCommunicator(
+                URLRouter(websocket_urlpatterns), f'/ws/workflow-executions/{self.execution.id}/'
+            )
+            communicator.scope['user'] = other
+            connected, _ = await communicator.connect()
+            return connected
+
+        other = User.objects.create_user(username='other', password='testpassword')
+        self.assertFalse(async_to_sync(run)())
+
+    def test_malformed_model_config_id_keeps_the_socket_open(self):
+        async def run():
+            communicator = WebsocketCommunicator(
+                URLRouter(websocket_urlpatterns), f'/ws/workflow-executions/{self.execution.id}/'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            replies = []
+            for model_config_id in ('abc', None, 999999):
+                await communicator.send_json_to({
+                    'type': 'stream_completion', 'model_config_id': model_config_id, 'request_id': 'r1', 'prompt': 'Hi'
+                })
+                replies.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+
+        for reply in async_to_sync(run)():
+            self.assertEqual(reply['type'], 'stream_error')
+            self.assertEqual(reply['request_id'], 'r1')
+
+    def test_non_object_frames_get_an_error(self):
+        async def run():
+            communicator = WebsocketCommunicator(
+                URLRouter(websocket_urlpatterns), f'/ws/workflow-executions/{self.execution.id}/'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            replies = []
+            for frame in ('[]', '"x"', '1'):
+                await communicator.send_to(text_data=frame)
+                replies.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+
+        for reply in async_to_sync(run)():
+            self.assertEqual(reply, {'type': 'error', 'error': 'Expected a JSON object'})
+
+    @patch('workflows.consumers.ProviderGateway.stream_completion', side_effect=KeyError('choices'))
+    def test_unexpected_stream_errors_keep_the_socket_open(self, mock_stream):
+        model_config = AIModelConfig.objects.create(name="Local", provider="OLLAMA", model_name="llama3")
+
+        async def run():
+            communicator = WebsocketCommunicator(
+                URLRouter(websocket_urlpatterns), f'/ws/workflow-executions/{self.execution.id}/'
+            )
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            await communicator.send_json_to({
+                'type': 'stream_completion', 'model_config_id': model_config.id, 'request_id': 'r1', 'prompt': 'Hi'
+            })
+            reply = await communicator.receive_json_from()
+            # Still connected: the next frame is answered
+            await communicator.send_to(text_data='[]')
+            follow_up = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return reply, follow_up
+
+        reply, follow_up = async_to_sync(run)()
+        self.assertEqual(reply, {'type': 'stream_error', 'request_id': 'r1', 'error': 'Completion stream failed'})
+        self.assertEqual(follow_up['type'], 'error')
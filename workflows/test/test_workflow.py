@@ -227,7 +227,8 @@ class WorkflowManagementSystemTests(APITestCase):
         )
         input_data = {'result': 'Hello, World!'}
         result = execute_node(node, input_data)
-        self.assertEqual(result, 'TTS audio generated successfully')
+        self.assertIsInstance(result, bytes)
+        self.assertGreater(len(result), 0)
         
     def test_execute_summarization_node_util(self):
         workflow = Workflow.objects.create(name='Test Workflow', user=self.user)
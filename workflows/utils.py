@@ -3,11 +3,39 @@ import logging
 import io
 from gtts import gTTS
 from transformers import pipeline
+from ai_integration.singleflight import get_flight, make_key
+from analytics import tracing
 from .models import Node
 
 logger = logging.getLogger(__name__)
 summarizer_pipeline = pipeline("summarization", model="facebook/bart-large-cnn")
 
+# External service each node type spends its time in, for per-provider timing
+NODE_PROVIDERS = {
+    "openai_tts": "gtts",
+    "huggingface_summarization": "huggingface",
+}
+
+# Content type of node outputs that are raw bytes, for the artifact store
+NODE_CONTENT_TYPES = {
+    "openai_tts": "audio/mpeg",
+}
+
+def node_provider(node: Node) -> str:
+    return node.config.get("provider") or NODE_PROVIDERS.get(node.type, "")
+
+def synthesize_speech(text: str, lang: str = 'en') -> bytes:
+    """Render ``text`` to MP3 audio with gTTS."""
+    with tracing.span('model.inference', model='gtts', chars=len(text)):
+        tts = gTTS(text=text, lang=lang)
+        audio_file = io.BytesIO()
+        tts.write_to_fp(audio_file)
+        return audio_file.getvalue()
+
+def summarize(text):
+    with tracing.span('model.inference', model='facebook/bart-large-cnn', chars=len(str(text))):
+        return summarizer_pipeline(text)
+
 def execute_node(node: Node, input_data, continue_on_error=False):
     """
     Execute a node with enhanced error handling and logging
@@ -35,15 +63,16 @@ def execute_node(node: Node, input_data, continue_on_error=False):
             if "simulate_failure" in node.config:
                 raise ConnectionError("Simulated API connection failure")
 
-            tts = gTTS(text=input_data, lang='en')
-            audio_file = io.BytesIO()
-
-            tts.write_to_fp(audio_file)
-            audio_file.seek(0)
-            result = "TTS audio generated successfully"
+            # Audio bytes can't be shared through the coordination backend, so TTS coalesces in-process only
+            # The executor moves the audio into the artifact store and keeps a reference in the results
+            result = get_flight('tts', cross_process=False).do(
+                make_key('tts', 'en', input_data), lambda: synthesize_speech(input_data)
+            )
 
         elif node.type == "huggingface_summarization":
-            summary = summarizer_pipeline(input_data)
+            summary = get_flight('summarization').do(
+                make_key('summarization', input_data), lambda: summarize(input_data)
+            )
             result = summary[0].get("summary_text", "No summary found")
 
         else:
@@ -1,14 +1,22 @@
 from django.shortcuts import render
-from rest_framework import viewsets, serializers
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework import viewsets, serializers, status
 from rest_framework.permissions import IsAuthenticated
 from .models import Workflow, Node, WorkflowExecution
 from .serializers import WorkflowSerializer, NodeSerializer, WorkflowExecutionSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from . import artifacts, graph as workflow_graph
+from .filters import ExecutionFilter
+from .pagination import ExecutionCursorPagination
 from .tasks import run_workflow
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from analytics import estimation, profiling
+from analytics.models import ExecutionEvent, ExecutionMemoryReport, ExecutionProfile, NodeResult
+from analytics.views import parse_window
 
 class WorkflowViewSet(viewsets.ModelViewSet):
     serializer_class = WorkflowSerializer
@@ -16,24 +24,73 @@ class WorkflowViewSet(viewsets.ModelViewSet):
     queryset = Workflow.objects.all()
 
     def get_queryset(self):
-        return Workflow.objects.filter(user=self.request.user)
+        # The serializer nests every workflow's nodes
+        return Workflow.objects.filter(user=self.request.user).prefetch_related('nodes')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
+        """
+        Start an execution. Pass ``profile`` as ``"cpu"`` or ``"wall"`` (``true``
+        means wall) to record a sampling profile of this run, and
+        ``memory_profile: true`` for a per-node memory report.
+        """
         workflow = self.get_object()
+        profile = request.data.get('profile') or None
+        if profile is True:
+            profile = 'wall'
+        if profile is not None and profile not in profiling.MODES:
+            return Response(
+                {'profile': [f"Expected one of {', '.join(profiling.MODES)}."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         execution = WorkflowExecution.objects.create(
             workflow=workflow,
             status='pending'
         )
-        run_workflow.delay(workflow.id, execution.id)
+        options = {}
+        if profile:
+            options['profile'] = profile
+        if request.data.get('memory_profile') in (True, 'true', '1'):
+            options['memory_profile'] = True
+        run_workflow.delay(workflow.id, execution.id, **options)
         return Response({
             "status": "Workflow execution started",
             "execution_id": execution.id
         })
 
+    @action(detail=True, methods=['get'])
+    def graph(self, request, pk=None):
+        """
+        Nodes, ports and connections in one document. The ETag follows the
+        graph's version, so editors can revalidate with ``If-None-Match``.
+        """
+        workflow = self.get_object()
+        etag = workflow_graph.etag(workflow)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(workflow_graph.get_graph(workflow))
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def estimate(self, request, pk=None):
+        """
+        Expected run time from this and similar workflows' history: mean, p50
+        and p95 of the completion time and of the critical path through the
+        node connections, with the node that dominates it. ``window``, or
+        ``start``/``end``, picks the history to use (default: the last
+        ``ESTIMATION['WINDOW_DAYS']`` days).
+        """
+        workflow = self.get_object()
+        start = end = None
+        if {'window', 'start', 'end'} & set(request.query_params):
+            start, end = parse_window(request.query_params)
+        return Response(estimation.estimate_workflow(workflow, start, end))
+
 class NodeViewSet(viewsets.ModelViewSet):
     serializer_class = NodeSerializer
     permission_classes = [IsAuthenticated]
@@ -51,10 +108,145 @@ class NodeViewSet(viewsets.ModelViewSet):
 
 
 class WorkflowExecutionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Executions of the user's workflows, newest first, a cursor page at a time.
+
+    ``fields`` (comma separated) picks the fields to return. Lists leave out
+    ``results`` and ``error_logs`` unless they are asked for, and those
+    columns aren't read from the database either.
+    """
     queryset = WorkflowExecution.objects.all()
     serializer_class = WorkflowExecutionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ExecutionCursorPagination
+    filter_backends = [ExecutionFilter]
 
     def get_queryset(self):
         user_workflows = Workflow.objects.filter(user=self.request.user)
-        return self.queryset.filter(workflow__in=user_workflows)
\ No newline at end of file
+        queryset = self.queryset.filter(workflow__in=user_workflows)
+        fields = self.get_fields()
+        if fields is not None:
+            # The paginator reads started_at from the rows to build the cursor
+            queryset = queryset.only('id', 'started_at', *(field for field in fields if field != 'id'))
+        return queryset
+
+    def get_fields(self):
+        """The requested field names, or None for all of them."""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        available = WorkflowExecutionSerializer.Meta.fields
+        if self.request.query_params.get('fields'):
+            fields = [field for field in self.request.query_params['fields'].split(',') if field]
+            unknown = set(fields) - set(available)
+            if unknown:
+                raise serializers.ValidationError({
+                    'fields': f"Unknown field {', '.join(sorted(unknown))}; expected some of {', '.join(available)}."
+                })
+            return fields
+        if self.action == 'list':
+            return [field for field in available if field not in WorkflowExecutionSerializer.LARGE_FIELDS]
+        return None
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def profile(self, request, pk=None):
+        """
+        The latest sampling profile of this execution as collapsed stacks, ready
+        for flamegraph.pl or speedscope. 404 if the run wasn't profiled.
+        """
+        execution = self.get_object()
+        profile = ExecutionProfile.objects.filter(execution=execution).first()
+        if profile is None:
+            return Response({'detail': 'This execution was not profiled.'}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="execution-{execution.id}-{profile.mode}.folded"'
+        response['X-Profile-Mode'] = profile.mode
+        response['X-Profile-Samples'] = str(profile.samples)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def memory(self, request, pk=None):
+        """Per-node memory report of this execution. 404 if it ran without memory profiling."""
+        execution = self.get_object()
+        report = ExecutionMemoryReport.objects.filter(execution=execution).first()
+        if report is None:
+            return Response({'detail': 'This execution was not memory profiled.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'execution_id': execution.id,
+            'peak_bytes': report.peak_bytes,
+            'max_rss_bytes': report.max_rss_bytes,
+            'nodes': report.nodes,
+        })
+
+    def get_node_output(self, execution, node_id):
+        """``(NodeResult or None, output)`` of one node; 404 if the node has no result in ``execution``."""
+        result = NodeResult.objects.filter(execution=execution, node_id=node_id).first()
+        if result is not None:
+            return result, result.output
+        # Executions that ran before per-node results were recorded only have the results blob
+        results = WorkflowExecution.objects.filter(pk=execution.pk).values_list('results', flat=True).first() or {}
+        if node_id not in results:
+            raise Http404('This node has no result in this execution.')
+        return None, results[node_id]
+
+    @action(detail=True, methods=['get'], url_path=r'nodes/(?P<node_id>[0-9]+)')
+    def node_result(self, request, pk=None, node_id=None):
+        """
+        One node's output in this execution, without loading the other nodes'
+        outputs. Outputs kept in the artifact store come back as references;
+        fetch the content from ``nodes/<node_id>/artifact/``.
+        """
+        result, output = self.get_node_output(self.get_object(), node_id)
+        if result is None:
+            return Response({'node_id': int(node_id), 'status': 'completed', 'output': output})
+        return Response({
+            'node_id': result.node_id,
+            'node_type': result.node_type,
+            'status': result.status,
+            'output': result.output,
+            'error': result.error,
+            'attempts': result.attempts,
+            'started_at': result.started_at,
+            'finished_at': result.finished_at,
+        })
+
+    @action(detail=True, methods=['get'], url_path=r'nodes/(?P<node_id>[0-9]+)/artifact')
+    def node_artifact(self, request, pk=None, node_id=None):
+        """The content of a node output kept in the artifact store, streamed from the blob."""
+        _, output = self.get_node_output(self.get_object(), node_id)
+        if not artifacts.is_reference(output):
+            raise Http404('This node output is not stored as an artifact.')
+        try:
+            blob = artifacts.open_blob(output)
+        except FileNotFoundError:
+            raise Http404('This artifact is no longer stored.')
+        response = FileResponse(blob, content_type=output['content_type'])
+        response['ETag'] = f'"{output["artifact"]}"'
+        patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """
+        The execution's events with a sequence number above ``after`` (default
+        0), oldest first, at most ``limit`` (default 100, up to 1000) of them.
+        Pass the returned ``last_sequence`` as ``after`` to follow a run.
+        """
+        execution = self.get_object()
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return Response({'detail': 'after and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        events = list(ExecutionEvent.objects.filter(execution=execution, sequence__gt=after).order_by('sequence').values(
+            'sequence', 'event', 'node_id', 'data', 'created_at'
+        )[:limit])
+        return Response({
+            'execution_id': execution.id,
+            'status': execution.status,
+            'events': events,
+            'last_sequence': events[-1]['sequence'] if events else after,
+        })